@@ -353,6 +353,12 @@ class UserProfile(models.Model):
             return []
         return [skill.strip() for skill in self.skills.split(',') if skill.strip()]
 
+    def get_interests_list(self):
+        """Retourne les centres d'intérêt sous forme de liste."""
+        if not self.interests:
+            return []
+        return [interest.strip() for interest in self.interests.split(',') if interest.strip()]
+
     def get_languages_list(self):
         """Retourne les langues sous forme de liste."""
         if not self.languages:
@@ -0,0 +1,189 @@
+# backend/ai_services/cache.py
+"""
+Cache des réponses Gemini, indexé par l'empreinte du prompt normalisé et le nom du modèle.
+
+Deux niveaux :
+- un cache LRU borné en mémoire du processus (``LOCAL_MAX_ENTRIES`` entrées), consulté
+  en premier, sans aller-retour réseau ;
+- le cache Django (Redis en production), partagé entre les processus. L'entrée y est
+  stockée avec sa date d'expiration : une copie locale ne vit pas plus longtemps que
+  l'entrée partagée dont elle provient.
+
+Ce sont les résultats JSON déjà analysés qui sont mis en cache (pas le texte brut) : un
+succès évite l'appel à l'API et l'analyse de la réponse. Les échecs (erreur réseau,
+JSON invalide) ne sont jamais mis en cache. Chaque méthode a sa propre durée de vie
+(``TTLS``), et les succès/échecs sont comptés par méthode (``stats()``).
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ai:response:v2'  # v2 : valeur stockée avec sa date d'expiration
+
+DEFAULT_CONFIG = {
+    'ENABLED': True,
+    'LOCAL_MAX_ENTRIES': 256,
+    # Durée de vie par méthode, en secondes
+    'TTLS': {
+        'recommendations': 3600,
+        'career_advice': 24 * 3600,
+        'skill_gaps': 7 * 24 * 3600,
+        'interview_prep': 24 * 3600,
+    },
+    'DEFAULT_TTL': 3600,
+}
+
+# Résultats comptés par méthode
+LOCAL_HIT = 'local_hit'
+SHARED_HIT = 'shared_hit'
+MISS = 'miss'
+
+
+def get_config(name):
+    return getattr(settings, 'AI_CACHE_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def get_ttl(method):
+    return get_config('TTLS').get(method, get_config('DEFAULT_TTL'))
+
+
+def normalize_prompt(prompt):
+    """Ignorer l'indentation et les espaces multiples : même prompt, même empreinte"""
+    return ' '.join(prompt.split())
+
+
+def make_key(method, model_name, prompt):
+    digest = hashlib.sha256(f'{model_name}\0{normalize_prompt(prompt)}'.encode()).hexdigest()
+    return f'{KEY_PREFIX}:{method}:{digest}'
+
+
+class LocalLRUCache:
+    """Cache LRU borné et à durée de vie, propre au processus (thread-safe)"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """Cache à deux niveaux des résultats analysés, avec compteurs de succès/échecs"""
+
+    def __init__(self, max_entries=None):
+        self.local = LocalLRUCache(max_entries or get_config('LOCAL_MAX_ENTRIES'))
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, method, outcome):
+        with self._lock:
+            self.counters[(method, outcome)] += 1
+
+    def get(self, method, model_name, prompt):
+        """Résultat en cache, ou ``None``"""
+        key = make_key(method, model_name, prompt)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count(method, LOCAL_HIT)
+            return copy.deepcopy(value)
+
+        try:
+            entry = cache.get(key, _MISSING)
+        except Exception as e:
+            # Une panne du cache partagé ne doit pas empêcher l'appel à l'API
+            logger.warning(f"Cache IA indisponible: {e}")
+            entry = _MISSING
+        if entry is not _MISSING:
+            expires_at, value = entry
+            # Copie locale limitée à la durée de vie restante de l'entrée partagée
+            remaining = expires_at - time.time()
+            if remaining > 0:
+                self.local.set(key, value, remaining)
+                self._count(method, SHARED_HIT)
+                return copy.deepcopy(value)
+
+        self._count(method, MISS)
+        return None
+
+    def set(self, method, model_name, prompt, value):
+        key = make_key(method, model_name, prompt)
+        ttl = get_ttl(method)
+        self.local.set(key, copy.deepcopy(value), ttl)
+        try:
+            cache.set(key, (time.time() + ttl, value), timeout=ttl)
+        except Exception as e:
+            logger.warning(f"Cache IA indisponible: {e}")
+
+    def get_or_compute(self, method, model_name, prompt, compute):
+        """
+        Résultat en cache, sinon ``compute()`` mis en cache s'il est non vide
+
+        Les résultats vides ([] ou {}) signalent un échec de l'API ou de l'analyse : ils
+        ne sont pas conservés, le prochain appel réessaiera.
+        """
+        if not get_config('ENABLED'):
+            return compute()
+        cached = self.get(method, model_name, prompt)
+        if cached is not None:
+            return cached
+        value = compute()
+        if value:
+            self.set(method, model_name, prompt, value)
+        return value
+
+    def stats(self):
+        """{méthode: {local_hit, shared_hit, miss, hit_rate}} depuis le démarrage du processus"""
+        with self._lock:
+            counters = dict(self.counters)
+        result = {}
+        for (method, outcome), count in counters.items():
+            result.setdefault(method, {LOCAL_HIT: 0, SHARED_HIT: 0, MISS: 0})[outcome] = count
+        for values in result.values():
+            total = sum(values.values())
+            values['hit_rate'] = round((values[LOCAL_HIT] + values[SHARED_HIT]) / total, 3) if total else 0.0
+        return result
+
+    def clear(self):
+        self.local.clear()
+        with self._lock:
+            self.counters.clear()
+
+
+# Instance partagée par les services du processus
+response_cache = ResponseCache()
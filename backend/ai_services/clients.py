@@ -0,0 +1,133 @@
+# backend/ai_services/clients.py
+"""
+Registre des clients Gemini partagé par tout le processus.
+
+``genai.configure`` n'est appelé qu'une fois, au premier appel réel à l'API ; les
+instances ``GenerativeModel`` sont créées une fois par nom de modèle et réutilisées par
+toutes les requêtes et tous les threads. Le choix automatique du modèle
+(``genai.list_models()``, un aller-retour réseau) est fait une seule fois, puis rafraîchi
+en arrière-plan toutes les ``MODEL_REFRESH_INTERVAL`` secondes sans bloquer les requêtes.
+
+Rien n'est initialisé à l'import ni à la construction des services : les endpoints en
+lecture seule (historique, liste des conversations) ne touchent jamais le réseau.
+"""
+import logging
+import threading
+import time
+
+import google.generativeai as genai
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 6 * 3600  # secondes
+
+
+def get_refresh_interval():
+    return getattr(settings, 'GEMINI_CONFIG', {}).get('MODEL_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL)
+
+
+class GeminiClientRegistry:
+    """Configuration, modèles et sélection de modèle mis en commun (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Verrou distinct : une sélection en cours ne bloque pas l'accès aux modèles déjà créés
+        self._selection_lock = threading.Lock()
+        self._configured = False
+        self._models = {}
+        # Préférences (tuple) -> (modèle choisi, date du choix en secondes monotones)
+        self._selections = {}
+        self._refreshing = set()
+
+    def configure(self):
+        """Configurer la clé d'API une seule fois pour le processus"""
+        if self._configured:
+            return
+        with self._lock:
+            if self._configured:
+                return
+            api_key = getattr(settings, 'GEMINI_API_KEY', None)
+            if not api_key:
+                raise ValueError("⚠️ GEMINI_API_KEY non défini dans settings.py")
+            genai.configure(api_key=api_key)
+            self._configured = True
+
+    def get_model(self, name):
+        """Instance ``GenerativeModel`` partagée pour ce nom de modèle"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        self.configure()
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = genai.GenerativeModel(name)
+                logger.info(f"✅ Modèle Gemini initialisé: {name}")
+            return self._models[name]
+
+    def _list_and_select(self, preferred, fallback):
+        try:
+            available = {model.name for model in genai.list_models()}
+            for name in preferred:
+                if name in available:
+                    return name
+            logger.error("⚠️ Aucun modèle compatible trouvé dans l'API Gemini")
+        except Exception as e:
+            logger.error(f"Erreur lors de la sélection du modèle: {e}")
+        return fallback
+
+    def _refresh(self, preferred, fallback):
+        try:
+            name = self._list_and_select(preferred, fallback)
+            with self._lock:
+                self._selections[preferred] = (name, time.monotonic())
+        finally:
+            with self._lock:
+                self._refreshing.discard(preferred)
+
+    def select_model(self, preferred, fallback):
+        """
+        Premier modèle disponible de la liste de préférences
+
+        Le premier appel interroge l'API ; ensuite le choix en mémoire est renvoyé
+        immédiatement et, s'il a plus de MODEL_REFRESH_INTERVAL secondes, rafraîchi dans
+        un thread d'arrière-plan.
+        """
+        preferred = tuple(preferred)
+        selection = self._selections.get(preferred)
+        if selection is None:
+            self.configure()
+            with self._selection_lock:
+                selection = self._selections.get(preferred)
+                if selection is None:
+                    selection = (self._list_and_select(preferred, fallback), time.monotonic())
+                    with self._lock:
+                        self._selections[preferred] = selection
+            return selection[0]
+
+        name, selected_at = selection
+        if time.monotonic() - selected_at >= get_refresh_interval():
+            with self._lock:
+                start = preferred not in self._refreshing
+                self._refreshing.add(preferred)
+            if start:
+                threading.Thread(
+                    target=self._refresh, args=(preferred, fallback), daemon=True, name='gemini-model-refresh'
+                ).start()
+        return name
+
+    def get_preferred_model(self, preferred, fallback):
+        """``GenerativeModel`` partagé du modèle choisi dans la liste de préférences"""
+        name = self.select_model(preferred, fallback)
+        return name, self.get_model(name)
+
+    def reset(self):
+        """Oublier modèles et sélections (changement de clé d'API, tests)"""
+        with self._lock:
+            self._configured = False
+            self._models.clear()
+            self._selections.clear()
+
+
+# Registre partagé par les services du processus
+gemini_clients = GeminiClientRegistry()
@@ -1,18 +1,47 @@
 # backend/ai_services/gemini_service.py
-import google.generativeai as genai
-from django.conf import settings
 from typing import List, Dict, Optional
 import json
 import logging
 
+from .cache import response_cache
+from .clients import gemini_clients
+from .resilience import gemini_guard
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_LOCATION = "Côte d'Ivoire"
+
 class GeminiAIService:
     """Service d'IA utilisant l'API Gemini gratuite pour OpportuCI"""
     
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-pro')
+    model_name = 'gemini-pro'
+    
+    @property
+    def model(self):
+        """Modèle partagé par le processus, créé au premier appel (voir clients.py)"""
+        return gemini_clients.get_model(self.model_name)
+    
+    def _generate_json(self, method: str, prompt: str, result_key: str, default):
+        """
+        Envoyer le prompt et extraire ``result_key`` de la réponse JSON
+        
+        Les résultats analysés sont mis en cache (voir cache.py) : un prompt identique
+        ne repart pas vers l'API tant que l'entrée n'a pas expiré. L'appel passe par le
+        disjoncteur et le sémaphore partagés (voir resilience.py).
+        """
+        def compute():
+            response = gemini_guard.call(
+                method,
+                lambda timeout: self.model.generate_content(prompt, request_options={'timeout': timeout})
+            )
+            try:
+                result = json.loads(response.text.strip())
+                return result.get(result_key, default)
+            except json.JSONDecodeError:
+                logger.error(f"Erreur parsing JSON ({method}): {response.text}")
+                return default
+        
+        return response_cache.get_or_compute(method, self.model_name, prompt, compute)
     
     def get_opportunity_recommendations(self, user_profile: Dict, opportunities: List[Dict], limit: int = 5) -> List[Dict]:
         """
@@ -22,7 +51,8 @@ class GeminiAIService:
         try:
             # Préparer le prompt avec les données utilisateur
             user_context = self._format_user_profile(user_profile)
-            opportunities_context = self._format_opportunities(opportunities[:20])  # Limite pour éviter de dépasser les tokens
+            # Candidats déjà pré-classés et limités par l'appelant (AI_RECOMMENDATIONS_CONFIG['CANDIDATES'])
+            opportunities_context = self._format_opportunities(opportunities)
             
             prompt = f"""
             En tant qu'expert en orientation professionnelle pour jeunes ivoiriens, analysez ce profil utilisateur et recommandez les {limit} meilleures opportunités parmi celles disponibles.
@@ -53,16 +83,8 @@ class GeminiAIService:
             - Opportunités de développement
             """
             
-            response = self.model.generate_content(prompt)
+            return self._generate_json('recommendations', prompt, 'recommendations', [])
             
-            # Parser la réponse JSON
-            try:
-                result = json.loads(response.text.strip())
-                return result.get('recommendations', [])
-            except json.JSONDecodeError:
-                logger.error(f"Erreur parsing JSON: {response.text}")
-                return []
-                
         except Exception as e:
             logger.error(f"Erreur Gemini recommendations: {str(e)}")
             return []
@@ -96,15 +118,8 @@ class GeminiAIService:
             Contexte important: Marché du travail ivoirien/africain, secteurs en croissance (tech, agribusiness, finance), défis locaux.
             """
             
-            response = self.model.generate_content(prompt)
+            return self._generate_json('career_advice', prompt, 'career_assessment', {})
             
-            try:
-                result = json.loads(response.text.strip())
-                return result.get('career_assessment', {})
-            except json.JSONDecodeError:
-                logger.error(f"Erreur parsing career advice: {response.text}")
-                return {}
-                
         except Exception as e:
             logger.error(f"Erreur Gemini career advice: {str(e)}")
             return {}
@@ -135,14 +150,8 @@ class GeminiAIService:
             Contexte: Marché du travail ivoirien, ressources disponibles localement.
             """
             
-            response = self.model.generate_content(prompt)
+            return self._generate_json('skill_gaps', prompt, 'skill_analysis', {})
             
-            try:
-                result = json.loads(response.text.strip())
-                return result.get('skill_analysis', {})
-            except json.JSONDecodeError:
-                return {}
-                
         except Exception as e:
             logger.error(f"Erreur skill gaps analysis: {str(e)}")
             return {}
@@ -180,14 +189,8 @@ class GeminiAIService:
             }}
             """
             
-            response = self.model.generate_content(prompt)
+            return self._generate_json('interview_prep', prompt, 'interview_prep', {})
             
-            try:
-                result = json.loads(response.text.strip())
-                return result.get('interview_prep', {})
-            except json.JSONDecodeError:
-                return {}
-                
         except Exception as e:
             logger.error(f"Erreur interview prep: {str(e)}")
             return {}
@@ -200,7 +203,7 @@ class GeminiAIService:
         - Institution: {profile.get('institution', 'Non spécifié')}
         - Compétences: {', '.join(profile.get('skills', []))}
         - Centres d'intérêt: {', '.join(profile.get('interests', []))}
-        - Localisation: {profile.get('location', 'Côte d\'Ivoire')}
+        - Localisation: {profile.get('location', DEFAULT_LOCATION)}
         - Expérience: {profile.get('experience', 'Débutant')}
         - Objectifs: {profile.get('career_goals', 'En définition')}
         """
@@ -0,0 +1,340 @@
+# backend/ai_services/jobs.py
+"""
+File d'attente des appels IA.
+
+Les endpoints IA ne parlent plus à Gemini pendant la requête HTTP : ils enregistrent un
+``AIJob`` et répondent ``202`` avec son identifiant. Le client interroge ensuite
+``/api/ai/jobs/<id>/`` jusqu'à obtenir le résultat.
+
+La table ``AIJob`` sert elle-même de file (aucun broker externe) : ``python manage.py
+run_ai_jobs`` lance ``WORKERS`` threads qui réservent les jobs en attente par une mise à
+jour conditionnelle (un job n'est exécuté que par un seul worker, sur PostgreSQL comme
+sur SQLite), exécutent l'appel IA et enregistrent le résultat analysé. Un job réservé
+depuis plus de ``LEASE`` secondes (worker arrêté en cours de route) est remis en
+attente, au plus ``MAX_ATTEMPTS`` fois. Les jobs terminés sont supprimés après
+``RETENTION`` secondes.
+
+En production, le worker est le service Render ``opportunici-ai-jobs`` (render.yaml).
+Sans worker (développement local, déploiement minimal), ``INLINE`` exécute chaque
+nouveau job dans un thread du processus web, après la validation de la transaction ;
+un job resté en attente (processus arrêté) est repris par le worker s'il y en a un.
+
+Le service IA est configurable (``SERVICE``) : ``stub_service.StubAIService`` répond
+sans réseau, pour le développement local et les tests.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from opportunities import prerank
+from opportunities.models import Opportunity, UserOpportunity
+from .models import AIJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'SERVICE': 'ai_services.gemini_service.GeminiAIService',
+    'WORKERS': 2,  # threads du worker
+    'INLINE': False,  # exécuter les jobs dans un thread du processus web (sans worker)
+    'POLL_INTERVAL': 1.0,  # secondes d'attente quand la file est vide
+    'LEASE': 300,  # secondes avant de considérer un job en cours comme abandonné
+    'MAX_ATTEMPTS': 2,
+    'RETENTION': 7 * 24 * 3600,  # secondes de conservation des jobs terminés
+    'RETRY_AFTER': 2,  # secondes suggérées au client entre deux interrogations
+}
+
+
+def get_config(name):
+    return getattr(settings, 'AI_JOBS_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def get_service():
+    return import_string(get_config('SERVICE'))()
+
+
+class JobFailed(Exception):
+    """Échec attendu d'un job, message renvoyé tel quel au client"""
+
+
+def build_user_profile(user):
+    """Profil envoyé au service IA"""
+    profile = getattr(user, 'profile', None)
+    return {
+        'name': user.get_full_name(),
+        'education_level': getattr(user, 'education_level', ''),
+        'institution': getattr(user, 'institution', ''),
+        'skills': profile.get_skills_list() if profile else [],
+        'interests': profile.get_interests_list() if profile else [],
+        'location': f"{user.city}, {user.country}" if user.city else user.country,
+        'experience': 'Débutant',  # À adapter selon votre modèle
+    }
+
+
+# ===========================
+# EXÉCUTION DES APPELS IA
+# ===========================
+
+def recommendations(user, service):
+    user_profile = build_user_profile(user)
+
+    # Pré-classement local (BM25) de tout le catalogue : seules les meilleures
+    # candidates sont envoyées au service IA
+    config = getattr(settings, 'AI_RECOMMENDATIONS_CONFIG', {})
+    applied = UserOpportunity.objects.filter(
+        user=user, relation_type='applied'
+    ).values_list('opportunity_id', flat=True)
+    candidates = prerank.top_candidates(
+        {**user_profile, 'city': user.city}, config.get('CANDIDATES', 15), exclude=list(applied)
+    )
+
+    if not candidates:
+        return {
+            'recommendations': [],
+            'message': 'Aucune opportunité disponible pour le moment.'
+        }
+
+    opportunities = {
+        str(opp.pk): opp
+        for opp in Opportunity.objects.select_related('category').filter(pk__in=[pk for pk, _ in candidates])
+    }
+
+    results = []
+    if config.get('LLM_RERANK', True):
+        results = service.get_opportunity_recommendations(
+            user_profile=user_profile,
+            opportunities=[
+                {
+                    'id': str(opp.pk),
+                    'title': opp.title,
+                    'organization': opp.organization,
+                    'category': opp.category.name if opp.category else '',
+                    'location': opp.location,
+                    'description': opp.description,
+                    'education_level': opp.education_level,
+                }
+                for opp in (opportunities.get(str(pk)) for pk, _ in candidates) if opp
+            ],
+            limit=10
+        )
+
+    ranking = 'llm'
+    if not results:
+        # Étape LLM désactivée ou en échec : servir le pré-classement local
+        ranking = 'local'
+        best = candidates[0][1] or 1.0
+        results = [
+            {
+                'opportunity_id': str(pk),
+                'match_score': round(score / best, 2) if score else 0.5,
+                'match_reason': 'Correspond à votre profil',
+                'key_advantages': [],
+            }
+            for pk, score in candidates[:10]
+        ]
+
+    # Enrichir avec les données complètes des opportunités
+    enriched_recommendations = []
+    for rec in results:
+        opp = opportunities.get(str(rec.get('opportunity_id')))
+        if opp is None:
+            continue
+        enriched_recommendations.append({
+            'id': opp.id,
+            'title': opp.title,
+            'organization': opp.organization,
+            'category': opp.category.name if opp.category else 'Autre',
+            'location': opp.location,
+            'deadline': opp.deadline,
+            'slug': opp.slug,
+            'match_score': rec.get('match_score', 0.5),
+            'match_reason': rec.get('match_reason', 'Profil compatible'),
+            'key_advantages': rec.get('key_advantages', [])
+        })
+
+    return {
+        'recommendations': enriched_recommendations,
+        'total': len(enriched_recommendations),
+        'ranking': ranking
+    }
+
+
+def career_advice(user, service, career_goals=''):
+    advice = service.generate_career_advice(build_user_profile(user), career_goals)
+    if not advice:
+        raise JobFailed('Impossible de générer des conseils pour le moment')
+    return {'career_advice': advice}
+
+
+def interview_prep(user, service, opportunity_id):
+    opportunity = Opportunity.objects.select_related('category').filter(pk=opportunity_id).first()
+    if opportunity is None:
+        raise JobFailed('Opportunité introuvable')
+
+    opportunity_data = {
+        'title': opportunity.title,
+        'organization': opportunity.organization,
+        'description': opportunity.description,
+        'category': opportunity.category.name if opportunity.category else 'Autre'
+    }
+    prep = service.generate_interview_prep(opportunity_data, build_user_profile(user))
+    if not prep:
+        raise JobFailed("Impossible de préparer l'entretien pour le moment")
+    return {'interview_prep': prep}
+
+
+HANDLERS = {
+    'recommendations': recommendations,
+    'career_advice': career_advice,
+    'interview_prep': interview_prep,
+}
+
+# Message renvoyé au client en cas d'erreur inattendue
+ERROR_MESSAGES = {
+    'recommendations': 'Erreur lors de la génération des recommandations',
+    'career_advice': 'Erreur lors de la génération des conseils',
+    'interview_prep': "Erreur lors de la préparation d'entretien",
+}
+
+
+# ===========================
+# FILE D'ATTENTE
+# ===========================
+
+def enqueue(user, kind, **params):
+    """
+    Job en attente pour cet appel
+
+    Un job identique encore en attente ou en cours pour le même utilisateur est
+    réutilisé : des clics répétés ne multiplient pas les appels à l'API.
+    """
+    for job in AIJob.objects.filter(user=user, kind=kind, status__in=('pending', 'running')):
+        if job.params == params:
+            return job
+    job = AIJob.objects.create(user=user, kind=kind, params=params)
+    if get_config('INLINE'):
+        transaction.on_commit(lambda: start_inline(job.pk))
+    return job
+
+
+def claim_job(pk):
+    """Réserver ce job s'il est encore en attente, sinon ``None``"""
+    # Mise à jour conditionnelle : un autre worker a pu réserver ce job entre-temps
+    claimed = AIJob.objects.filter(pk=pk, status='pending').update(
+        status='running', started_at=timezone.now(), attempts=F('attempts') + 1
+    )
+    return AIJob.objects.select_related('user').get(pk=pk) if claimed else None
+
+
+def claim():
+    """Réserver le plus ancien job en attente, ou ``None`` si la file est vide"""
+    pending = AIJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)
+    for pk in pending[:10]:
+        job = claim_job(pk)
+        if job is not None:
+            return job
+    return None
+
+
+def run(job):
+    """Exécuter un job réservé et enregistrer son résultat"""
+    try:
+        job.result = HANDLERS[job.kind](job.user, get_service(), **job.params)
+        job.status = 'succeeded'
+    except JobFailed as e:
+        job.status, job.error = 'failed', str(e)
+    except Exception as e:
+        logger.exception(f"Erreur job IA {job.kind} {job.pk}: {e}")
+        job.status, job.error = 'failed', ERROR_MESSAGES.get(job.kind, 'Erreur du service IA')
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def run_next():
+    """Réserver et exécuter un job ; ``None`` si la file est vide"""
+    job = claim()
+    return run(job) if job is not None else None
+
+
+def recover_stale(now=None):
+    """
+    Jobs réservés depuis plus de LEASE secondes (worker arrêté) : remis en attente,
+    ou en échec après MAX_ATTEMPTS tentatives
+
+    Returns:
+        (remis en attente, en échec)
+    """
+    now = now or timezone.now()
+    stale = AIJob.objects.filter(status='running', started_at__lt=now - timedelta(seconds=get_config('LEASE')))
+    requeued = stale.filter(attempts__lt=get_config('MAX_ATTEMPTS')).update(status='pending', started_at=None)
+    failed = stale.update(status='failed', error='Délai dépassé, veuillez réessayer', finished_at=now)
+    return requeued, failed
+
+
+def purge(now=None):
+    """Supprimer les jobs terminés depuis plus de RETENTION secondes"""
+    now = now or timezone.now()
+    deleted, _ = AIJob.objects.filter(
+        status__in=('succeeded', 'failed'), finished_at__lt=now - timedelta(seconds=get_config('RETENTION'))
+    ).delete()
+    return deleted
+
+
+def work(stop, interval=None):
+    """Boucle d'un thread du worker, jusqu'à ce que l'événement ``stop`` soit levé"""
+    interval = interval or get_config('POLL_INTERVAL')
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = run_next()
+            except Exception as e:
+                # Base indisponible… : réessayer au prochain tour
+                logger.exception(f"Erreur worker IA: {e}")
+                job = None
+            if job is None:
+                stop.wait(interval)
+    finally:
+        connection.close()
+
+
+def run_inline(pk):
+    """Exécuter un job dans le thread courant (mode ``INLINE``), s'il est encore en attente"""
+    try:
+        job = claim_job(pk)
+        if job is not None:
+            run(job)
+    except Exception as e:
+        logger.exception(f"Erreur job IA {pk}: {e}")
+    finally:
+        connection.close()
+
+
+def start_inline(pk):
+    """Lancer l'exécution d'un job dans un thread du processus web"""
+    thread = threading.Thread(target=run_inline, args=(pk,), daemon=True, name=f'ai-job-{pk}')
+    thread.start()
+    return thread
+
+
+def start_workers(count=None, interval=None):
+    """
+    Lancer les threads du worker
+
+    Returns:
+        (événement d'arrêt, threads)
+    """
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=work, args=(stop, interval), daemon=True, name=f'ai-job-worker-{index}')
+        for index in range(count or get_config('WORKERS'))
+    ]
+    for thread in threads:
+        thread.start()
+    return stop, threads
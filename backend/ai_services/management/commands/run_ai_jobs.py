@@ -0,0 +1,46 @@
+# backend/ai_services/management/commands/run_ai_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_services import jobs
+
+
+class Command(BaseCommand):
+    help = "Exécuter les jobs IA en attente (recommandations, conseils, préparation d'entretien)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Nombre de threads d'exécution")
+        parser.add_argument('--once', action='store_true',
+                            help="Vider la file puis s'arrêter (sans threads)")
+        parser.add_argument('--interval', type=float, default=None,
+                            help="Secondes d'attente quand la file est vide")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.maintain()
+            done = 0
+            while jobs.run_next() is not None:
+                done += 1
+            self.stdout.write(f"{done} job(s) exécuté(s).")
+            return
+
+        stop, threads = jobs.start_workers(options['workers'], options['interval'])
+        self.stdout.write(f"{len(threads)} worker(s) IA démarré(s).")
+        try:
+            while True:
+                self.maintain()
+                time.sleep(60)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def maintain(self):
+        requeued, failed = jobs.recover_stale()
+        purged = jobs.purge()
+        if requeued or failed or purged:
+            self.stdout.write(
+                f"{requeued} job(s) remis en attente, {failed} abandonné(s), {purged} supprimé(s)."
+            )
@@ -0,0 +1,45 @@
+# backend/ai_services/models.py
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+import uuid
+
+class AIJob(models.Model):
+    """Appel IA mis en file d'attente, exécuté par le worker (voir jobs.py)"""
+    KIND_CHOICES = [
+        ('recommendations', 'Recommandations'),
+        ('career_advice', 'Conseils de carrière'),
+        ('interview_prep', "Préparation d'entretien"),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('succeeded', 'Terminé'),
+        ('failed', 'Échec'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ai_jobs')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Prochain job à exécuter, jobs bloqués et purge
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.get_status_display()}) - {self.user}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
@@ -0,0 +1,308 @@
+# backend/ai_services/resilience.py
+"""
+Protection des appels à l'API Gemini, partagée par tout le processus.
+
+Chaque appel (``gemini_guard.call``) passe par :
+- un disjoncteur : si trop d'appels récents échouent (``ERROR_RATE`` sur au moins
+  ``MIN_CALLS`` appels dans la fenêtre de ``WINDOW`` secondes), les appels suivants
+  échouent immédiatement pendant ``OPEN_SECONDS`` ; un seul appel d'essai est ensuite
+  autorisé, et son succès referme le disjoncteur ;
+- un sémaphore : au plus ``MAX_CONCURRENCY`` appels en cours par processus, une requête
+  qui attend plus de ``ACQUIRE_TIMEOUT`` secondes abandonne au lieu d'occuper un worker ;
+- un délai par appel (``TIMEOUTS`` par méthode, transmis à l'API) ;
+- des nouvelles tentatives, uniquement pour les erreurs transitoires (quota, surcharge,
+  délai dépassé, réseau), avec un délai exponentiel à gigue aléatoire.
+
+Les erreurs de la requête elle-même renvoyées par l'API (prompt refusé, clé
+invalide…) ne sont ni retentées ni comptées comme pannes. Une erreur levée sans
+réponse de l'API (SDK incompatible, argument refusé avant l'envoi) n'est pas retentée
+mais compte comme une panne : elle ne prouve pas que le service répond. Quand le disjoncteur est ouvert, les services
+renvoient leur réponse de repli (cache, pré-classement local, message d'excuse).
+
+L'état du disjoncteur et les latences par méthode sont exposés par ``stats()`` (voir
+``/api/ai/metrics/``).
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'MAX_CONCURRENCY': 4,  # appels Gemini simultanés par processus
+    'ACQUIRE_TIMEOUT': 2.0,  # secondes d'attente maximale d'une place libre
+    # Délai de chaque appel, en secondes, par méthode
+    'TIMEOUTS': {
+        'chat': 30,
+        'recommendations': 20,
+        'career_advice': 30,
+        'skill_gaps': 30,
+        'interview_prep': 30,
+    },
+    'DEFAULT_TIMEOUT': 20,
+    'MAX_RETRIES': 2,  # nouvelles tentatives après une erreur transitoire
+    'BACKOFF_BASE': 0.5,  # secondes, doublées à chaque tentative
+    'BACKOFF_MAX': 8.0,
+    # Disjoncteur
+    'WINDOW': 60,  # secondes d'historique prises en compte
+    'MIN_CALLS': 5,  # appels minimum dans la fenêtre avant de pouvoir ouvrir
+    'ERROR_RATE': 0.5,  # taux d'échec qui ouvre le disjoncteur
+    'OPEN_SECONDS': 30,  # durée d'ouverture avant l'appel d'essai
+}
+
+# Codes HTTP des erreurs transitoires de l'API (quota, erreur serveur, surcharge, délai)
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+LATENCY_SAMPLES = 500
+
+
+def get_config(name):
+    return getattr(settings, 'AI_RESILIENCE_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def get_timeout(method):
+    return get_config('TIMEOUTS').get(method, get_config('DEFAULT_TIMEOUT'))
+
+
+class GeminiUnavailable(Exception):
+    """Appel refusé sans contacter l'API : les services doivent servir leur repli"""
+
+
+class CircuitOpen(GeminiUnavailable):
+    """Disjoncteur ouvert après trop d'échecs récents"""
+
+
+class Overloaded(GeminiUnavailable):
+    """Trop d'appels en cours dans le processus"""
+
+
+def is_retryable(error):
+    """Erreur transitoire : délai, réseau, ou code HTTP 429/5xx (exceptions google.api_core)"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, 'code', None) in RETRYABLE_CODES
+
+
+def has_responded(error):
+    """Erreur renvoyée par l'API elle-même (code HTTP non transitoire) : le service répond"""
+    return getattr(error, 'code', None) is not None and not is_retryable(error)
+
+
+def backoff(attempt):
+    """Délai avant la tentative suivante : exponentiel, borné, à gigue complète"""
+    return random.uniform(0, min(get_config('BACKOFF_MAX'), get_config('BACKOFF_BASE') * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Disjoncteur sur le taux d'échec d'une fenêtre glissante (thread-safe)"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name):
+        self.name = name
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.transitions = Counter()
+        self._outcomes = deque()  # (date en secondes monotones, succès)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning(f"Disjoncteur {self.name}: {self.state} -> {state}")
+            self.state = state
+            self.transitions[state] += 1
+
+    def _prune(self, now):
+        limit = now - get_config('WINDOW')
+        while self._outcomes and self._outcomes[0][0] < limit:
+            self._outcomes.popleft()
+
+    def allow(self):
+        """L'appel peut-il partir ? En demi-ouverture, un seul appel d'essai à la fois"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < get_config('OPEN_SECONDS'):
+                    return False
+                self._set_state(self.HALF_OPEN)
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def cancel(self):
+        """L'appel autorisé n'est finalement pas parti (pas de place libre)"""
+        with self._lock:
+            self._probing = False
+
+    def record(self, success):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if success:
+                    self._outcomes.clear()
+                    self._set_state(self.CLOSED)
+                else:
+                    self.opened_at = now
+                    self._set_state(self.OPEN)
+                return
+
+            self._outcomes.append((now, success))
+            self._prune(now)
+            if not success and self.state == self.CLOSED:
+                calls = len(self._outcomes)
+                failures = sum(1 for _, ok in self._outcomes if not ok)
+                if calls >= get_config('MIN_CALLS') and failures / calls >= get_config('ERROR_RATE'):
+                    self.opened_at = now
+                    self._set_state(self.OPEN)
+
+    def stats(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                'state': self.state,
+                'calls_in_window': calls,
+                'error_rate': round(failures / calls, 3) if calls else 0.0,
+                'open_for_seconds': (
+                    round(time.monotonic() - self.opened_at, 1) if self.state != self.CLOSED else 0.0
+                ),
+                'transitions': dict(self.transitions),
+            }
+
+
+class CallStats:
+    """Compteurs et latences récentes d'une méthode"""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # millisecondes, appels aboutis ou non
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(rank):
+            return round(latencies[min(len(latencies) - 1, int(rank * len(latencies)))], 1) if latencies else None
+
+        return {
+            **{name: self.counters[name] for name in ('calls', 'errors', 'retries', 'rejected', 'short_circuited')},
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(latencies[-1], 1) if latencies else None,
+        }
+
+
+class ResilientCaller:
+    """Disjoncteur, sémaphore, délais et nouvelles tentatives autour d'un service distant"""
+
+    def __init__(self, name):
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = defaultdict(CallStats)
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            with self._lock:
+                if self._semaphore is None:
+                    self._semaphore = threading.BoundedSemaphore(get_config('MAX_CONCURRENCY'))
+        return self._semaphore
+
+    def _count(self, method, name):
+        with self._lock:
+            self._stats[method].counters[name] += 1
+
+    def _attempt(self, method, fn, timeout):
+        # Disjoncteur et sémaphore de cet appel : reset() peut les remplacer pendant qu'il est en cours
+        breaker, semaphore = self.breaker, self.semaphore
+        if not breaker.allow():
+            self._count(method, 'short_circuited')
+            raise CircuitOpen(f"Service {self.name} indisponible (disjoncteur ouvert)")
+        if not semaphore.acquire(timeout=get_config('ACQUIRE_TIMEOUT')):
+            breaker.cancel()
+            self._count(method, 'rejected')
+            raise Overloaded(f"Service {self.name} saturé ({get_config('MAX_CONCURRENCY')} appels en cours)")
+
+        with self._lock:
+            self._in_flight += 1
+        started = time.monotonic()
+        try:
+            result = fn(timeout=timeout)
+        except Exception as e:
+            # Seule une erreur renvoyée par l'API prouve que le service répond
+            breaker.record(has_responded(e))
+            self._count(method, 'errors')
+            raise
+        else:
+            breaker.record(True)
+            return result
+        finally:
+            elapsed = (time.monotonic() - started) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                self._stats[method].counters['calls'] += 1
+                self._stats[method].latencies.append(elapsed)
+            semaphore.release()
+
+    def call(self, method, fn):
+        """
+        Appeler ``fn(timeout=...)`` avec les protections de ce module
+
+        Raises:
+            GeminiUnavailable: disjoncteur ouvert ou processus saturé (aucun appel envoyé)
+            Exception: erreur non transitoire, ou dernière erreur transitoire
+        """
+        timeout = get_timeout(method)
+        retries = get_config('MAX_RETRIES')
+        for attempt in range(retries + 1):
+            try:
+                return self._attempt(method, fn, timeout)
+            except GeminiUnavailable:
+                raise
+            except Exception as e:
+                if attempt >= retries or not is_retryable(e):
+                    raise
+                delay = backoff(attempt)
+                logger.warning(f"{self.name} {method}: erreur transitoire ({e}), nouvel essai dans {delay:.1f}s")
+                self._count(method, 'retries')
+                time.sleep(delay)
+
+    def stats(self):
+        """État du disjoncteur, appels en cours et statistiques par méthode depuis le démarrage"""
+        with self._lock:
+            methods = {method: stats.snapshot() for method, stats in self._stats.items()}
+            in_flight = self._in_flight
+        return {
+            'breaker': self.breaker.stats(),
+            'in_flight': in_flight,
+            'max_concurrency': get_config('MAX_CONCURRENCY'),
+            'methods': methods,
+        }
+
+    def reset(self):
+        """
+        Oublier état et statistiques (changement de configuration, tests)
+
+        Les appels en cours libèrent le sémaphore qu'ils ont acquis, pas le nouveau.
+        """
+        with self._lock:
+            self.breaker = CircuitBreaker(self.name)
+            self._semaphore = None
+            self._stats.clear()
+
+
+# Protection partagée par tous les appels Gemini du processus
+gemini_guard = ResilientCaller('gemini')
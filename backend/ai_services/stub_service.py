@@ -0,0 +1,66 @@
+# backend/ai_services/stub_service.py
+"""
+Backend IA factice, sans appel réseau : réponses déterministes ayant la même forme que
+celles de ``GeminiAIService``.
+
+Pour le développement local sans clé d'API et pour les tests de la file de jobs :
+``AI_JOBS_CONFIG['SERVICE'] = 'ai_services.stub_service.StubAIService'``.
+"""
+from typing import Dict, List
+
+
+class StubAIService:
+    """Mêmes méthodes que GeminiAIService, réponses fixes"""
+
+    model_name = 'stub'
+
+    def get_opportunity_recommendations(self, user_profile: Dict, opportunities: List[Dict], limit: int = 5) -> List[Dict]:
+        # L'ordre du pré-classement est conservé
+        return [
+            {
+                'opportunity_id': str(opp['id']),
+                'match_score': round(1 - index / (2 * len(opportunities)), 2),
+                'match_reason': 'Correspond à votre profil',
+                'key_advantages': [],
+            }
+            for index, opp in enumerate(opportunities[:limit])
+        ]
+
+    def generate_career_advice(self, user_profile: Dict, career_goals: str = "") -> Dict:
+        skills = list(user_profile.get('skills') or [])
+        return {
+            'strengths': skills[:3],
+            'areas_to_improve': [],
+            'market_opportunities': [],
+            'recommended_skills': [],
+            'next_steps': [career_goals] if career_goals else [],
+            'salary_estimation': '',
+            'career_path_suggestions': [],
+        }
+
+    def analyze_skill_gaps(self, user_skills: List[str], target_position: str) -> Dict:
+        return {
+            'matching_skills': list(user_skills),
+            'missing_critical_skills': [],
+            'nice_to_have_skills': [],
+            'learning_priority': [],
+            'estimated_learning_time': '',
+            'recommended_resources': [],
+        }
+
+    def generate_interview_prep(self, opportunity: Dict, user_profile: Dict) -> Dict:
+        return {
+            'likely_questions': [
+                {
+                    'question': f"Pourquoi voulez-vous rejoindre {opportunity.get('organization', '')} ?",
+                    'suggested_answer_points': [],
+                    'why_this_question': '',
+                }
+            ],
+            'key_strengths_to_highlight': list(user_profile.get('skills') or [])[:3],
+            'potential_concerns_to_address': [],
+            'questions_to_ask_interviewer': [],
+            'company_research_points': [],
+            'dress_code_suggestion': '',
+            'cultural_tips': '',
+        }
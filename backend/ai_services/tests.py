@@ -0,0 +1,458 @@
+import threading
+import time
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from google.generativeai import protos
+from rest_framework.test import APITestCase
+
+from chat.services import GeminiChatService
+from opportunities.models import Opportunity
+from . import jobs
+from .cache import LocalLRUCache, ResponseCache, make_key
+from .clients import gemini_clients
+from .gemini_service import GeminiAIService
+from .models import AIJob
+from .resilience import CircuitBreaker, CircuitOpen, Overloaded, ResilientCaller, gemini_guard, get_timeout
+User = get_user_model()
+
+
+class AIResponseCacheTests(TestCase):
+    """Cache à deux niveaux des réponses analysées"""
+
+    def setUp(self):
+        cache.clear()
+        self.clock = mock.Mock(time=mock.Mock(return_value=1000.0), monotonic=mock.Mock(return_value=0.0))
+        patcher = mock.patch('ai_services.cache.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_local_entries_expire_and_least_recent_is_evicted(self):
+        local = LocalLRUCache(max_entries=2)
+        local.set('a', 1, timeout=10)
+        local.set('b', 2, timeout=10)
+        local.get('a')
+        local.set('c', 3, timeout=10)
+
+        self.assertEqual((local.get('a'), local.get('b'), local.get('c')), (1, None, 3))
+
+        self.clock.monotonic.return_value = 10.0
+        self.assertIsNone(local.get('a'))
+        self.assertEqual(len(local), 1)
+
+    def test_empty_results_are_not_cached(self):
+        responses = ResponseCache()
+        compute = mock.Mock(return_value=[])
+
+        responses.get_or_compute('recommendations', 'gemini-pro', "prompt", compute)
+        responses.get_or_compute('recommendations', 'gemini-pro', "prompt", compute)
+        self.assertEqual(compute.call_count, 2)
+
+        compute.return_value = [{'opportunity_id': '1'}]
+        responses.get_or_compute('recommendations', 'gemini-pro', "prompt", compute)
+        result = responses.get_or_compute('recommendations', 'gemini-pro', "  prompt ", compute)
+        self.assertEqual(compute.call_count, 3)
+        self.assertEqual(result, [{'opportunity_id': '1'}])
+
+    def test_stats_count_local_and_shared_hits(self):
+        writer, reader = ResponseCache(), ResponseCache()
+        writer.get_or_compute('career_advice', 'gemini-pro', "prompt", lambda: {'strengths': ['python']})
+        writer.get('career_advice', 'gemini-pro', "prompt")
+        reader.get('career_advice', 'gemini-pro', "prompt")
+        reader.get('career_advice', 'gemini-pro', "prompt")
+
+        self.assertEqual(writer.stats(), {
+            'career_advice': {'local_hit': 1, 'shared_hit': 0, 'miss': 1, 'hit_rate': 0.5},
+        })
+        self.assertEqual(reader.stats(), {
+            'career_advice': {'local_hit': 1, 'shared_hit': 1, 'miss': 0, 'hit_rate': 1.0},
+        })
+
+    @override_settings(AI_CACHE_CONFIG={'TTLS': {'recommendations': 100}})
+    def test_local_copy_keeps_the_remaining_lifetime(self):
+        writer, reader = ResponseCache(), ResponseCache()
+        writer.set('recommendations', 'gemini-pro', "prompt", ['rec'])
+        key = make_key('recommendations', 'gemini-pro', "prompt")
+
+        self.clock.time.return_value = 1090.0
+        self.assertEqual(reader.get('recommendations', 'gemini-pro', "prompt"), ['rec'])
+        expires_at, _ = reader.local._entries[key]
+        self.assertEqual(expires_at, 10.0)
+
+        # Entrée partagée arrivée à échéance : ni servie, ni recopiée localement
+        self.clock.time.return_value = 1100.0
+        other = ResponseCache()
+        self.assertIsNone(other.get('recommendations', 'gemini-pro', "prompt"))
+        self.assertEqual(len(other.local), 0)
+
+
+class GeminiPromptTests(TestCase):
+    """Contenu des prompts envoyés à Gemini"""
+
+    def test_every_candidate_reaches_the_recommendation_prompt(self):
+        candidates = [{'id': f'opp-{index}', 'title': f"Stage {index}"} for index in range(30)]
+
+        with mock.patch.object(GeminiAIService, '_generate_json', return_value=[]) as generate:
+            GeminiAIService().get_opportunity_recommendations({'skills': ['python']}, candidates)
+
+        prompt = generate.call_args[0][1]
+        self.assertIn('ID: opp-29 ', prompt)
+
+
+@override_settings(GEMINI_API_KEY='cle-de-test', GEMINI_CONFIG={'MODEL_REFRESH_INTERVAL': 60})
+class GeminiClientRegistryTests(APITestCase):
+    """Configuration et choix du modèle Gemini faits une fois par processus"""
+
+    PREFERRED = ('models/gemini-2.5-pro', 'models/gemini-1.5-pro')
+    FALLBACK = 'models/gemini-1.5-pro'
+
+    def setUp(self):
+        gemini_clients.reset()
+        self.addCleanup(gemini_clients.reset)
+        patcher = mock.patch('ai_services.clients.genai')
+        self.genai = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.genai.list_models.return_value = [SimpleNamespace(name='models/gemini-1.5-pro')]
+
+    def test_read_only_endpoints_never_touch_the_api(self):
+        user = User.objects.create_user(email='lecteur@example.ci', username='lecteur', password='motdepasse-123')
+        self.client.force_authenticate(user)
+        GeminiChatService()
+
+        self.assertEqual(self.client.get(reverse('chat-history')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('chat-conversations')).status_code, 200)
+        self.genai.configure.assert_not_called()
+        self.genai.list_models.assert_not_called()
+
+    def test_model_is_selected_once_across_threads(self):
+        def slow_list_models():
+            time.sleep(0.05)
+            return [SimpleNamespace(name='models/gemini-1.5-pro')]
+        self.genai.list_models.side_effect = slow_list_models
+
+        names = []
+        threads = [
+            threading.Thread(target=lambda: names.append(gemini_clients.select_model(self.PREFERRED, self.FALLBACK)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(names, ['models/gemini-1.5-pro'] * 5)
+        self.assertEqual(self.genai.list_models.call_count, 1)
+        self.genai.configure.assert_called_once_with(api_key='cle-de-test')
+
+    def test_stale_selection_is_refreshed_once_in_background(self):
+        gemini_clients.select_model(self.PREFERRED, self.FALLBACK)
+        release = threading.Event()
+
+        def blocked_list_models():
+            release.wait(5)
+            return [SimpleNamespace(name='models/gemini-2.5-pro')]
+        self.genai.list_models.side_effect = blocked_list_models
+
+        clock = mock.Mock(monotonic=mock.Mock(return_value=time.monotonic() + 61))
+        with mock.patch('ai_services.clients.time', clock):
+            # Le choix périmé est renvoyé tout de suite, un seul rafraîchissement est lancé
+            self.assertEqual(gemini_clients.select_model(self.PREFERRED, self.FALLBACK), 'models/gemini-1.5-pro')
+            self.assertEqual(gemini_clients.select_model(self.PREFERRED, self.FALLBACK), 'models/gemini-1.5-pro')
+            release.set()
+            deadline = time.monotonic() + 5
+            while gemini_clients._refreshing and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(self.genai.list_models.call_count, 2)
+        self.assertEqual(gemini_clients.select_model(self.PREFERRED, self.FALLBACK), 'models/gemini-2.5-pro')
+
+
+@override_settings(AI_JOBS_CONFIG={'SERVICE': 'ai_services.stub_service.StubAIService'})
+class AIJobTests(APITestCase):
+    """File des appels IA exécutés par le worker, avec le backend factice"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='candidat@example.ci', username='candidat', password='motdepasse-123')
+        self.opportunity = Opportunity.objects.create(
+            title="Développeur Python", description="API Django", organization="Orange CI",
+            opportunity_type='job', creator=self.user, status='published'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_endpoint_accepts_job_with_status_location(self):
+        response = self.client.post(reverse('ai-interview-prep'), {'opportunity_id': str(self.opportunity.pk)})
+
+        self.assertEqual(response.status_code, 202)
+        job = AIJob.objects.get()
+        self.assertEqual(response.data['job_id'], job.pk)
+        self.assertEqual(response['Location'], response.data['status_url'])
+        self.assertTrue(response['Location'].endswith(reverse('ai-job-status', args=[job.pk])))
+
+    def test_invalid_opportunity_id_is_rejected(self):
+        response = self.client.post(reverse('ai-interview-prep'), {'opportunity_id': 'pas-un-uuid'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(reverse('ai-interview-prep'), {'opportunity_id': str(uuid.uuid4())})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(AIJob.objects.exists())
+
+    def test_identical_pending_job_is_reused(self):
+        first = jobs.enqueue(self.user, 'career_advice', career_goals='Data scientist')
+
+        self.assertEqual(jobs.enqueue(self.user, 'career_advice', career_goals='Data scientist'), first)
+        self.assertNotEqual(jobs.enqueue(self.user, 'career_advice', career_goals='Développeur'), first)
+        AIJob.objects.filter(pk=first.pk).update(status='succeeded')
+        self.assertNotEqual(jobs.enqueue(self.user, 'career_advice', career_goals='Data scientist'), first)
+
+    def test_run_next_records_success_and_failure(self):
+        succeeded = jobs.enqueue(self.user, 'interview_prep', opportunity_id=str(self.opportunity.pk))
+        failed = jobs.enqueue(self.user, 'interview_prep', opportunity_id=str(uuid.uuid4()))
+
+        self.assertEqual(jobs.run_next().pk, succeeded.pk)
+        self.assertEqual(jobs.run_next().pk, failed.pk)
+        self.assertIsNone(jobs.run_next())
+
+        succeeded.refresh_from_db()
+        failed.refresh_from_db()
+        self.assertEqual((succeeded.status, succeeded.attempts), ('succeeded', 1))
+        self.assertIn('likely_questions', succeeded.result['interview_prep'])
+        self.assertEqual((failed.status, failed.error), ('failed', 'Opportunité introuvable'))
+
+    def test_empty_interview_prep_fails_the_job(self):
+        job = jobs.enqueue(self.user, 'interview_prep', opportunity_id=str(self.opportunity.pk))
+        with mock.patch('ai_services.stub_service.StubAIService.generate_interview_prep', return_value={}):
+            jobs.run_next()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNone(job.result)
+        self.assertEqual(job.error, "Impossible de préparer l'entretien pour le moment")
+
+    def test_stale_jobs_are_requeued_then_failed(self):
+        job = jobs.enqueue(self.user, 'career_advice')
+        jobs.claim()
+        later = timezone.now() + timedelta(seconds=jobs.get_config('LEASE') + 1)
+
+        self.assertEqual(jobs.recover_stale(timezone.now()), (0, 0))
+        self.assertEqual(jobs.recover_stale(later), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+
+        jobs.claim()
+        self.assertEqual(jobs.recover_stale(later + timedelta(seconds=jobs.get_config('LEASE') + 1)), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_purge_deletes_only_old_finished_jobs(self):
+        old = jobs.enqueue(self.user, 'career_advice')
+        jobs.run_next()
+        pending = jobs.enqueue(self.user, 'career_advice', career_goals='Data scientist')
+        later = timezone.now() + timedelta(seconds=jobs.get_config('RETENTION') + 1)
+
+        self.assertEqual(jobs.purge(timezone.now()), 0)
+        self.assertEqual(jobs.purge(later), 1)
+        self.assertEqual(list(AIJob.objects.values_list('pk', flat=True)), [pending.pk])
+        self.assertFalse(AIJob.objects.filter(pk=old.pk).exists())
+
+    def test_only_owner_reads_job_status(self):
+        job = jobs.enqueue(self.user, 'career_advice')
+        jobs.run_next()
+        url = reverse('ai-job-status', args=[job.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'succeeded')
+        self.assertIn('career_advice', response.data['result'])
+
+        other = User.objects.create_user(email='autre@example.ci', username='autre', password='motdepasse-123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.get(url).status_code, (401, 403))
+
+    def test_inline_mode_runs_new_jobs_after_commit(self):
+        class ImmediateThread:
+            def __init__(self, target, args, **kwargs):
+                self.target, self.args = target, args
+
+            def start(self):
+                self.target(*self.args)
+
+        with override_settings(AI_JOBS_CONFIG={'SERVICE': 'ai_services.stub_service.StubAIService', 'INLINE': True}), \
+                mock.patch('ai_services.jobs.threading.Thread', ImmediateThread), \
+                mock.patch('ai_services.jobs.connection'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('ai-career-advice'), {'career_goals': 'Data scientist'})
+                self.assertEqual(AIJob.objects.get().status, 'pending')  # rien avant la validation
+
+            job = AIJob.objects.get()
+            self.assertEqual((job.status, job.attempts), ('succeeded', 1))
+            self.assertEqual(self.client.get(response['Location']).data['status'], 'succeeded')
+
+            # Job déjà réservé par le worker : le thread ne le relance pas
+            jobs.run_inline(job.pk)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, 1)
+
+
+@override_settings(GEMINI_API_KEY='cle-de-test', AI_CACHE_CONFIG={'ENABLED': False})
+class GeminiTransportTests(TestCase):
+    """Appels passant par un vrai ``GenerativeModel`` du SDK, seul le client de transport est simulé"""
+
+    def setUp(self):
+        gemini_clients.reset()
+        gemini_guard.reset()
+        self.addCleanup(gemini_clients.reset)
+        self.addCleanup(gemini_guard.reset)
+        self.transport = mock.Mock()
+        self.transport.generate_content.side_effect = lambda request, **options: protos.GenerateContentResponse(
+            candidates=[{'content': {'parts': [{'text': self.text}], 'role': 'model'}, 'finish_reason': 1}]
+        )
+        patcher = mock.patch(
+            'google.generativeai.generative_models.client.get_default_generative_client', return_value=self.transport
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timeout_reaches_the_transport_client(self):
+        self.text = '{"career_assessment": {"strengths": ["python"]}}'
+
+        advice = GeminiAIService().generate_career_advice({'skills': ['python']}, 'Data scientist')
+
+        self.assertEqual(advice, {'strengths': ['python']})
+        request, options = self.transport.generate_content.call_args
+        self.assertEqual(options, {'timeout': get_timeout('career_advice')})
+        self.assertIn('Data scientist', request[0].contents[0].parts[0].text)
+
+    def test_chat_goes_through_the_sdk(self):
+        self.text = "Bonjour, voici mes conseils."
+        user = User.objects.create_user(email='chat@example.ci', username='chat', password='motdepasse-123')
+
+        with mock.patch.object(gemini_clients, 'select_model', return_value='models/gemini-1.5-flash'):
+            result = GeminiChatService().send_message(user, "Comment préparer un entretien ?")
+
+        self.assertEqual(result['response'], "Bonjour, voici mes conseils.")
+        self.assertEqual(self.transport.generate_content.call_args[1], {'timeout': get_timeout('chat')})
+
+
+class TransientError(Exception):
+    code = 503
+
+
+class RejectedRequest(Exception):
+    code = 400
+
+
+@override_settings(AI_RESILIENCE_CONFIG={
+    'MAX_CONCURRENCY': 1, 'ACQUIRE_TIMEOUT': 0, 'MAX_RETRIES': 2, 'MIN_CALLS': 2, 'OPEN_SECONDS': 30,
+})
+class ResilientCallerTests(TestCase):
+    """Disjoncteur, limite de concurrence et nouvelles tentatives des appels Gemini"""
+
+    def setUp(self):
+        self.clock = mock.Mock(monotonic=mock.Mock(return_value=1000.0))
+        patcher = mock.patch('ai_services.resilience.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.caller = ResilientCaller('test')
+
+    def test_breaker_opens_then_closes_after_a_single_probe(self):
+        breaker = CircuitBreaker('test')
+        breaker.record(False)
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        self.clock.monotonic.return_value = 1030.0
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.transitions, {'open': 1, 'half_open': 1, 'closed': 1})
+
+    def test_failed_probe_reopens_the_breaker(self):
+        with self.settings(AI_RESILIENCE_CONFIG={'MIN_CALLS': 1, 'MAX_RETRIES': 0}):
+            with self.assertRaises(TransientError):
+                self.caller.call('chat', mock.Mock(side_effect=TransientError))
+            fn = mock.Mock()
+            with self.assertRaises(CircuitOpen):
+                self.caller.call('chat', fn)
+            fn.assert_not_called()
+
+            self.clock.monotonic.return_value = 1030.0
+            with self.assertRaises(TransientError):
+                self.caller.call('chat', mock.Mock(side_effect=TransientError))
+        self.assertEqual(self.caller.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.caller.breaker.opened_at, 1030.0)
+
+    def test_full_semaphore_rejects_and_releases_the_probe(self):
+        self.caller.breaker.state, self.caller.breaker.opened_at = CircuitBreaker.OPEN, 900.0
+        self.caller.semaphore.acquire()
+
+        with self.assertRaises(Overloaded):
+            self.caller.call('chat', mock.Mock())
+        self.assertEqual(self.caller.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.caller.breaker.allow())
+        self.assertEqual(self.caller.stats()['methods']['chat']['rejected'], 1)
+
+    @override_settings(AI_RESILIENCE_CONFIG={'MAX_RETRIES': 2, 'MIN_CALLS': 10})
+    def test_only_transient_errors_are_retried(self):
+        fn = mock.Mock(side_effect=[TransientError(), ConnectionError(), 'réponse'])
+        self.assertEqual(self.caller.call('chat', fn), 'réponse')
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(self.clock.sleep.call_count, 2)
+        fn.assert_called_with(timeout=30)
+
+        self.clock.sleep.reset_mock()
+        fn = mock.Mock(side_effect=ValueError("prompt refusé"))
+        with self.assertRaises(ValueError):
+            self.caller.call('chat', fn)
+        self.assertEqual(fn.call_count, 1)
+        self.clock.sleep.assert_not_called()
+
+        fn = mock.Mock(side_effect=TransientError)
+        with self.assertRaises(TransientError):
+            self.caller.call('recommendations', fn)
+        self.assertEqual(fn.call_count, 3)
+
+    def test_errors_raised_without_a_response_count_as_failures(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.caller.call('chat', mock.Mock(side_effect=ValueError("Unknown field")))
+
+        self.assertEqual(self.caller.breaker.state, CircuitBreaker.OPEN)
+
+    def test_stats(self):
+        self.caller.call('chat', lambda timeout: 'ok')
+        with self.assertRaises(RejectedRequest):
+            self.caller.call('chat', mock.Mock(side_effect=RejectedRequest))
+
+        stats = self.caller.stats()
+        self.assertEqual(stats['breaker']['state'], CircuitBreaker.CLOSED)
+        self.assertEqual(stats['breaker']['calls_in_window'], 2)
+        self.assertEqual(stats['breaker']['error_rate'], 0.0)
+        self.assertEqual((stats['in_flight'], stats['max_concurrency']), (0, 1))
+        self.assertEqual(stats['methods'], {'chat': {
+            'calls': 2, 'errors': 1, 'retries': 0, 'rejected': 0, 'short_circuited': 0,
+            'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0,
+        }})
+
+    def test_reset_during_a_call_keeps_semaphores_consistent(self):
+        def reset_midway(timeout):
+            self.caller.reset()
+            return 'ok'
+
+        self.assertEqual(self.caller.call('chat', reset_midway), 'ok')
+        self.assertTrue(self.caller.semaphore.acquire(timeout=0))
@@ -1,9 +1,11 @@
 # backend/ai_services/urls.py
 from django.urls import path
-from .views import AIRecommendationsView, AICareerAdviceView, AIInterviewPrepView
+from .views import AIRecommendationsView, AICareerAdviceView, AIInterviewPrepView, AIJobStatusView, AIMetricsView
 
 urlpatterns = [
     path('recommendations/', AIRecommendationsView.as_view(), name='ai-recommendations'),
     path('career-advice/', AICareerAdviceView.as_view(), name='ai-career-advice'),
     path('interview-prep/', AIInterviewPrepView.as_view(), name='ai-interview-prep'),
-]
\ No newline at end of file
+    path('jobs/<uuid:pk>/', AIJobStatusView.as_view(), name='ai-job-status'),
+    path('metrics/', AIMetricsView.as_view(), name='ai-metrics'),
+]
@@ -1,162 +1,94 @@
 # backend/ai_services/views.py
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from opportunities.models import Opportunity
-from .gemini_service import GeminiAIService
+from . import jobs
+from .cache import response_cache
+from .models import AIJob
+from .resilience import gemini_guard
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+def job_accepted(request, job):
+    """Réponse 202 : le job est en file, son état se consulte sur status_url"""
+    status_url = request.build_absolute_uri(reverse('ai-job-status', args=[job.pk]))
+    return Response(
+        {'job_id': job.pk, 'status': job.status, 'status_url': status_url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': status_url, 'Retry-After': str(jobs.get_config('RETRY_AFTER'))}
+    )
+
 class AIRecommendationsView(APIView):
-    """API pour les recommandations IA via Gemini"""
+    """API pour les recommandations IA via Gemini (exécutées par le worker)"""
     permission_classes = [IsAuthenticated]
-    
+
     def get(self, request):
-        try:
-            user = request.user
-            
-            # Récupérer le profil utilisateur
-            user_profile = {
-                'name': user.get_full_name(),
-                'education_level': getattr(user, 'education_level', ''),
-                'institution': getattr(user, 'institution', ''),
-                'skills': user.profile.get_skills_list() if hasattr(user, 'profile') else [],
-                'interests': user.profile.get_interests_list() if hasattr(user, 'profile') else [],
-                'location': f"{user.city}, {user.country}" if user.city else user.country,
-                'experience': 'Débutant',  # À adapter selon votre modèle
-            }
-            
-            # Récupérer les opportunités disponibles
-            opportunities = list(
-                Opportunity.objects.filter(status='published')
-                .exclude(user_relations__user=user, user_relations__relation_type='applied')
-                .values('id', 'title', 'organization', 'category', 'location', 'description', 'education_level')[:50]
-            )
-            
-            if not opportunities:
-                return Response({
-                    'recommendations': [],
-                    'message': 'Aucune opportunité disponible pour le moment.'
-                })
-            
-            # Utiliser Gemini pour les recommandations
-            gemini_service = GeminiAIService()
-            recommendations = gemini_service.get_opportunity_recommendations(
-                user_profile=user_profile,
-                opportunities=opportunities,
-                limit=10
-            )
-            
-            # Enrichir avec les données complètes des opportunités
-            enriched_recommendations = []
-            for rec in recommendations:
-                try:
-                    opp = Opportunity.objects.get(id=rec['opportunity_id'])
-                    enriched_recommendations.append({
-                        'id': opp.id,
-                        'title': opp.title,
-                        'organization': opp.organization,
-                        'category': opp.category.name if opp.category else 'Autre',
-                        'location': opp.location,
-                        'deadline': opp.deadline,
-                        'slug': opp.slug,
-                        'match_score': rec.get('match_score', 0.5),
-                        'match_reason': rec.get('match_reason', 'Profil compatible'),
-                        'key_advantages': rec.get('key_advantages', [])
-                    })
-                except Opportunity.DoesNotExist:
-                    continue
-            
-            return Response({
-                'recommendations': enriched_recommendations,
-                'total': len(enriched_recommendations)
-            })
-            
-        except Exception as e:
-            logger.error(f"Erreur AI recommendations: {str(e)}")
-            return Response(
-                {'error': 'Erreur lors de la génération des recommandations'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return job_accepted(request, jobs.enqueue(request.user, 'recommendations'))
 
 class AICareerAdviceView(APIView):
-    """API pour les conseils de carrière IA"""
+    """API pour les conseils de carrière IA (exécutés par le worker)"""
     permission_classes = [IsAuthenticated]
-    
+
     def post(self, request):
-        try:
-            user = request.user
-            career_goals = request.data.get('career_goals', '')
-            
-            user_profile = {
-                'name': user.get_full_name(),
-                'education_level': getattr(user, 'education_level', ''),
-                'institution': getattr(user, 'institution', ''),
-                'skills': user.profile.get_skills_list() if hasattr(user, 'profile') else [],
-                'interests': user.profile.get_interests_list() if hasattr(user, 'profile') else [],
-                'location': f"{user.city}, {user.country}" if user.city else user.country,
-            }
-            
-            gemini_service = GeminiAIService()
-            advice = gemini_service.generate_career_advice(user_profile, career_goals)
-            
-            if not advice:
-                return Response(
-                    {'error': 'Impossible de générer des conseils pour le moment'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            
-            return Response({'career_advice': advice})
-            
-        except Exception as e:
-            logger.error(f"Erreur career advice: {str(e)}")
-            return Response(
-                {'error': 'Erreur lors de la génération des conseils'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        career_goals = request.data.get('career_goals', '')
+        return job_accepted(request, jobs.enqueue(request.user, 'career_advice', career_goals=career_goals))
 
 class AIInterviewPrepView(APIView):
-    """API pour la préparation d'entretien IA"""
+    """API pour la préparation d'entretien IA (exécutée par le worker)"""
     permission_classes = [IsAuthenticated]
-    
+
     def post(self, request):
+        opportunity_id = request.data.get('opportunity_id')
+        if not opportunity_id:
+            return Response(
+                {'error': 'opportunity_id requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
-            opportunity_id = request.data.get('opportunity_id')
-            if not opportunity_id:
-                return Response(
-                    {'error': 'opportunity_id requis'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            opportunity = get_object_or_404(Opportunity, id=opportunity_id)
-            user = request.user
-            
-            # Préparer les données
-            opportunity_data = {
-                'title': opportunity.title,
-                'organization': opportunity.organization,
-                'description': opportunity.description,
-                'category': opportunity.category.name if opportunity.category else 'Autre'
-            }
-            
-            user_profile = {
-                'name': user.get_full_name(),
-                'education_level': getattr(user, 'education_level', ''),
-                'skills': user.profile.get_skills_list() if hasattr(user, 'profile') else [],
-                'experience': 'Débutant'  # À adapter
-            }
-            
-            gemini_service = GeminiAIService()
-            prep = gemini_service.generate_interview_prep(opportunity_data, user_profile)
-            
-            return Response({'interview_prep': prep})
-            
-        except Exception as e:
-            logger.error(f"Erreur interview prep: {str(e)}")
+            opportunity_id = uuid.UUID(str(opportunity_id))
+        except ValueError:
             return Response(
-                {'error': 'Erreur lors de la préparation d\'entretien'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+                {'error': 'opportunity_id invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        opportunity = get_object_or_404(Opportunity, id=opportunity_id)
+        return job_accepted(request, jobs.enqueue(request.user, 'interview_prep', opportunity_id=str(opportunity.pk)))
+
+class AIJobStatusView(APIView):
+    """État d'un job IA ; contient le résultat une fois terminé"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(AIJob, pk=pk, user=request.user)
+        data = {
+            'job_id': job.pk,
+            'kind': job.kind,
+            'status': job.status,
+            'created_at': job.created_at,
+            'finished_at': job.finished_at,
+        }
+        if job.status == 'succeeded':
+            data['result'] = job.result
+        elif job.status == 'failed':
+            data['error'] = job.error
+
+        headers = {} if job.is_finished else {'Retry-After': str(jobs.get_config('RETRY_AFTER'))}
+        return Response(data, headers=headers)
+
+class AIMetricsView(APIView):
+    """Métriques du processus : disjoncteur et latences Gemini, cache des réponses"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'gemini': gemini_guard.stats(),
+            'cache': response_cache.stats(),
+        })
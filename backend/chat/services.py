@@ -1,6 +1,6 @@
 # backend/chat/services.py
-import google.generativeai as genai
-from django.conf import settings
+from ai_services.clients import gemini_clients
+from ai_services.resilience import GeminiUnavailable, gemini_guard
 from .models import ChatConversation, ChatMessage
 import time
 from typing import List, Dict
@@ -18,19 +18,15 @@ class GeminiChatService:
         "models/gemini-1.5-pro-latest",
         "models/gemini-1.5-pro",
     ]
+    FALLBACK_MODEL = "models/gemini-1.5-pro-latest"
 
     def __init__(self):
-        """Initialisation du service Gemini"""
-        api_key = getattr(settings, "GEMINI_API_KEY", None)
-        if not api_key:
-            raise ValueError("⚠️ GEMINI_API_KEY non défini dans settings.py")
-
-        genai.configure(api_key=api_key)
-        self.model_name = self._select_best_model()
-        self.model = genai.GenerativeModel(self.model_name)
-
-        logger.info(f"✅ Gemini AI service initialisé avec le modèle: {self.model_name}")
+        """
+        Initialisation du service Gemini
 
+        Aucun appel réseau ici : le modèle est choisi et créé une fois pour tout le
+        processus (voir ai_services/clients.py), au premier message envoyé.
+        """
         # Contexte système par défaut
         self.system_context = """
         Tu es l'assistant IA d'OpportuCI, une plateforme qui aide les jeunes Ivoiriens 
@@ -58,19 +54,14 @@ class GeminiChatService:
     # -------------------------------
     # 🔹 Sélection automatique du modèle
     # -------------------------------
-    def _select_best_model(self) -> str:
-        try:
-            available_models = [m.name for m in genai.list_models()]
-
-            for model in self.PREFERRED_MODELS:
-                if model in available_models:
-                    return model
+    @property
+    def model_name(self) -> str:
+        """Meilleur modèle disponible, choisi une fois par processus et rafraîchi en arrière-plan"""
+        return gemini_clients.select_model(self.PREFERRED_MODELS, self.FALLBACK_MODEL)
 
-            raise ValueError("⚠️ Aucun modèle compatible trouvé dans l'API Gemini")
-        except Exception as e:
-            logger.error(f"Erreur lors de la sélection du modèle: {e}")
-            # Fallback forcé pour éviter un crash
-            return "models/gemini-1.5-pro-latest"
+    @property
+    def model(self):
+        return gemini_clients.get_model(self.model_name)
 
     # -------------------------------
     # 🔹 Gestion des conversations
@@ -130,9 +121,25 @@ class GeminiChatService:
             """
 
             # Appel API Gemini
+            model_name = self.FALLBACK_MODEL
             try:
-                response = self.model.generate_content(full_prompt)
+                model_name, model = gemini_clients.get_preferred_model(
+                    self.PREFERRED_MODELS, self.FALLBACK_MODEL
+                )
+                response = gemini_guard.call(
+                    "chat",
+                    lambda timeout: model.generate_content(
+                        full_prompt, request_options={"timeout": timeout}
+                    ),
+                )
                 ai_response = response.text
+            except GeminiUnavailable as api_error:
+                # Disjoncteur ouvert ou trop d'appels en cours : réponse immédiate
+                logger.warning(f"Gemini indisponible: {api_error}")
+                ai_response = (
+                    "⚠️ L'assistant est très sollicité en ce moment. "
+                    "Réessayez dans quelques instants."
+                )
             except Exception as api_error:
                 logger.error(f"Gemini API error: {api_error}")
                 ai_response = (
@@ -147,7 +154,7 @@ class GeminiChatService:
                 role="assistant",
                 content=ai_response,
                 response_time_ms=response_time,
-                model_version=self.model_name,
+                model_version=model_name,
             )
 
             # Génération auto du titre
@@ -0,0 +1,148 @@
+# core/conditional.py
+"""
+Requêtes GET conditionnelles (ETag / Last-Modified) pour les ViewSets en lecture.
+
+Avant de sérialiser, une seule requête agrégée (``Max('updated_at')``, ``Count('pk')``
+et les agrégats propres à la vue) résume l'état des données renvoyées. Combinée à une
+version des données propres à l'utilisateur (favoris, progression…), elle donne l'ETag.
+Si le client renvoie le même ETag (``If-None-Match``), la réponse est un ``304`` vide et
+le sérialiseur n'est pas exécuté.
+
+Les réponses qui dépendent de l'heure (temps restant avant une date limite…) ajoutent
+à l'état une tranche horaire (``conditional_time_granularity``) : l'ETag change alors au
+moins une fois par tranche, même sans écriture en base.
+
+``Last-Modified`` n'est envoyé que sur le détail : pour une liste, une suppression ne
+change pas le maximum des ``updated_at`` (elle change en revanche le ``Count`` de l'ETag).
+"""
+import calendar
+import hashlib
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def _timestamp(value):
+    return calendar.timegm(value.utctimetuple()) if value else None
+
+
+class ConditionalGetMixin:
+    """
+    Ajoute ETag / Last-Modified aux actions ``list`` et ``retrieve`` d'un ViewSet
+
+    Attributs :
+        conditional_aggregates: agrégats supplémentaires qui changent le contenu renvoyé
+            (compteurs, objets liés), en plus de ``Max('updated_at')`` et ``Count('pk')``
+        conditional_time_granularity: durée en secondes d'une tranche horaire incluse dans
+            l'état, pour les réponses calculées à partir de l'heure courante (None : aucune)
+    """
+    conditional_aggregates = {}
+    conditional_time_granularity = None
+
+    def get_conditional_aggregates(self):
+        aggregates = {
+            'last_modified': Max('updated_at'),
+            'count': Count('pk', distinct=True),
+        }
+        aggregates.update(self.conditional_aggregates)
+        return aggregates
+
+    def get_user_version(self):
+        """
+        Version des données propres à l'utilisateur courant incluses dans la réponse
+
+        Returns:
+            Dictionnaire JSON-sérialisable (une clé 'last_modified' facultative), ou None
+        """
+        return None
+
+    def get_conditional_state(self, queryset):
+        if not queryset.query.is_sliced:
+            queryset = queryset.order_by()
+        state = {
+            'view': self.__class__.__name__,
+            'action': self.action,
+            'path': self.request.get_full_path(),
+            'data': queryset.aggregate(**self.get_conditional_aggregates()),
+        }
+        if self.conditional_time_granularity:
+            state['clock'] = int(time.time() // self.conditional_time_granularity)
+        user_version = self.get_user_version()
+        if user_version is not None:
+            state['user'] = user_version
+        return state
+
+    def get_validators(self, state, with_last_modified):
+        digest = hashlib.md5(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()
+        etag = f'"{digest}"'
+
+        last_modified = None
+        if with_last_modified:
+            # Dates des objets renvoyés et des objets liés, données de l'utilisateur, tranche horaire
+            dates = [value for value in state['data'].values() if isinstance(value, datetime)]
+            dates.append((state.get('user') or {}).get('last_modified'))
+            if 'clock' in state:
+                dates.append(datetime.fromtimestamp(
+                    state['clock'] * self.conditional_time_granularity, tz=dt_timezone.utc
+                ))
+            dates = [date for date in dates if date]
+            last_modified = _timestamp(max(dates)) if dates else None
+        return etag, last_modified
+
+    def set_conditional_headers(self, response, state, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        if 'user' in state:
+            # Contenu différent selon l'utilisateur : les caches partagés doivent le savoir
+            patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+    def conditional(self, queryset, render, with_last_modified=False):
+        """Répondre 304 si les validateurs du client correspondent, sinon appeler ``render()``"""
+        state = self.get_conditional_state(queryset)
+        etag, last_modified = self.get_validators(state, with_last_modified)
+
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render()
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            self.set_conditional_headers(response, state, etag, last_modified)
+        return response
+
+    def perform_retrieve(self, instance):
+        """Point d'extension appelé à chaque consultation, y compris si la réponse est un 304"""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Une pagination peut restreindre l'agrégat aux lignes de la page (ex. pagination par curseur)
+        window = queryset
+        if hasattr(self.paginator, 'get_conditional_queryset'):
+            window = self.paginator.get_conditional_queryset(queryset, request)
+
+        def render():
+            # Même rendu que ListModelMixin.list, sans filtrer une seconde fois
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+
+        return self.conditional(window, render)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        self.perform_retrieve(instance)
+
+        def render():
+            serializer = self.get_serializer(instance)
+            return Response(serializer.data)
+
+        queryset = self.get_queryset().filter(pk=instance.pk)
+        return self.conditional(queryset, render, with_last_modified=True)
@@ -0,0 +1,181 @@
+# core/slugs.py
+"""
+Attribution de slugs uniques partagée par les modèles (opportunités, cours, formations, catégories).
+
+Au lieu de tester ``slug``, ``slug-1``, ``slug-2``… avec une requête par essai, on lit en une
+seule requête tous les slugs de la forme ``base`` ou ``base-N`` (recherche par préfixe sur
+l'index unique du champ, restreinte par une expression régulière aux suffixes numériques :
+``stage-marketing-abidjan`` n'est pas lu pour la base ``stage``) et on prend le plus petit
+suffixe libre. Quand la base remplit le
+champ, le suffixe remplace la fin de la base : la recherche porte alors sur la base
+raccourcie. Deux sauvegardes
+concurrentes peuvent encore choisir le même slug : la contrainte d'unicité tranche et
+``UniqueSlugMixin`` recommence alors avec un nouveau suffixe.
+"""
+import re
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+MAX_SAVE_ATTEMPTS = 5
+BULK_QUERY_CHUNK = 100  # nombre de préfixes par requête lors d'une attribution groupée
+MAX_SUFFIX_DIGITS = 6  # longueur de suffixe prise en compte lors de la recherche par préfixe
+SUFFIX_PATTERN = re.compile(r'^.*-(\d+)$')
+
+
+def _max_length(model, field):
+    return model._meta.get_field(field).max_length or 50
+
+
+def base_slug(model, value, field='slug'):
+    """Slug de base (tronqué à la taille du champ), le nom du modèle si le texte ne donne rien"""
+    slug = slugify(value or '') or model._meta.model_name
+    return slug[:_max_length(model, field)].strip('-')
+
+
+def _with_suffix(base, number, max_length):
+    """``base-N`` en raccourcissant la base si nécessaire pour respecter ``max_length``"""
+    if not number:
+        return base
+    suffix = f'-{number}'
+    return base[:max_length - len(suffix)].rstrip('-') + suffix
+
+
+def _suffix_regex(base, max_length):
+    """
+    Expression régulière des slugs ``base`` et ``base-N``
+
+    Si la base remplit (presque) le champ, le suffixe est ajouté à une base raccourcie
+    (``_with_suffix``), d'autant plus courte que le suffixe a de chiffres.
+    """
+    digits_by_stem = {}
+    for digits in range(1, MAX_SUFFIX_DIGITS + 1):
+        stem = _with_suffix(base, 10 ** (digits - 1), max_length).rsplit('-', 1)[0]
+        digits_by_stem.setdefault(stem, []).append(digits)
+
+    alternatives = [re.escape(base)]
+    for index, (stem, digits) in enumerate(digits_by_stem.items()):
+        last = index == len(digits_by_stem) - 1
+        quantifier = f'{{{digits[0]},}}' if last else f'{{{digits[0]},{digits[-1]}}}'
+        alternatives.append(f'{re.escape(stem)}-[0-9]{quantifier}')
+    return f"^({'|'.join(alternatives)})$"
+
+
+def _prefix_query(field, base, max_length):
+    """
+    Slugs pouvant entrer en conflit avec ``base`` ou ``base-N``
+
+    Le préfixe (la base la plus courte utilisée) sert l'index ; l'expression régulière
+    écarte les slugs du même préfixe sans suffixe numérique.
+    """
+    stem = _with_suffix(base, 10 ** (MAX_SUFFIX_DIGITS - 1), max_length).rsplit('-', 1)[0]
+    return Q(**{f'{field}__startswith': stem}) & Q(**{f'{field}__regex': _suffix_regex(base, max_length)})
+
+
+def _taken_suffixes(slugs, base, max_length):
+    """Suffixes déjà utilisés pour ``base`` (0 représente le slug nu)"""
+    taken = set()
+    for slug in slugs:
+        if slug == base:
+            taken.add(0)
+            continue
+        match = SUFFIX_PATTERN.match(slug)
+        if match and _with_suffix(base, int(match.group(1)), max_length) == slug:
+            taken.add(int(match.group(1)))
+    return taken
+
+
+def _next_suffix(taken):
+    """Plus petit suffixe libre (0 si le slug nu est disponible)"""
+    number = 0
+    while number in taken:
+        number += 1
+    return number
+
+
+def allocate_slug(model, value, field='slug', exclude_pk=None):
+    """
+    Trouver un slug libre pour ``value`` en une requête
+
+    Args:
+        model: modèle cible
+        value: texte source (titre, nom)
+        field: nom du champ slug
+        exclude_pk: instance à ignorer (modification d'un objet existant)
+    """
+    base = base_slug(model, value, field)
+    max_length = _max_length(model, field)
+    queryset = model._default_manager.filter(_prefix_query(field, base, max_length))
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    taken = _taken_suffixes(queryset.values_list(field, flat=True), base, max_length)
+    return _with_suffix(base, _next_suffix(taken), max_length)
+
+
+def allocate_slugs(model, values, field='slug'):
+    """
+    Attribuer des slugs uniques à un lot (imports), une requête par paquet de préfixes
+
+    Les slugs sont aussi uniques entre eux : deux titres identiques du lot reçoivent
+    ``base`` puis ``base-1`` (ou la suite des suffixes déjà pris en base).
+
+    Returns:
+        Liste de slugs dans l'ordre de ``values``
+    """
+    values = list(values)
+    max_length = _max_length(model, field)
+    bases = [base_slug(model, value, field) for value in values]
+    distinct_bases = list(dict.fromkeys(bases))
+
+    taken = defaultdict(set)
+    for start in range(0, len(distinct_bases), BULK_QUERY_CHUNK):
+        chunk = distinct_bases[start:start + BULK_QUERY_CHUNK]
+        query = Q()
+        for base in chunk:
+            query |= _prefix_query(field, base, max_length)
+        existing = list(model._default_manager.filter(query).values_list(field, flat=True))
+        for base in chunk:
+            taken[base] = _taken_suffixes(existing, base, max_length)
+
+    slugs = []
+    for base in bases:
+        number = _next_suffix(taken[base])
+        taken[base].add(number)
+        slugs.append(_with_suffix(base, number, max_length))
+    return slugs
+
+
+class UniqueSlugMixin:
+    """
+    Génère un slug unique à la première sauvegarde à partir de ``slug_source_field``
+
+    En cas de collision concurrente (IntegrityError sur le slug), la sauvegarde est
+    rejouée dans un point de sauvegarde avec un nouveau slug.
+    """
+    slug_source_field = 'title'
+    slug_field_name = 'slug'
+
+    def _slug_is_taken(self, slug):
+        return type(self)._default_manager.filter(
+            **{self.slug_field_name: slug}
+        ).exclude(pk=self.pk).exists()
+
+    def save(self, *args, **kwargs):
+        if getattr(self, self.slug_field_name):
+            return super().save(*args, **kwargs)
+
+        model = type(self)
+        source = getattr(self, self.slug_source_field)
+        for attempt in range(MAX_SAVE_ATTEMPTS):
+            slug = allocate_slug(model, source, self.slug_field_name)
+            setattr(self, self.slug_field_name, slug)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Autre contrainte violée, ou trop de tentatives : remonter l'erreur
+                if attempt == MAX_SAVE_ATTEMPTS - 1 or not self._slug_is_taken(slug):
+                    setattr(self, self.slug_field_name, '')
+                    raise
@@ -4,10 +4,11 @@ from django.conf import settings
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.functional import cached_property
+from core.slugs import UniqueSlugMixin
 from formations.models import Formation
 
 
-class Course(models.Model):
+class Course(UniqueSlugMixin, models.Model):
     DIFFICULTY_CHOICES = (
         ('beginner', 'Débutant'),
         ('intermediate', 'Intermédiaire'),
@@ -37,18 +38,6 @@ class Course(models.Model):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            # Ensure unique slug
-            slug = base_slug
-            counter = 1
-            while Course.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
-    
     @cached_property
     def published_lessons_count(self):
         """Cached property to avoid repeated queries"""
@@ -3,7 +3,7 @@ from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Avg, Sum, Prefetch, Q
+from django.db.models import Count, Avg, Max, Sum, Prefetch, Q
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 
@@ -16,9 +16,10 @@ from .serializers import (
     UserAnswerSerializer
 )
 from .permissions import IsInstructorOrReadOnly, IsUserProgressOwner
+from core.conditional import ConditionalGetMixin
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsInstructorOrReadOnly]
@@ -27,6 +28,19 @@ class CourseViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'description', 'instructor']
     ordering_fields = ['created_at', 'title', 'order']
     lookup_field = 'slug'
+    # Lessons are counted and listed in the payload
+    conditional_aggregates = {
+        'lessons_modified': Max('lessons__updated_at'),
+        'lessons': Count('lessons', distinct=True),
+    }
+    
+    def get_user_version(self):
+        # progress_percentage depends on the user's progress
+        if not self.request.user.is_authenticated:
+            return None
+        return UserProgress.objects.filter(user=self.request.user).aggregate(
+            last_modified=Max('updated_at'), count=Count('pk')
+        )
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
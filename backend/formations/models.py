@@ -1,10 +1,12 @@
 # backend/formations/models.py
 from django.db import models
 from django.conf import settings
-from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
+from core.slugs import UniqueSlugMixin
+
+class Category(UniqueSlugMixin, models.Model):
+    slug_source_field = 'name'
 
-class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
@@ -17,14 +19,9 @@ class Category(models.Model):
 
     def __str__(self):
         return self.name
-    
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
 
 
-class Formation(models.Model):
+class Formation(UniqueSlugMixin, models.Model):
     STATUS_CHOICES = (
         ('upcoming', 'À venir'),
         ('ongoing', 'En cours'),
@@ -55,11 +52,6 @@ class Formation(models.Model):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
-    
     @property
     def current_participants_count(self):
         return self.enrollments.count()
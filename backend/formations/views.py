@@ -3,10 +3,12 @@ from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count, Max
 
 from .models import Category, Formation, Enrollment
 from .serializers import CategorySerializer, FormationListSerializer, FormationDetailSerializer, EnrollmentSerializer
 from .permissions import IsEnrollmentOwner, IsFormationInstructor
+from core.conditional import ConditionalGetMixin
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -21,9 +23,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return [permissions.IsAdminUser()]
 
 
-class FormationViewSet(viewsets.ModelViewSet):
+class FormationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Formation.objects.all()
     lookup_field = 'slug'
+    # Participant count and category name are part of the payload
+    conditional_aggregates = {
+        'participants': Count('enrollments', distinct=True),
+        'category_modified': Max('category__updated_at'),
+    }
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'is_online', 'is_free', 'status']
     search_fields = ['title', 'description', 'instructor__username']
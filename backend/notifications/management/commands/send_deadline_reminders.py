@@ -0,0 +1,16 @@
+# notifications/management/commands/send_deadline_reminders.py
+from django.core.management.base import BaseCommand
+
+from notifications.services import notify_upcoming_deadlines
+
+
+class Command(BaseCommand):
+    help = "Envoyer les rappels d'échéance des opportunités sauvegardées ou postulées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-before', type=int, default=3,
+                            help="Nombre de jours avant la date limite")
+
+    def handle(self, *args, **options):
+        notifications = notify_upcoming_deadlines(days_before=options['days_before'])
+        self.stdout.write(self.style.SUCCESS(f"{len(notifications)} rappel(s) envoyé(s)."))
@@ -34,6 +34,46 @@ def create_notification(user, title, message, notification_type, related_object=
     notification.save()
     return notification
 
+def _send_deadline_reminders(relations, days_before, now):
+    """
+    Créer les rappels d'échéance pour des relations (sélectionnées avec user et opportunity)
+
+    Un utilisateur n'est rappelé qu'une fois par opportunité et par jour, même s'il l'a
+    sauvegardée et y a postulé.
+    """
+    from datetime import timedelta
+    from opportunities.models import Opportunity
+
+    relations = list(relations)
+    if not relations:
+        return []
+
+    opportunity_ids = {str(relation.opportunity_id) for relation in relations}
+    already_sent = set(Notification.objects.filter(
+        notification_type='deadline_reminder',
+        object_id__in=opportunity_ids,
+        created_at__gte=now - timedelta(days=1),
+    ).values_list('user_id', 'object_id'))
+
+    content_type = ContentType.objects.get_for_model(Opportunity)
+    notifications = []
+    for relation in relations:
+        key = (relation.user_id, str(relation.opportunity_id))
+        if key in already_sent:
+            continue
+        already_sent.add(key)
+        opportunity = relation.opportunity
+        notifications.append(Notification(
+            user=relation.user,
+            title=f"Rappel: {opportunity.title}",
+            message=f"L'opportunité {opportunity.title} se termine dans {days_before} jours.",
+            notification_type='deadline_reminder',
+            content_type=content_type,
+            object_id=opportunity.id,
+            extra_data={'days_remaining': days_before}
+        ))
+    return Notification.objects.bulk_create(notifications)
+
 def notify_opportunity_deadline(opportunity, days_before=3):
     """
     Envoyer des notifications pour les échéances d'opportunités
@@ -55,22 +95,36 @@ def notify_opportunity_deadline(opportunity, days_before=3):
     
     # Vérifier si c'est le moment d'envoyer la notification
     if timezone.now().date() == notification_date.date():
-        # Récupérer tous les utilisateurs ayant sauvegardé ou postulé à cette opportunité
-        users = UserOpportunity.objects.filter(
+        # Utilisateurs ayant sauvegardé ou postulé à cette opportunité, chargés avec la relation
+        relations = UserOpportunity.objects.filter(
             opportunity=opportunity,
             relation_type__in=['saved', 'applied']
-        ).values_list('user', flat=True).distinct()
-        
-        for user_id in users:
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            user = User.objects.get(id=user_id)
-            
-            create_notification(
-                user=user,
-                title=f"Rappel: {opportunity.title}",
-                message=f"L'opportunité {opportunity.title} se termine dans {days_before} jours.",
-                notification_type='deadline_reminder',
-                related_object=opportunity,
-                extra_data={'days_remaining': days_before}
-            )
\ No newline at end of file
+        ).select_related('user', 'opportunity')
+        _send_deadline_reminders(relations, days_before, timezone.now())
+
+def notify_upcoming_deadlines(days_before=3, now=None):
+    """
+    Rappeler les échéances de toutes les opportunités se terminant dans ``days_before`` jours
+    
+    Les opportunités du jour visé sont lues dans le calendrier des dates limites (table
+    jour -> opportunités en cache), sans parcourir toutes les opportunités publiées.
+    
+    Returns:
+        Liste des notifications créées
+    """
+    from django.utils import timezone
+    from datetime import timedelta
+    from opportunities import deadlines
+    from opportunities.models import UserOpportunity
+    
+    now = now or timezone.now()
+    target_day = timezone.localtime(now).date() + timedelta(days=days_before)
+    opportunity_ids = deadlines.day_buckets(target_day, 1)[target_day]
+    if not opportunity_ids:
+        return []
+    
+    relations = UserOpportunity.objects.filter(
+        opportunity_id__in=opportunity_ids,
+        relation_type__in=['saved', 'applied']
+    ).select_related('user', 'opportunity')
+    return _send_deadline_reminders(relations, days_before, now)
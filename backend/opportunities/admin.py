@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Opportunity, OpportunityCategory, UserOpportunity
+from .models import (
+    Opportunity, OpportunityCategory, UserOpportunity, Tag, OpportunityTaskRun, OpportunityFacetCount,
+    DuplicateCandidate
+)
 
 
 @admin.register(OpportunityCategory)
@@ -21,7 +24,7 @@ class OpportunityAdmin(admin.ModelAdmin):
     list_filter = ('status', 'opportunity_type', 'featured', 'is_remote', 'category')
     readonly_fields = ('created_at', 'updated_at', 'view_count', 'application_count')
     prepopulated_fields = {'slug': ('title',)}
-    autocomplete_fields = ('creator', 'category')
+    autocomplete_fields = ('creator', 'category', 'duplicate_of')
     ordering = ('-created_at',)
     date_hierarchy = 'created_at'
     fieldsets = (
@@ -31,7 +34,8 @@ class OpportunityAdmin(admin.ModelAdmin):
         ("Détails", {
             'fields': (
                 'organization', 'location', 'is_remote', 'website', 'application_link', 'contact_email',
-                'requirements', 'education_level', 'compensation', 'currency', 'tags', 'featured'
+                'requirements', 'education_level', 'compensation', 'currency', 'tags', 'featured',
+                'duplicate_of'
             )
         }),
         ("Dates", {
@@ -52,3 +56,37 @@ class UserOpportunityAdmin(admin.ModelAdmin):
     list_filter = ('relation_type', 'status')
     autocomplete_fields = ('user', 'opportunity')
     ordering = ('-created_at',)
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'opportunity_count')
+    search_fields = ('name', 'slug')
+    readonly_fields = ('opportunity_count',)
+    ordering = ('-opportunity_count', 'name')
+
+
+@admin.register(OpportunityTaskRun)
+class OpportunityTaskRunAdmin(admin.ModelAdmin):
+    list_display = ('task', 'started_at', 'finished_at', 'stats')
+    list_filter = ('task',)
+    readonly_fields = ('task', 'started_at', 'finished_at', 'stats')
+    ordering = ('-started_at',)
+
+
+@admin.register(OpportunityFacetCount)
+class OpportunityFacetCountAdmin(admin.ModelAdmin):
+    list_display = ('facet', 'value', 'count')
+    list_filter = ('facet',)
+    search_fields = ('value',)
+    readonly_fields = ('facet', 'value', 'count')
+    ordering = ('facet', '-count')
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = ('opportunity', 'original', 'similarity', 'status', 'created_at', 'reviewed_by')
+    list_filter = ('status',)
+    search_fields = ('opportunity__title', 'original__title')
+    readonly_fields = ('opportunity', 'original', 'similarity', 'created_at', 'reviewed_at', 'reviewed_by')
+    ordering = ('-similarity', '-created_at')
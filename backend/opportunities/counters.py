@@ -0,0 +1,117 @@
+# opportunities/counters.py
+"""
+Compteurs dénormalisés des opportunités (``application_count``, ``view_count``).
+
+Les incréments/décréments sont faits en base avec ``F()`` pour ne perdre aucune
+mise à jour concurrente. Une réconciliation périodique
+(``python manage.py reconcile_opportunity_counters``, tâche cron horaire
+``opportunici-reconcile-counters`` de render.yaml) recalcule les valeurs attendues
+depuis ``UserOpportunity`` en une requête agrégée et corrige les écarts :
+
+- ``application_count`` = nombre de relations « applied » ;
+- ``view_count`` >= nombre de relations « viewed » (les vues anonymes n'ont pas de
+  relation, le compteur n'est donc que relevé, jamais abaissé).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import facets, tags
+from .models import Opportunity, OpportunityTaskRun, UserOpportunity
+
+TASK_NAME = 'reconcile_counters'
+
+DEFAULT_INTERVAL = 3600  # secondes
+
+
+def get_interval():
+    return getattr(settings, 'OPPORTUNITY_COUNTERS_CONFIG', {}).get('INTERVAL', DEFAULT_INTERVAL)
+
+
+def increment_applications(opportunity_id, count=1):
+    Opportunity.objects.filter(pk=opportunity_id).update(
+        application_count=F('application_count') + count
+    )
+
+
+def recount_applications(opportunity_ids):
+    """
+    Recalculer en une requête le compteur de plusieurs opportunités (candidatures groupées)
+
+    Les relations ignorées par ``bulk_create(ignore_conflicts=True)`` (créées entre-temps
+    par une requête concurrente) ne sont pas comptées deux fois.
+    """
+    applied = UserOpportunity.objects.filter(
+        opportunity_id=OuterRef('pk'), relation_type='applied'
+    ).order_by().values('opportunity_id').annotate(total=Count('pk')).values('total')
+    Opportunity.objects.filter(pk__in=list(opportunity_ids)).update(
+        application_count=Coalesce(Subquery(applied), Value(0))
+    )
+
+
+def decrement_applications(opportunity_id, count=1):
+    # Ne jamais passer sous zéro (champ positif), la réconciliation rattrape l'écart éventuel
+    Opportunity.objects.filter(pk=opportunity_id, application_count__gte=count).update(
+        application_count=F('application_count') - count
+    )
+
+
+def drifted_counters():
+    """
+    Opportunités dont un compteur s'écarte des relations, en une requête GROUP BY
+
+    Returns:
+        Itérable de (id, application_count, applied, view_count, viewers)
+    """
+    return Opportunity.objects.annotate(
+        applied=Count('user_relations', filter=Q(user_relations__relation_type='applied')),
+        viewers=Count('user_relations', filter=Q(user_relations__relation_type='viewed')),
+    ).filter(
+        ~Q(application_count=F('applied')) | Q(view_count__lt=F('viewers'))
+    ).values_list('pk', 'application_count', 'applied', 'view_count', 'viewers').order_by()
+
+
+def reconcile_counters(now=None):
+    """
+    Corriger les compteurs dérivés
+
+    Les corrections sont appliquées sous forme d'écarts (``F() + delta``) : un incrément
+    concurrent survenu entre la lecture et l'écriture n'est pas écrasé. Une requête
+    UPDATE par couple d'écarts distinct.
+
+    Returns:
+        OpportunityTaskRun enregistré pour cette exécution
+    """
+    now = now or timezone.now()
+    run = OpportunityTaskRun.objects.create(task=TASK_NAME, started_at=now)
+
+    ids_by_delta = defaultdict(list)
+    for pk, application_count, applied, view_count, viewers in drifted_counters().iterator():
+        application_delta = applied - application_count
+        view_delta = max(viewers - view_count, 0)
+        ids_by_delta[(application_delta, view_delta)].append(pk)
+
+    stats = {'applications_fixed': 0, 'views_fixed': 0}
+    with transaction.atomic():
+        for (application_delta, view_delta), pks in ids_by_delta.items():
+            Opportunity.objects.filter(pk__in=pks).update(
+                application_count=F('application_count') + application_delta,
+                view_count=F('view_count') + view_delta,
+            )
+            if application_delta:
+                stats['applications_fixed'] += len(pks)
+            if view_delta:
+                stats['views_fixed'] += len(pks)
+
+        # Même réparation pour les compteurs de l'index des tags et des facettes
+        tags.recount_tags()
+        facets.rebuild_facets()
+
+    run.finished_at = timezone.now()
+    run.stats = stats
+    run.save(update_fields=['finished_at', 'stats'])
+    return run
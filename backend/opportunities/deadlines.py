@@ -0,0 +1,197 @@
+# opportunities/deadlines.py
+"""
+Calendrier des dates limites des opportunités publiées.
+
+Les opportunités sont regroupées par jour de date limite (fuseau local) dans une petite
+table jour -> identifiants mise en cache. Les jours manquants d'une fenêtre sont
+calculés en une requête de plage servie par l'index ``(status, deadline)``. Une
+modification de date limite ou de statut invalide les jours concernés (ancien et nouveau) ;
+les changements en masse (transitions planifiées, imports) changent la génération du cache.
+
+Utilisé par les actions ``calendar`` et ``closing_soon`` de l'API, par les rappels
+d'échéance (notifications/services.py) et par le flux iCalendar des favoris et candidatures.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Opportunity, UserOpportunity
+
+GENERATION_KEY = 'opportunities:deadlines:generation'
+
+DEFAULT_CONFIG = {
+    'CACHE_TIMEOUT': 3600,  # secondes
+    'MAX_DAYS': 92,  # largeur maximale d'une fenêtre du calendrier
+}
+
+ICAL_PRODID = '-//OpportuCI//Dates limites//FR'
+ICAL_HISTORY_DAYS = 30  # dates limites passées conservées dans le flux
+
+
+def get_config(name):
+    return getattr(settings, 'OPPORTUNITY_DEADLINES_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def local_day(value):
+    return timezone.localtime(value).date()
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+
+
+def _key(generation, day):
+    return f'opportunities:deadlines:{generation}:{day.isoformat()}'
+
+
+def day_buckets(start, days):
+    """
+    Identifiants des opportunités publiées par jour de date limite
+
+    Args:
+        start: premier jour (date)
+        days: nombre de jours de la fenêtre
+
+    Returns:
+        {date: [id, …]} pour chaque jour de la fenêtre, triés par date limite
+    """
+    all_days = [start + timedelta(days=offset) for offset in range(days)]
+    generation = _generation()
+    keys = {_key(generation, day): day for day in all_days}
+    cached = cache.get_many(list(keys))
+    buckets = {keys[key]: value for key, value in cached.items()}
+
+    missing = [day for day in all_days if day not in buckets]
+    if missing:
+        computed = defaultdict(list)
+        rows = Opportunity.objects.filter(
+            status='published',
+            deadline__gte=day_start(missing[0]),
+            deadline__lt=day_start(missing[-1] + timedelta(days=1)),
+        ).order_by('deadline', 'pk').values_list('pk', 'deadline')
+        for pk, deadline in rows:
+            computed[local_day(deadline)].append(str(pk))
+        fresh = {day: computed.get(day, []) for day in missing}
+        cache.set_many(
+            {_key(generation, day): ids for day, ids in fresh.items()},
+            timeout=get_config('CACHE_TIMEOUT')
+        )
+        buckets.update(fresh)
+
+    return {day: buckets[day] for day in all_days}
+
+
+def invalidate_days(*deadlines):
+    """Oublier les jours des dates limites données (None ignoré)"""
+    days = {local_day(deadline) for deadline in deadlines if deadline}
+    if days:
+        generation = _generation()
+        cache.delete_many([_key(generation, day) for day in days])
+
+
+def invalidate_all():
+    """Changer de génération : tous les jours seront recalculés"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # Compteur perdu : repartir d'une valeur jamais utilisée
+        cache.set(GENERATION_KEY, int(timezone.now().timestamp()), timeout=None)
+
+
+def closing_ids(start, days):
+    """Identifiants des opportunités dont la date limite tombe dans la fenêtre, par date limite"""
+    buckets = day_buckets(start, days)
+    return [pk for day in sorted(buckets) for pk in buckets[day]]
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def group_by(buckets, period):
+    """Regrouper {date: ids} par jour ou par semaine (lundi) : [(date, ids)]"""
+    if period == 'day':
+        return sorted(buckets.items())
+    weeks = defaultdict(list)
+    for day in sorted(buckets):
+        weeks[week_start(day)].extend(buckets[day])
+    return sorted(weeks.items())
+
+
+def _ical_escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ical_fold(line):
+    """Lignes de 75 octets au plus, continuées par une espace (RFC 5545)"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        size = 75 if not parts else 74
+        # Ne pas couper un caractère UTF-8 multi-octets
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(encoded[:size].decode())
+        encoded = encoded[size:]
+    return '\r\n '.join(parts)
+
+
+def _ical_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def user_deadline_rows(user, now=None):
+    """Dates limites des opportunités sauvegardées ou postulées, une ligne par opportunité"""
+    now = now or timezone.now()
+    rows = UserOpportunity.objects.filter(
+        user=user,
+        relation_type__in=['saved', 'applied'],
+        opportunity__deadline__gte=now - timedelta(days=ICAL_HISTORY_DAYS),
+    ).order_by('opportunity__deadline').values_list(
+        'opportunity_id', 'opportunity__title', 'opportunity__organization',
+        'opportunity__deadline', 'opportunity__updated_at', 'relation_type'
+    )
+    opportunities = {}
+    for pk, title, organization, deadline, updated_at, relation_type in rows:
+        entry = opportunities.setdefault(pk, {
+            'id': pk, 'title': title, 'organization': organization,
+            'deadline': deadline, 'updated_at': updated_at, 'relations': [],
+        })
+        entry['relations'].append(relation_type)
+    return list(opportunities.values())
+
+
+def ical_feed(rows, now=None):
+    """Flux iCalendar (texte) : un évènement d'un quart d'heure par date limite"""
+    now = now or timezone.now()
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{ICAL_PRODID}',
+        'CALSCALE:GREGORIAN',
+        'X-WR-CALNAME:Mes dates limites OpportuCI',
+    ]
+    for row in rows:
+        status = 'candidature envoyée' if 'applied' in row['relations'] else 'sauvegardée'
+        lines.extend([
+            'BEGIN:VEVENT',
+            f"UID:{row['id']}@opportuci",
+            f'DTSTAMP:{_ical_datetime(now)}',
+            f"LAST-MODIFIED:{_ical_datetime(row['updated_at'])}",
+            f"DTSTART:{_ical_datetime(row['deadline'] - timedelta(minutes=15))}",
+            f"DTEND:{_ical_datetime(row['deadline'])}",
+            f"SUMMARY:{_ical_escape('Date limite : ' + row['title'])}",
+            f"DESCRIPTION:{_ical_escape(row['organization'] + ' (' + status + ')')}",
+            'END:VEVENT',
+        ])
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_ical_fold(line) for line in lines) + '\r\n'
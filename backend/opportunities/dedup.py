@@ -0,0 +1,208 @@
+# opportunities/dedup.py
+"""
+Détection des quasi-doublons d'opportunités (même bourse publiée par plusieurs créateurs
+avec une formulation légèrement différente).
+
+À chaque sauvegarde ou import, une signature MinHash est calculée sur les shingles
+(groupes de 3 mots consécutifs) du titre, de l'organisme et de la description, puis
+découpée en bandes (LSH). Chaque bande est hachée en un seau indexé
+(``OpportunitySignatureBucket``) : deux opportunités proches partagent au moins un seau
+avec une forte probabilité, la recherche des candidats est une simple requête ``IN`` sur
+cet index, sans comparer l'opportunité à toutes les autres. La similarité de Jaccard est
+ensuite estimée sur les signatures complètes et les paires au-dessus du seuil sont
+enregistrées comme ``DuplicateCandidate`` pour examen par le staff.
+"""
+import hashlib
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    DuplicateCandidate, Opportunity, OpportunitySignature, OpportunitySignatureBucket, OpportunityTaskRun,
+)
+from .search import tokenize
+
+TASK_NAME = 'index_duplicates'
+
+# 16 bandes de 4 lignes : deux textes similaires à 80 % partagent un seau dans ~99,9 % des cas,
+# à 30 % dans moins de 13 % des cas
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+# Champs dont la modification change la signature
+SIGNED_FIELDS = ('title', 'organization', 'description')
+
+DEFAULT_CONFIG = {
+    'THRESHOLD': 0.8,  # similarité de Jaccard estimée minimale d'un doublon potentiel
+    'BATCH_SIZE': 500,  # opportunités par lot pour index_opportunity_duplicates
+}
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 61) - 1
+_rng = random.Random(20240917)  # Graine fixe : les signatures doivent rester comparables
+PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def get_config(name):
+    return getattr(settings, 'OPPORTUNITY_DEDUP_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def _hash(value, signed=False):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big', signed=signed)
+
+
+def shingles(text):
+    """Groupes de SHINGLE_SIZE mots consécutifs (le texte entier s'il est plus court)"""
+    words = tokenize(text)
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature_text(opportunity):
+    return ' '.join(getattr(opportunity, field) or '' for field in SIGNED_FIELDS)
+
+
+def minhash(text):
+    """Signature MinHash (NUM_PERMUTATIONS entiers), vide pour un texte sans mots"""
+    hashes = [_hash(shingle) & _MAX_HASH for shingle in shingles(text)]
+    if not hashes:
+        return []
+    return [min((a * value + b) % _PRIME for value in hashes) for a, b in PERMUTATIONS]
+
+
+def band_buckets(signature):
+    """Un seau (entier 64 bits signé, numéro de bande inclus) par bande de la signature"""
+    if not signature:
+        return []
+    return [
+        _hash(f"{band}:{','.join(map(str, signature[band * ROWS:(band + 1) * ROWS]))}", signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def estimate_similarity(first, second):
+    """Similarité de Jaccard estimée : part des minima identiques"""
+    if not first or not second:
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / NUM_PERMUTATIONS
+
+
+def index_opportunities(opportunities):
+    """
+    Calculer les signatures d'un lot, mettre à jour l'index LSH et enregistrer les
+    doublons potentiels
+
+    Les paires déjà examinées (confirmées ou écartées) ne sont pas recréées ; les paires
+    en attente impliquant le lot sont recalculées.
+
+    Returns:
+        Nombre de paires en attente enregistrées pour le lot
+    """
+    signatures = {opportunity.pk: minhash(signature_text(opportunity)) for opportunity in opportunities}
+    if not signatures:
+        return 0
+    pks = list(signatures)
+    buckets = {pk: band_buckets(signature) for pk, signature in signatures.items()}
+
+    with transaction.atomic():
+        OpportunitySignature.objects.filter(opportunity_id__in=pks).delete()
+        OpportunitySignature.objects.bulk_create([
+            OpportunitySignature(opportunity_id=pk, minhashes=signature) for pk, signature in signatures.items()
+        ])
+        OpportunitySignatureBucket.objects.filter(opportunity_id__in=pks).delete()
+        OpportunitySignatureBucket.objects.bulk_create([
+            OpportunitySignatureBucket(opportunity_id=pk, bucket=bucket)
+            for pk, values in buckets.items() for bucket in values
+        ], batch_size=1000)
+
+        # Candidats : opportunités partageant au moins un seau (lot compris)
+        members = defaultdict(set)
+        all_buckets = list({bucket for values in buckets.values() for bucket in values})
+        for start in range(0, len(all_buckets), 500):
+            chunk = all_buckets[start:start + 500]
+            for opportunity_id, bucket in OpportunitySignatureBucket.objects.filter(
+                bucket__in=chunk
+            ).values_list('opportunity_id', 'bucket'):
+                members[bucket].add(opportunity_id)
+
+        pairs = set()
+        for pk, values in buckets.items():
+            for bucket in values:
+                pairs.update(frozenset((pk, other)) for other in members[bucket] if other != pk)
+
+        others = {other for pair in pairs for other in pair} - set(signatures)
+        known = {
+            opportunity_id: (minhashes, created_at)
+            for opportunity_id, minhashes, created_at in OpportunitySignature.objects.filter(
+                opportunity_id__in=others
+            ).values_list('opportunity_id', 'minhashes', 'opportunity__created_at')
+        }
+        known.update({opportunity.pk: (signatures[opportunity.pk], opportunity.created_at) for opportunity in opportunities})
+
+        threshold = get_config('THRESHOLD')
+        candidates = []
+        for pair in pairs:
+            first, second = sorted(pair, key=lambda pk: (known[pk][1], str(pk)))
+            similarity = estimate_similarity(known[first][0], known[second][0])
+            if similarity >= threshold:
+                candidates.append(DuplicateCandidate(opportunity_id=second, original_id=first, similarity=similarity))
+
+        DuplicateCandidate.objects.filter(status='pending').filter(
+            Q(opportunity_id__in=pks) | Q(original_id__in=pks)
+        ).delete()
+        DuplicateCandidate.objects.bulk_create(candidates, ignore_conflicts=True)
+
+    return len(candidates)
+
+
+def index_all(batch_size=None):
+    """Indexer toutes les opportunités (remplissage initial), par lots"""
+    batch_size = batch_size or get_config('BATCH_SIZE')
+    run = OpportunityTaskRun.objects.create(task=TASK_NAME, started_at=timezone.now())
+
+    stats = {'indexed': 0, 'candidates': 0}
+    batch = []
+    queryset = Opportunity.objects.only('pk', 'created_at', *SIGNED_FIELDS).order_by('created_at', 'pk')
+    for opportunity in queryset.iterator(chunk_size=batch_size):
+        batch.append(opportunity)
+        if len(batch) >= batch_size:
+            stats['candidates'] += index_opportunities(batch)
+            stats['indexed'] += len(batch)
+            batch = []
+    if batch:
+        stats['candidates'] += index_opportunities(batch)
+        stats['indexed'] += len(batch)
+
+    run.finished_at = timezone.now()
+    run.stats = stats
+    run.save(update_fields=['finished_at', 'stats'])
+    return run
+
+
+def review(candidate, user, confirmed):
+    """
+    Confirmer ou écarter un doublon potentiel
+
+    Un doublon confirmé est rattaché à l'original (``duplicate_of``), ce qui le masque des
+    listes filtrées avec ``collapse_duplicates``.
+    """
+    with transaction.atomic():
+        candidate.status = 'confirmed' if confirmed else 'dismissed'
+        candidate.reviewed_at = timezone.now()
+        candidate.reviewed_by = user
+        candidate.save(update_fields=['status', 'reviewed_at', 'reviewed_by'])
+        # update() : le rattachement ne modifie ni les index ni les compteurs
+        if confirmed:
+            Opportunity.objects.filter(pk=candidate.opportunity_id).update(duplicate_of_id=candidate.original_id)
+        else:
+            Opportunity.objects.filter(
+                pk=candidate.opportunity_id, duplicate_of_id=candidate.original_id
+            ).update(duplicate_of_id=None)
+    return candidate
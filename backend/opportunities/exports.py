@@ -0,0 +1,111 @@
+# opportunities/exports.py
+"""
+Export en flux (NDJSON ou CSV) des opportunités et des relations utilisateur.
+
+Les lignes sont lues avec ``values()`` par paquets (``iterator(chunk_size=...)``, curseur
+côté serveur avec PostgreSQL) et écrites une à une dans une ``StreamingHttpResponse`` :
+ni instances de modèles, ni sérialiseurs DRF, et une mémoire constante quel que soit le
+nombre de lignes exportées.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+DEFAULT_FORMAT = 'ndjson'
+CHUNK_SIZE = 2000
+
+# Colonne exportée -> champ lu avec values()
+OPPORTUNITY_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'category': 'category__slug',
+    'opportunity_type': 'opportunity_type',
+    'status': 'status',
+    'organization': 'organization',
+    'location': 'location',
+    'location_code': 'location_code',
+    'is_remote': 'is_remote',
+    'education_level': 'education_level',
+    'compensation': 'compensation',
+    'currency': 'currency',
+    'tags': 'tags',
+    'website': 'website',
+    'application_link': 'application_link',
+    'publication_date': 'publication_date',
+    'deadline': 'deadline',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'view_count': 'view_count',
+    'application_count': 'application_count',
+}
+
+RELATION_FIELDS = {
+    'id': 'id',
+    'opportunity': 'opportunity_id',
+    'opportunity_slug': 'opportunity__slug',
+    'opportunity_title': 'opportunity__title',
+    'relation_type': 'relation_type',
+    'status': 'status',
+    'notes': 'notes',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+class _Echo:
+    """Pseudo-fichier dont ``write`` renvoie la ligne au lieu de la stocker"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields):
+    """Dictionnaires {colonne: valeur} lus par paquets"""
+    columns = list(fields)
+    for values in queryset.values_list(*fields.values()).iterator(chunk_size=CHUNK_SIZE):
+        yield dict(zip(columns, values))
+
+
+def iter_ndjson(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def iter_csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else ('' if value is None else value)
+            for value in row.values()
+        ])
+
+
+def export_response(queryset, fields, file_format, name):
+    """
+    Réponse en flux de l'export d'un queryset
+
+    Args:
+        queryset: lignes à exporter (déjà filtrées et triées)
+        fields: {colonne: champ values()} (OPPORTUNITY_FIELDS, RELATION_FIELDS)
+        file_format: 'ndjson' ou 'csv'
+        name: préfixe du nom de fichier proposé
+    """
+    rows = iter_rows(queryset, fields)
+    if file_format == 'csv':
+        content = iter_csv(rows, list(fields))
+    else:
+        content = iter_ndjson(rows)
+
+    response = StreamingHttpResponse(content, content_type=FORMATS[file_format])
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M}.{file_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
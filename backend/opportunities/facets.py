@@ -0,0 +1,172 @@
+# opportunities/facets.py
+"""
+Compteurs de facettes du navigateur d'opportunités (type, catégorie, ville, à distance,
+niveau d'éducation).
+
+Sans filtre, les compteurs sont lus dans la table de cumul ``OpportunityFacetCount``
+(opportunités publiées), tenue à jour de manière incrémentale par les signaux de
+sauvegarde/suppression et reconstruite après les transitions de statut en masse.
+Avec des filtres, une seule requête GROUP BY sur les combinaisons de facettes suffit
+à produire tous les compteurs.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .locations import city_label
+from .models import Opportunity, OpportunityCategory, OpportunityFacetCount
+
+# Facette -> champ du modèle
+FACET_FIELDS = {
+    'type': 'opportunity_type',
+    'category': 'category_id',
+    'location': 'location_code',
+    'is_remote': 'is_remote',
+    'education_level': 'education_level',
+}
+ROLLUP_STATUS = 'published'
+
+
+def _normalize(facet, value):
+    """Valeur stockée dans la table de cumul (None : pas de valeur pour cette facette)"""
+    if value is None:
+        return None
+    if facet == 'is_remote':
+        return 'true' if value else 'false'
+    value = str(value).strip()
+    return value or None
+
+
+def facet_values(row):
+    """
+    Couples (facette, valeur) d'une opportunité publiée
+
+    Args:
+        row: dictionnaire {champ: valeur} contenant ``status`` et les champs de FACET_FIELDS
+    """
+    if row.get('status') != ROLLUP_STATUS:
+        return []
+    pairs = []
+    for facet, field in FACET_FIELDS.items():
+        value = _normalize(facet, row.get(field))
+        if value is not None:
+            pairs.append((facet, value))
+    return pairs
+
+
+def snapshot(opportunity):
+    """Valeurs utiles aux facettes d'une instance (pour comparer avant/après sauvegarde)"""
+    return {field: getattr(opportunity, field) for field in ['status', *FACET_FIELDS.values()]}
+
+
+def load_snapshot(pk):
+    """Valeurs enregistrées en base, ou None pour une nouvelle opportunité"""
+    return Opportunity.objects.filter(pk=pk).values('status', *FACET_FIELDS.values()).first()
+
+
+def apply_deltas(deltas):
+    """Appliquer des variations {(facette, valeur): delta}, une requête UPDATE par (facette, delta)"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        OpportunityFacetCount.objects.bulk_create(
+            [OpportunityFacetCount(facet=facet, value=value) for facet, value in deltas],
+            ignore_conflicts=True
+        )
+        values_by_delta = defaultdict(list)
+        for (facet, value), delta in deltas.items():
+            values_by_delta[(facet, delta)].append(value)
+        for (facet, delta), values in values_by_delta.items():
+            OpportunityFacetCount.objects.filter(facet=facet, value__in=values).update(
+                count=F('count') + delta
+            )
+
+
+def update_facets(old, new):
+    """
+    Mettre à jour le cumul entre deux états d'une opportunité
+
+    Args:
+        old: instantané avant sauvegarde (None si création)
+        new: instantané après sauvegarde (None si suppression)
+    """
+    deltas = Counter(facet_values(new or {}))
+    deltas.subtract(Counter(facet_values(old or {})))
+    apply_deltas(deltas)
+
+
+def add_opportunities(opportunities):
+    """Compter un lot de nouvelles opportunités (imports en masse)"""
+    deltas = Counter()
+    for opportunity in opportunities:
+        deltas.update(facet_values(snapshot(opportunity)))
+    apply_deltas(deltas)
+
+
+def grouped_counts(queryset):
+    """Compteurs de toutes les facettes en une requête GROUP BY sur leurs combinaisons"""
+    counts = defaultdict(Counter)
+    fields = list(FACET_FIELDS.values())
+    rows = queryset.order_by().values(*fields).annotate(total=Count('pk', distinct=True))
+    for row in rows:
+        for facet, field in FACET_FIELDS.items():
+            value = _normalize(facet, row[field])
+            if value is not None:
+                counts[facet][value] += row['total']
+    return counts
+
+
+def rebuild_facets():
+    """Reconstruire la table de cumul à partir des opportunités publiées"""
+    counts = grouped_counts(Opportunity.objects.filter(status=ROLLUP_STATUS))
+    with transaction.atomic():
+        OpportunityFacetCount.objects.all().delete()
+        OpportunityFacetCount.objects.bulk_create([
+            OpportunityFacetCount(facet=facet, value=value, count=count)
+            for facet, values in counts.items()
+            for value, count in values.items()
+        ], batch_size=500)
+
+
+def rollup_counts():
+    """Compteurs lus dans la table de cumul"""
+    counts = defaultdict(Counter)
+    for facet, value, count in OpportunityFacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count'):
+        counts[facet][value] = count
+    return counts
+
+
+def serialize_counts(counts):
+    """Forme renvoyée par l'API : {facette: [{value, label, count}, …]} triée par nombre décroissant"""
+    type_labels = {key: str(label) for key, label in Opportunity.TYPE_CHOICES}
+    categories = {}
+    if counts.get('category'):
+        categories = {
+            str(category_id): (slug, name)
+            for category_id, slug, name in OpportunityCategory.objects.filter(
+                id__in=list(counts['category'])
+            ).values_list('id', 'slug', 'name')
+        }
+
+    result = {}
+    for facet in FACET_FIELDS:
+        items = []
+        for value, count in counts.get(facet, Counter()).most_common():
+            if facet == 'type':
+                items.append({'value': value, 'label': type_labels.get(value, value), 'count': count})
+            elif facet == 'category':
+                if value not in categories:
+                    continue
+                slug, name = categories[value]
+                items.append({'value': slug, 'label': name, 'count': count})
+            elif facet == 'is_remote':
+                items.append({'value': value == 'true', 'count': count})
+            elif facet == 'location':
+                items.append({'value': value, 'label': city_label(value), 'count': count})
+            else:
+                items.append({'value': value, 'label': value, 'count': count})
+        result[facet] = items
+    return result
@@ -1,8 +1,10 @@
 # opportunities/filters.py
 import django_filters
-from django.db.models import Q
-from django.utils import timezone
+from rest_framework.filters import OrderingFilter
 from .models import Opportunity
+from .locations import CITIES, distance_expression, normalize_location, normalize_locations
+from .search import search_opportunities
+from .tags import opportunity_ids_with_all_tags, opportunity_ids_with_any_tag, parse_tags
 
 class OpportunityFilter(django_filters.FilterSet):
     """Filtres avancés pour les opportunités"""
@@ -17,42 +19,100 @@ class OpportunityFilter(django_filters.FilterSet):
     organization = django_filters.CharFilter(field_name='organization', lookup_expr='icontains')
     education_level = django_filters.CharFilter(field_name='education_level', lookup_expr='icontains')
     tags = django_filters.CharFilter(method='filter_tags')
+    tags_all = django_filters.CharFilter(method='filter_tags_all')
+    q = django_filters.CharFilter(method='filter_search')
+    search = django_filters.CharFilter(method='filter_search')  # ancien paramètre de SearchFilter
+    collapse_duplicates = django_filters.BooleanFilter(method='filter_collapse_duplicates')
     
     class Meta:
         model = Opportunity
         fields = ['category', 'type', 'location', 'deadline_after', 'deadline_before', 
-                 'active', 'expired', 'organization', 'education_level', 'tags', 'is_remote']
+                 'active', 'expired', 'organization', 'education_level', 'tags', 'tags_all', 'is_remote', 'q',
+                 'search', 'collapse_duplicates']
     
     def filter_location(self, queryset, name, value):
-        """Filtrer par localisation (peut être partielle)"""
+        """Filtrer par ville (codes ou noms séparés par des virgules), recherche partielle sinon"""
+        codes = normalize_locations(value)
+        if codes:
+            return queryset.filter(location_code__in=codes)
         return queryset.filter(location__icontains=value)
     
     def filter_active(self, queryset, name, value):
-        """Filtrer les opportunités actives (non expirées)"""
-        now = timezone.now()
+        """Filtrer les opportunités actives (statut tenu à jour par la tâche de cycle de vie)"""
         if value:  # Si True, retourner uniquement les actives
-            return queryset.filter(
-                Q(deadline__isnull=True) | Q(deadline__gt=now),
-                status='published'
-            )
+            return queryset.filter(status='published')
         return queryset  # Sinon, retourner toutes
     
     def filter_expired(self, queryset, name, value):
         """Filtrer les opportunités expirées"""
-        now = timezone.now()
         if value:  # Si True, retourner uniquement les expirées
-            return queryset.filter(
-                deadline__lt=now,
-                status='published'
-            )
+            return queryset.filter(status='expired')
         return queryset  # Sinon, retourner toutes
     
     def filter_tags(self, queryset, name, value):
-        """Filtrer par tags (recherche de sous-chaînes)"""
-        tags = [tag.strip() for tag in value.split(',')]
-        q_objects = Q()
-        
-        for tag in tags:
-            q_objects |= Q(tags__icontains=tag)
+        """Filtrer par tags : au moins un des tags (index inversé)"""
+        slugs = list(parse_tags(value))
+        if not slugs:
+            return queryset
+        return queryset.filter(pk__in=opportunity_ids_with_any_tag(slugs))
+    
+    def filter_tags_all(self, queryset, name, value):
+        """Filtrer par tags : tous les tags (index inversé)"""
+        slugs = list(parse_tags(value))
+        if not slugs:
+            return queryset
+        return queryset.filter(pk__in=opportunity_ids_with_all_tags(slugs))
+    
+    def filter_search(self, queryset, name, value):
+        """Recherche plein texte indexée, annotée avec ``search_rank``"""
+        return search_opportunities(queryset, value)
+
+    def filter_collapse_duplicates(self, queryset, name, value):
+        """Masquer les doublons confirmés (seul l'original reste listé)"""
+        if value:
+            return queryset.filter(duplicate_of__isnull=True)
+        return queryset
+
+class OpportunityOrderingFilter(OrderingFilter):
+    """
+    Tri des opportunités : par pertinence par défaut lors d'une recherche plein texte,
+    ``ordering=distance`` pour trier par proximité de la ville de l'utilisateur
+    (ou de ``?city=``), ``ordering=-trending`` pour les opportunités en vogue
+    """
+    distance_field = 'distance'
+    city_param = 'city'
+    # Noms publics -> champs du modèle
+    aliases = {'trending': 'trending_score'}
+    
+    def get_origin_city(self, request):
+        code = normalize_location(request.query_params.get(self.city_param, ''))
+        if code not in CITIES and request.user.is_authenticated:
+            code = request.user.city
+        return code if code in CITIES else None
+    
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
         
-        return queryset.filter(q_objects)
\ No newline at end of file
+        ordering = list(ordering)
+        if any(term.lstrip('-') == self.distance_field for term in ordering):
+            origin = self.get_origin_city(request)
+            if origin is None:
+                # Pas de ville de référence : tri par distance ignoré
+                ordering = [term for term in ordering if term.lstrip('-') != self.distance_field]
+            else:
+                queryset = queryset.annotate(**{self.distance_field: distance_expression(origin)})
+                ordering.append('-created_at')  # Départage des opportunités d'une même ville
+        for index, term in enumerate(ordering):
+            field = term.lstrip('-')
+            if field in self.aliases:
+                ordering[index] = term[:len(term) - len(field)] + self.aliases[field]
+        return queryset.order_by(*ordering) if ordering else queryset
+    
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        params = view.request.query_params
+        if params.get('q', '').strip() or params.get('search', '').strip():
+            return ('-search_rank',) + tuple(ordering or ())
+        return ordering
@@ -0,0 +1,232 @@
+# opportunities/importers.py
+"""
+Import en masse d'opportunités depuis un fichier CSV ou JSONL (une opportunité par ligne).
+
+Le fichier est lu en flux et traité par lots : validation des lignes avec
+``OpportunityImportSerializer`` (catégories résolues depuis un dictionnaire chargé une
+fois), attribution groupée des slugs, puis ``bulk_create`` du lot dans une transaction.
+Les index (recherche, tags) sont mis à jour par lot, les signaux ``post_save`` n'étant
+pas émis par ``bulk_create``. La mémoire reste bornée par la taille d'un lot.
+
+Une ligne qui viole une contrainte en base (autre qu'une collision de slugs, rejouée)
+est signalée dans le bilan, le reste du lot est enregistré ligne par ligne. Un encodage
+invalide interrompt la lecture sans annuler les lignes déjà enregistrées.
+
+Utilisé par ``python manage.py import_opportunities`` et par l'action ``import`` de l'API.
+"""
+import csv
+import json
+import logging
+
+from django.db import IntegrityError, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.slugs import allocate_slugs
+
+from . import search, tags
+from .locations import normalize_location
+from .models import Opportunity, OpportunityCategory
+from .serializers import OpportunityImportSerializer
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+MAX_SLUG_ATTEMPTS = 3
+
+# Émis après chaque lot enregistré (arguments : opportunities)
+opportunities_imported = Signal()
+
+
+class ImportFormatError(ValueError):
+    """Format de fichier inconnu ou illisible"""
+
+
+class ImportReport:
+    """Bilan d'un import : lignes créées et erreurs par ligne (liste plafonnée)"""
+
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.aborted = False  # lecture interrompue (encodage invalide)
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+            'aborted': self.aborted,
+        }
+
+
+def guess_format(filename):
+    """Déduire le format de l'extension du fichier"""
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def iter_csv_rows(stream):
+    """Lignes CSV (avec en-tête) ; les cellules vides sont traitées comme absentes"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+
+
+def iter_jsonl_rows(stream):
+    """Objets JSON, un par ligne ; les lignes vides sont ignorées"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, ImportFormatError(f"JSON invalide : {e}")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ImportFormatError("Un objet JSON est attendu.")
+            continue
+        yield line_number, row
+
+
+def iter_rows(stream, file_format):
+    if file_format == 'csv':
+        return iter_csv_rows(stream)
+    if file_format == 'jsonl':
+        return iter_jsonl_rows(stream)
+    raise ImportFormatError(f"Format inconnu : {file_format} (attendu : {', '.join(FORMATS)})")
+
+
+def load_category_map():
+    """{slug ou nom en minuscules: id} pour toutes les catégories actives, en une requête"""
+    categories = {}
+    for category_id, slug, name in OpportunityCategory.objects.filter(is_active=True).values_list('id', 'slug', 'name'):
+        categories[slug.lower()] = category_id
+        categories.setdefault(name.strip().lower(), category_id)
+    return categories
+
+
+def build_opportunity(data, creator, now):
+    """Construire l'instance (non enregistrée) à partir d'une ligne validée"""
+    data = dict(data)
+    category_id = data.pop('category', None)
+    opportunity = Opportunity(creator=creator, category_id=category_id, **data)
+    opportunity.location_code = normalize_location(opportunity.location)
+
+    # Équivalent de save() et des signaux pre_save / post_save, non appelés par bulk_create
+    if opportunity.status == 'published':
+        if not opportunity.publication_date:
+            opportunity.publication_date = now
+        if opportunity.deadline and opportunity.deadline < now:
+            opportunity.status = 'expired'
+    return opportunity
+
+
+def _insert(opportunities):
+    with transaction.atomic():
+        Opportunity.objects.bulk_create(opportunities)
+        search.index_opportunities([opportunity.pk for opportunity in opportunities])
+        tags.sync_tags(opportunities)
+
+
+def _save_batch(opportunities):
+    """
+    Enregistrer un lot avec des slugs pré-attribués (réattribués en cas de course)
+
+    Raises:
+        IntegrityError: contrainte autre que l'unicité du slug, ou collisions répétées
+    """
+    for attempt in range(MAX_SLUG_ATTEMPTS):
+        slugs = allocate_slugs(Opportunity, [opportunity.title for opportunity in opportunities])
+        for opportunity, slug in zip(opportunities, slugs):
+            opportunity.slug = slug
+        try:
+            _insert(opportunities)
+            break
+        except IntegrityError:
+            # Seule une collision de slugs (import ou création concurrente) justifie un nouvel essai
+            if attempt == MAX_SLUG_ATTEMPTS - 1 or not Opportunity.objects.filter(slug__in=slugs).exists():
+                raise
+            logger.info("Collision de slugs pendant l'import, nouvelle attribution du lot")
+
+    opportunities_imported.send(sender=Opportunity, opportunities=opportunities)
+
+
+def import_opportunities(stream, file_format, creator, batch_size=None, dry_run=False):
+    """
+    Importer les opportunités d'un flux texte
+
+    Args:
+        stream: fichier texte ouvert (lu ligne par ligne)
+        file_format: 'csv' ou 'jsonl'
+        creator: utilisateur enregistré comme créateur des opportunités
+        batch_size: nombre de lignes validées puis insérées ensemble
+        dry_run: valider sans rien enregistrer
+
+    Returns:
+        ImportReport
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    report = ImportReport()
+    context = {'categories': load_category_map()}
+    now = timezone.now()
+    batch = []  # (ligne, opportunité)
+
+    def flush():
+        if batch and not dry_run:
+            try:
+                _save_batch([opportunity for _, opportunity in batch])
+                report.created += len(batch)
+            except IntegrityError:
+                # Contrainte violée par une ligne du lot : enregistrer ligne par ligne pour l'isoler
+                for line, opportunity in batch:
+                    try:
+                        _save_batch([opportunity])
+                        report.created += 1
+                    except IntegrityError as e:
+                        report.add_error(line, {'non_field_errors': [f"Enregistrement impossible : {e}"]})
+        elif batch:
+            report.created += len(batch)
+        batch.clear()
+
+    line = 0
+    try:
+        for line, row in iter_rows(stream, file_format):
+            report.rows += 1
+            if isinstance(row, ImportFormatError):
+                report.add_error(line, {'non_field_errors': [str(row)]})
+                continue
+
+            serializer = OpportunityImportSerializer(data=row, context=context)
+            if not serializer.is_valid():
+                report.add_error(line, serializer.errors)
+                continue
+
+            batch.append((line, build_opportunity(serializer.validated_data, creator, now)))
+            if len(batch) >= batch_size:
+                flush()
+    except UnicodeDecodeError:
+        # Les lots déjà enregistrés et les lignes lues avant l'erreur sont conservés
+        report.aborted = True
+        report.add_error(line + 1, {'non_field_errors': [
+            f"Encodage invalide (UTF-8 attendu) : import interrompu après la ligne {line}."
+        ]})
+    flush()
+
+    return report
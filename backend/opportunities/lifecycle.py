@@ -0,0 +1,72 @@
+# opportunities/lifecycle.py
+"""
+Transitions de statut planifiées des opportunités.
+
+À chaque exécution, dans une transaction, les opportunités concernées sont verrouillées
+et comptées, puis une seule requête UPDATE :
+- expire les opportunités publiées dont la date limite est dépassée ;
+- publie les opportunités programmées dont la date de publication est arrivée
+  (ou les expire directement si leur date limite est déjà passée).
+
+Les lectures font ensuite confiance au champ ``status``. Lancer avec
+``python manage.py run_opportunity_lifecycle`` (``--loop`` en mode worker) ; en
+production, la tâche cron ``opportunici-lifecycle`` de render.yaml l'exécute toutes les
+5 minutes.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Opportunity, OpportunityTaskRun
+
+TASK_NAME = 'lifecycle'
+
+DEFAULT_INTERVAL = 300  # secondes
+
+# Émis après chaque exécution ayant modifié au moins une opportunité (arguments : run)
+opportunities_transitioned = Signal()
+
+
+def get_interval():
+    return getattr(settings, 'OPPORTUNITY_LIFECYCLE_CONFIG', {}).get('INTERVAL', DEFAULT_INTERVAL)
+
+
+def run_lifecycle(now=None):
+    """
+    Appliquer les transitions publish/expire en une requête ensembliste
+
+    Returns:
+        OpportunityTaskRun enregistré pour cette exécution
+    """
+    now = now or timezone.now()
+    run = OpportunityTaskRun.objects.create(task=TASK_NAME, started_at=now)
+
+    past_deadline = Q(deadline__lt=now)
+    due = (
+        (Q(status='published') & past_deadline) |
+        Q(status='scheduled', publication_date__lte=now)
+    )
+    with transaction.atomic():
+        # Lignes verrouillées jusqu'à la mise à jour : le journal compte exactement
+        # les opportunités modifiées, même si une autre exécution tourne en parallèle
+        due_rows = list(Opportunity.objects.select_for_update().filter(due).order_by().values_list('pk', 'deadline'))
+        expired = sum(1 for _, deadline in due_rows if deadline is not None and deadline < now)
+        stats = {'expired': expired, 'published': len(due_rows) - expired}
+        stats['updated'] = Opportunity.objects.filter(pk__in=[pk for pk, _ in due_rows]).update(
+            status=Case(
+                When(past_deadline, then=Value('expired')),
+                default=Value('published'),
+            ),
+            updated_at=now,
+        )
+
+    run.finished_at = timezone.now()
+    run.stats = stats
+    run.save(update_fields=['finished_at', 'stats'])
+
+    if stats['updated']:
+        opportunities_transitioned.send(sender=Opportunity, run=run)
+
+    return run
@@ -0,0 +1,154 @@
+# opportunities/locations.py
+"""
+Normalisation des lieux d'opportunités en codes de ville et distances entre villes.
+
+Le champ libre ``Opportunity.location`` est ramené à l'écriture à un code de ville
+canonique (``location_code``), le même que ``User.city`` (``CITY_CHOICES``) : pliage des
+accents, table d'alias (quartiers, abréviations, graphies courantes). Le filtre par lieu
+devient une recherche par égalité / IN sur un champ indexé, et le tri « près de moi »
+s'appuie sur une matrice de distances entre villes calculée une fois au chargement.
+"""
+import math
+import re
+import unicodedata
+
+from django.db.models import Case, IntegerField, Value, When
+
+OTHER_CITY = 'other'
+
+# Codes alignés sur User.CITY_CHOICES : (libellé, latitude, longitude)
+CITIES = {
+    'abidjan': ('Abidjan', 5.3600, -4.0083),
+    'bouake': ('Bouaké', 7.6906, -5.0300),
+    'daloa': ('Daloa', 6.8774, -6.4502),
+    'yamoussoukro': ('Yamoussoukro', 6.8276, -5.2893),
+    'sanpedro': ('San-Pédro', 4.7485, -6.6363),
+    'korhogo': ('Korhogo', 9.4580, -5.6296),
+    'man': ('Man', 7.4125, -7.5538),
+}
+
+# Graphies et quartiers (déjà pliés : minuscules, sans accents) -> code de ville
+ALIASES = {
+    'abj': 'abidjan',
+    'babi': 'abidjan',
+    'cocody': 'abidjan',
+    'plateau': 'abidjan',
+    'yopougon': 'abidjan',
+    'yop': 'abidjan',
+    'treichville': 'abidjan',
+    'marcory': 'abidjan',
+    'adjame': 'abidjan',
+    'abobo': 'abidjan',
+    'koumassi': 'abidjan',
+    'port bouet': 'abidjan',
+    'attecoube': 'abidjan',
+    'riviera': 'abidjan',
+    'bingerville': 'abidjan',
+    'anyama': 'abidjan',
+    'songon': 'abidjan',
+    'yakro': 'yamoussoukro',
+    'san pedro': 'sanpedro',
+}
+
+# Lieux qui ne désignent pas une ville (le télétravail est porté par ``is_remote``)
+NON_CITY = {'remote', 'teletravail', 'a distance', 'en ligne', 'online', 'distanciel'}
+
+UNKNOWN_DISTANCE = 100000  # km : lieux sans code, triés en dernier
+
+
+def fold(text):
+    """Minuscules, sans accents, séparateurs réduits à des espaces"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.split(r'[^a-z0-9]+', text.lower())).strip()
+
+
+def _build_lookup():
+    lookup = dict(ALIASES)
+    for code, (label, _, _) in CITIES.items():
+        lookup[code] = code
+        lookup[fold(label)] = code
+    return lookup
+
+
+LOOKUP = _build_lookup()
+MAX_ALIAS_WORDS = max(len(alias.split()) for alias in LOOKUP)
+
+
+def normalize_location(text):
+    """
+    Code de ville d'un lieu saisi librement
+
+    Returns:
+        Code de ville, OTHER_CITY pour un lieu non reconnu, None si vide ou non géographique
+    """
+    folded = fold(text)
+    if not folded or folded in NON_CITY:
+        return None
+    if folded in LOOKUP:
+        return LOOKUP[folded]
+
+    # « Cocody, Abidjan », « Abidjan - Plateau » : premier groupe de mots connu
+    words = folded.split()
+    for size in range(min(MAX_ALIAS_WORDS, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            code = LOOKUP.get(' '.join(words[start:start + size]))
+            if code:
+                return code
+    return OTHER_CITY
+
+
+def normalize_locations(value):
+    """Codes de ville d'une liste 'abidjan, Bouaké' (les lieux non reconnus sont ignorés)"""
+    codes = []
+    for part in (value or '').split(','):
+        code = normalize_location(part)
+        if code and code != OTHER_CITY and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en kilomètres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+
+def _build_distances():
+    return {
+        (origin, destination): round(haversine(lat1, lon1, lat2, lon2))
+        for origin, (_, lat1, lon1) in CITIES.items()
+        for destination, (_, lat2, lon2) in CITIES.items()
+    }
+
+
+DISTANCES = _build_distances()
+
+
+def distance(origin, destination):
+    return DISTANCES.get((origin, destination), UNKNOWN_DISTANCE)
+
+
+def city_label(code):
+    if code in CITIES:
+        return CITIES[code][0]
+    return 'Autre ville' if code == OTHER_CITY else code
+
+
+def distance_expression(origin):
+    """
+    Expression SQL de la distance (km) depuis la ville ``origin``
+
+    Un CASE sur le code indexé, valeurs tirées de la matrice : aucun calcul ni
+    comparaison de chaînes par ligne. Les offres à distance sont à 0 km.
+    """
+    return Case(
+        When(is_remote=True, then=Value(0)),
+        *[
+            When(location_code=destination, then=Value(distance(origin, destination)))
+            for destination in CITIES
+        ],
+        default=Value(UNKNOWN_DISTANCE),
+        output_field=IntegerField(),
+    )
@@ -0,0 +1,35 @@
+# opportunities/management/commands/build_opportunity_snapshots.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from opportunities import snapshots
+
+
+class Command(BaseCommand):
+    help = "Régénérer les instantanés JSON du fil public des opportunités"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Tourner en continu et régénérer après chaque modification (mode worker)")
+        parser.add_argument('--if-needed', action='store_true',
+                            help="Ne régénérer que si des modifications sont en attente ou si le dernier rendu est trop ancien (tâche cron)")
+        parser.add_argument('--interval', type=int, default=None,
+                            help="Secondes entre deux vérifications en mode worker")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or snapshots.get_config('INTERVAL')
+
+        while True:
+            if options['loop'] or options['if_needed']:
+                run = snapshots.build_if_needed()
+            else:
+                run = snapshots.build()
+            if run is not None:
+                self.stdout.write(
+                    f"{run.stats['files']} instantané(s) publié(s) sous {snapshots.get_url()}, "
+                    f"{run.stats['removed']} fichier(s) obsolète(s) supprimé(s)."
+                )
+            if not options['loop']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,28 @@
+# opportunities/management/commands/flush_opportunity_views.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from opportunities import tracking
+
+
+class Command(BaseCommand):
+    help = "Appliquer en base les consultations d'opportunités journalisées dans le cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Nombre d'événements traités par lot")
+        parser.add_argument('--loop', action='store_true',
+                            help="Tourner en continu (mode worker)")
+        parser.add_argument('--interval', type=int, default=None,
+                            help="Secondes entre deux vidages en mode worker")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or tracking.get_config('FLUSH_INTERVAL')
+
+        while True:
+            applied = tracking.flush_views(batch_size=options['batch_size'])
+            self.stdout.write(f"{applied} consultation(s) appliquée(s).")
+            if not options['loop']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,48 @@
+# opportunities/management/commands/import_opportunities.py
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from opportunities import importers
+
+
+class Command(BaseCommand):
+    help = "Importer des opportunités depuis un fichier CSV ou JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer (.csv, .jsonl)")
+        parser.add_argument('--creator', required=True,
+                            help="Email de l'utilisateur enregistré comme créateur")
+        parser.add_argument('--file-format', choices=importers.FORMATS, default=None,
+                            help="Format du fichier (déduit de l'extension par défaut)")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Nombre de lignes insérées par lot")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Valider le fichier sans rien enregistrer")
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or importers.guess_format(options['path'])
+        if file_format is None:
+            raise CommandError("Format introuvable, préciser --file-format.")
+
+        try:
+            creator = get_user_model().objects.get(email=options['creator'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Utilisateur introuvable : {options['creator']}")
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            report = importers.import_opportunities(
+                stream, file_format, creator,
+                batch_size=options['batch_size'], dry_run=options['dry_run']
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"Ligne {error['line']} : {json.dumps(error['errors'], ensure_ascii=False)}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"… {report.error_count - len(report.errors)} autre(s) erreur(s) non affichée(s).")
+
+        verb = "valide(s)" if options['dry_run'] else "importée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.created} opportunité(s) {verb} sur {report.rows} ligne(s), {report.error_count} erreur(s)."
+        ))
@@ -0,0 +1,19 @@
+# opportunities/management/commands/index_opportunity_duplicates.py
+from django.core.management.base import BaseCommand
+
+from opportunities import dedup
+
+
+class Command(BaseCommand):
+    help = "Calculer les signatures MinHash de toutes les opportunités et rechercher les quasi-doublons"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Nombre d'opportunités indexées par lot")
+
+    def handle(self, *args, **options):
+        run = dedup.index_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{run.stats['indexed']} opportunité(s) indexée(s), "
+            f"{run.stats['candidates']} doublon(s) potentiel(s) en attente d'examen."
+        ))
@@ -0,0 +1,12 @@
+# opportunities/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from opportunities import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruire l'index de recherche plein texte des opportunités"
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Index de recherche reconstruit."))
@@ -0,0 +1,29 @@
+# opportunities/management/commands/reconcile_opportunity_counters.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from opportunities import counters
+
+
+class Command(BaseCommand):
+    help = "Recalculer les compteurs de candidatures et de vues à partir des relations utilisateur"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Tourner en continu (mode worker)")
+        parser.add_argument('--interval', type=int, default=None,
+                            help="Secondes entre deux exécutions en mode worker")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or counters.get_interval()
+
+        while True:
+            run = counters.reconcile_counters()
+            self.stdout.write(
+                f"{run.stats['applications_fixed']} compteur(s) de candidatures et "
+                f"{run.stats['views_fixed']} compteur(s) de vues corrigé(s)."
+            )
+            if not options['loop']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,19 @@
+# opportunities/management/commands/refresh_similar_opportunities.py
+from django.core.management.base import BaseCommand
+
+from opportunities import similar
+
+
+class Command(BaseCommand):
+    help = "Mettre à jour les opportunités similaires des opportunités nouvelles, modifiées ou retirées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="Tout revectoriser et recalculer (IDF compris)")
+
+    def handle(self, *args, **options):
+        run = similar.rebuild() if options['full'] else similar.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f"{run.stats['indexed']} opportunité(s) vectorisée(s), {run.stats['removed']} retirée(s), "
+            f"voisins recalculés pour {run.stats['refreshed']} opportunité(s)."
+        ))
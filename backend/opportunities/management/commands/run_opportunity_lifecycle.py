@@ -0,0 +1,28 @@
+# opportunities/management/commands/run_opportunity_lifecycle.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from opportunities import lifecycle
+
+
+class Command(BaseCommand):
+    help = "Publier les opportunités programmées et expirer celles dont la date limite est passée"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Tourner en continu (mode worker)")
+        parser.add_argument('--interval', type=int, default=None,
+                            help="Secondes entre deux exécutions en mode worker")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or lifecycle.get_interval()
+
+        while True:
+            run = lifecycle.run_lifecycle()
+            self.stdout.write(
+                f"{run.stats['published']} publiée(s), {run.stats['expired']} expirée(s)."
+            )
+            if not options['loop']:
+                break
+            time.sleep(interval)
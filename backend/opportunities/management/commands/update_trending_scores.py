@@ -0,0 +1,28 @@
+# opportunities/management/commands/update_trending_scores.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from opportunities import trending
+
+
+class Command(BaseCommand):
+    help = "Ajouter au score de tendance les favoris et candidatures créés depuis la dernière exécution"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Tourner en continu (mode worker)")
+        parser.add_argument('--interval', type=int, default=None,
+                            help="Secondes entre deux mises à jour en mode worker")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or trending.get_config('INTERVAL')
+
+        while True:
+            run = trending.update_trending()
+            self.stdout.write(
+                f"{run.stats['events']} événement(s) appliqué(s) à {run.stats['opportunities']} opportunité(s)."
+            )
+            if not options['loop']:
+                break
+            time.sleep(interval)
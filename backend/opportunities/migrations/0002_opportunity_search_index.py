@@ -0,0 +1,71 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'french_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION french_unaccent (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION french_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END
+    $$
+    """,
+    "ALTER TABLE opportunities_opportunity ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE INDEX IF NOT EXISTS opportunities_opportunity_search_gin
+        ON opportunities_opportunity USING GIN (search_vector)
+    """,
+    """
+    UPDATE opportunities_opportunity SET search_vector =
+        setweight(to_tsvector('french_unaccent', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('french_unaccent', coalesce(organization, '') || ' ' || coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('french_unaccent', coalesce(description, '')), 'C')
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS opportunities_opportunity_search_gin",
+    "ALTER TABLE opportunities_opportunity DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS opportunities_opportunity_fts USING fts5(
+        opportunity_id UNINDEXED, title, organization, tags, description,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO opportunities_opportunity_fts (opportunity_id, title, organization, tags, description)
+    SELECT id, title, organization, COALESCE(tags, ''), description FROM opportunities_opportunity
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS opportunities_opportunity_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2 on 2026-10-17 22:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def backfill_tags(apps, schema_editor):
+    """Construire l'index inversé à partir du champ texte existant"""
+    Opportunity = apps.get_model('opportunities', 'Opportunity')
+    Tag = apps.get_model('opportunities', 'Tag')
+    OpportunityTag = apps.get_model('opportunities', 'OpportunityTag')
+
+    tag_ids = {}
+    links = []
+    counts = {}
+    rows = Opportunity.objects.exclude(tags__isnull=True).exclude(tags='').values_list('id', 'tags')
+    for opportunity_id, value in rows.iterator():
+        seen = set()
+        for name in value.split(','):
+            name = name.strip()[:100]
+            slug = slugify(name)[:120]
+            if not slug or slug in seen:
+                continue
+            seen.add(slug)
+            if slug not in tag_ids:
+                tag_ids[slug] = Tag.objects.create(name=name, slug=slug).id
+            links.append(OpportunityTag(opportunity_id=opportunity_id, tag_id=tag_ids[slug]))
+            counts[slug] = counts.get(slug, 0) + 1
+
+    OpportunityTag.objects.bulk_create(links, batch_size=500)
+    for slug, count in counts.items():
+        Tag.objects.filter(id=tag_ids[slug]).update(opportunity_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0002_opportunity_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpportunityTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('opportunity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='opportunities.opportunity')),
+            ],
+            options={
+                'verbose_name': "tag d'opportunité",
+                'verbose_name_plural': "tags d'opportunités",
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='nom')),
+                ('slug', models.SlugField(max_length=120, unique=True, verbose_name='slug')),
+                ('opportunity_count', models.PositiveIntegerField(default=0, verbose_name="nombre d'opportunités")),
+                ('opportunities', models.ManyToManyField(blank=True, related_name='tag_set', through='opportunities.OpportunityTag', to='opportunities.opportunity')),
+            ],
+            options={
+                'verbose_name': 'tag',
+                'verbose_name_plural': 'tags',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='opportunitytag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opportunity_links', to='opportunities.tag'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='opportunitytag',
+            unique_together={('tag', 'opportunity')},
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-17 22:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0003_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpportunityTaskRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(db_index=True, max_length=50, verbose_name='tâche')),
+                ('started_at', models.DateTimeField(verbose_name='démarrée le')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='terminée le')),
+                ('stats', models.JSONField(blank=True, default=dict, verbose_name='statistiques')),
+            ],
+            options={
+                'verbose_name': 'exécution de tâche',
+                'verbose_name_plural': 'exécutions de tâches',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='opportunity',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Brouillon'), ('scheduled', 'Programmée'), ('published', 'Publiée'), ('closed', 'Clôturée'), ('expired', 'Expirée')], default='draft', max_length=20, verbose_name='statut'),
+        ),
+        migrations.AddIndex(
+            model_name='opportunity',
+            index=models.Index(fields=['status', 'deadline'], name='opportuniti_status_723867_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 22:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0004_lifecycle'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='opportunity',
+            index=models.Index(fields=['created_at', 'id'], name='opportuniti_created_dcb96a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opportunity',
+            index=models.Index(fields=['deadline', 'id'], name='opportuniti_deadlin_42ef81_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-17 22:43
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+FACET_FIELDS = {
+    'type': 'opportunity_type',
+    'category': 'category_id',
+    'location': 'location',
+    'is_remote': 'is_remote',
+    'education_level': 'education_level',
+}
+
+
+def backfill_facet_counts(apps, schema_editor):
+    """Calculer le cumul initial à partir des opportunités publiées"""
+    Opportunity = apps.get_model('opportunities', 'Opportunity')
+    OpportunityFacetCount = apps.get_model('opportunities', 'OpportunityFacetCount')
+
+    counts = Counter()
+    rows = Opportunity.objects.filter(status='published').values(*FACET_FIELDS.values()).annotate(
+        total=models.Count('pk')
+    ).order_by()
+    for row in rows:
+        for facet, field in FACET_FIELDS.items():
+            value = row[field]
+            if facet == 'is_remote':
+                value = 'true' if value else 'false'
+            elif value is not None:
+                value = str(value).strip() or None
+            if value is not None:
+                counts[(facet, value)] += row['total']
+
+    OpportunityFacetCount.objects.bulk_create([
+        OpportunityFacetCount(facet=facet, value=value, count=count)
+        for (facet, value), count in counts.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpportunityFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=30, verbose_name='facette')),
+                ('value', models.CharField(max_length=255, verbose_name='valeur')),
+                ('count', models.IntegerField(default=0, verbose_name='nombre')),
+            ],
+            options={
+                'verbose_name': 'compteur de facette',
+                'verbose_name_plural': 'compteurs de facettes',
+                'ordering': ['facet', '-count'],
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(backfill_facet_counts, migrations.RunPython.noop),
+    ]
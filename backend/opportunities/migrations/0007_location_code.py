@@ -0,0 +1,104 @@
+# Generated by Django 5.2 on 2026-10-17 22:46
+
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import migrations, models
+
+# Copie figée de la normalisation de opportunities/locations.py au moment de cette
+# migration : les évolutions de la table d'alias ne modifient pas l'historique.
+LOOKUP = {
+    'abidjan': 'abidjan',
+    'bouake': 'bouake',
+    'daloa': 'daloa',
+    'yamoussoukro': 'yamoussoukro',
+    'sanpedro': 'sanpedro',
+    'san pedro': 'sanpedro',
+    'korhogo': 'korhogo',
+    'man': 'man',
+    'abj': 'abidjan',
+    'babi': 'abidjan',
+    'cocody': 'abidjan',
+    'plateau': 'abidjan',
+    'yopougon': 'abidjan',
+    'yop': 'abidjan',
+    'treichville': 'abidjan',
+    'marcory': 'abidjan',
+    'adjame': 'abidjan',
+    'abobo': 'abidjan',
+    'koumassi': 'abidjan',
+    'port bouet': 'abidjan',
+    'attecoube': 'abidjan',
+    'riviera': 'abidjan',
+    'bingerville': 'abidjan',
+    'anyama': 'abidjan',
+    'songon': 'abidjan',
+    'yakro': 'yamoussoukro',
+}
+NON_CITY = {'remote', 'teletravail', 'a distance', 'en ligne', 'online', 'distanciel'}
+OTHER_CITY = 'other'
+MAX_ALIAS_WORDS = 2
+
+
+def fold(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.split(r'[^a-z0-9]+', text.lower())).strip()
+
+
+def normalize_location(text):
+    folded = fold(text)
+    if not folded or folded in NON_CITY:
+        return None
+    if folded in LOOKUP:
+        return LOOKUP[folded]
+    words = folded.split()
+    for size in range(min(MAX_ALIAS_WORDS, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            code = LOOKUP.get(' '.join(words[start:start + size]))
+            if code:
+                return code
+    return OTHER_CITY
+
+
+def backfill_location_codes(apps, schema_editor):
+    """Normaliser les lieux existants, puis recompter la facette 'location' par code de ville"""
+    Opportunity = apps.get_model('opportunities', 'Opportunity')
+    OpportunityFacetCount = apps.get_model('opportunities', 'OpportunityFacetCount')
+
+    ids_by_code = {}
+    rows = Opportunity.objects.exclude(location__isnull=True).exclude(location='').values_list('id', 'location')
+    for opportunity_id, location in rows.iterator():
+        code = normalize_location(location)
+        if code:
+            ids_by_code.setdefault(code, []).append(opportunity_id)
+    for code, ids in ids_by_code.items():
+        for start in range(0, len(ids), 500):
+            Opportunity.objects.filter(id__in=ids[start:start + 500]).update(location_code=code)
+
+    counts = Counter(
+        Opportunity.objects.filter(status='published', location_code__isnull=False)
+        .values_list('location_code', flat=True)
+    )
+    OpportunityFacetCount.objects.filter(facet='location').delete()
+    OpportunityFacetCount.objects.bulk_create([
+        OpportunityFacetCount(facet='location', value=code, count=count)
+        for code, count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0006_facet_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunity',
+            name='location_code',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20, null=True, verbose_name='code de ville'),
+        ),
+        migrations.RunPython(backfill_location_codes, migrations.RunPython.noop),
+    ]
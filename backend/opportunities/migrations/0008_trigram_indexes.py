@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS opportunities_opportunity_title_trgm
+        ON opportunities_opportunity USING GIN (title gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS opportunities_opportunity_organization_trgm
+        ON opportunities_opportunity USING GIN (organization gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS opportunities_tag_name_trgm
+        ON opportunities_tag USING GIN (name gin_trgm_ops)
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS opportunities_tag_name_trgm",
+    "DROP INDEX IF EXISTS opportunities_opportunity_organization_trgm",
+    "DROP INDEX IF EXISTS opportunities_opportunity_title_trgm",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0007_location_code'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD}),
+            _run({'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-17 22:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0008_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpportunitySignature',
+            fields=[
+                ('opportunity', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='opportunities.opportunity')),
+                ('minhashes', models.JSONField(default=list, verbose_name='minhash')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='mise à jour le')),
+            ],
+            options={
+                'verbose_name': "signature d'opportunité",
+                'verbose_name_plural': "signatures d'opportunités",
+            },
+        ),
+        migrations.AddField(
+            model_name='opportunity',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='opportunities.opportunity', verbose_name='doublon de'),
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField(verbose_name='similarité estimée')),
+                ('status', models.CharField(choices=[('pending', 'À examiner'), ('confirmed', 'Doublon confirmé'), ('dismissed', 'Écarté')], default='pending', max_length=20, verbose_name='statut')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='détecté le')),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True, verbose_name='examiné le')),
+                ('opportunity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='opportunities.opportunity')),
+                ('original', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='original_candidates', to='opportunities.opportunity')),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_duplicates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'doublon potentiel',
+                'verbose_name_plural': 'doublons potentiels',
+                'ordering': ['-similarity', '-created_at'],
+                'indexes': [models.Index(fields=['status', '-similarity'], name='opportuniti_status_e57a47_idx')],
+                'unique_together': {('opportunity', 'original')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OpportunitySignatureBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(verbose_name='seau')),
+                ('opportunity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_buckets', to='opportunities.opportunity')),
+            ],
+            options={
+                'verbose_name': 'seau LSH',
+                'verbose_name_plural': 'seaux LSH',
+                'indexes': [models.Index(fields=['bucket'], name='opportuniti_bucket_f1a051_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-17 23:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0009_duplicate_detection'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunity',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0, editable=False, verbose_name='score de tendance'),
+        ),
+        migrations.AddIndex(
+            model_name='useropportunity',
+            index=models.Index(fields=['created_at'], name='opportuniti_created_9a7672_idx'),
+        ),
+    ]
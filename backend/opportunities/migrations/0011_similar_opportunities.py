@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 23:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0010_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpportunityVector',
+            fields=[
+                ('opportunity', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vector', serialize=False, to='opportunities.opportunity')),
+                ('weights', models.JSONField(default=dict, verbose_name='poids des termes')),
+                ('indexed_at', models.DateTimeField(verbose_name='indexé le')),
+            ],
+            options={
+                'verbose_name': "vecteur d'opportunité",
+                'verbose_name_plural': "vecteurs d'opportunités",
+            },
+        ),
+        migrations.CreateModel(
+            name='OpportunityNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='similarité cosinus')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='opportunities.opportunity')),
+                ('opportunity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='opportunities.opportunity')),
+            ],
+            options={
+                'verbose_name': 'opportunité similaire',
+                'verbose_name_plural': 'opportunités similaires',
+                'indexes': [models.Index(fields=['opportunity', '-score'], name='opportuniti_opportu_24858d_idx')],
+                'unique_together': {('opportunity', 'neighbor')},
+            },
+        ),
+    ]
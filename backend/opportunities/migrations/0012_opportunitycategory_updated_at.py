@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0011_similar_opportunities'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunitycategory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='date de mise à jour'),
+            preserve_default=False,
+        ),
+    ]
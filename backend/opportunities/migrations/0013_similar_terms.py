@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 00:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_terms(apps, schema_editor):
+    """Index inversé construit à partir des vecteurs déjà enregistrés"""
+    OpportunityVector = apps.get_model('opportunities', 'OpportunityVector')
+    OpportunityTerm = apps.get_model('opportunities', 'OpportunityTerm')
+    rows = (
+        OpportunityTerm(vector_id=pk, term=term[:64], weight=weight)
+        for pk, weights in OpportunityVector.objects.values_list('pk', 'weights').iterator()
+        for term, weight in weights.items()
+    )
+    OpportunityTerm.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0012_opportunitycategory_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpportunityTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=64, verbose_name='terme')),
+                ('weight', models.FloatField(verbose_name='poids')),
+                ('vector', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='opportunities.opportunityvector')),
+            ],
+            options={
+                'verbose_name': 'terme indexé',
+                'verbose_name_plural': 'termes indexés',
+                'unique_together': {('vector', 'term')},
+            },
+        ),
+        migrations.RunPython(fill_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0013_similar_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpportunitySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='nom du fichier')),
+                ('content', models.BinaryField(verbose_name='contenu JSON')),
+                ('gzip_content', models.BinaryField(verbose_name='contenu gzip')),
+                ('brotli_content', models.BinaryField(blank=True, null=True, verbose_name='contenu Brotli')),
+                ('referenced_at', models.DateTimeField(verbose_name='dernière référence')),
+            ],
+            options={
+                'verbose_name': 'instantané du fil public',
+                'verbose_name_plural': 'instantanés du fil public',
+            },
+        ),
+    ]
@@ -2,16 +2,23 @@
 from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from django.utils.text import slugify
 import uuid
 
-class OpportunityCategory(models.Model):
+from core.slugs import UniqueSlugMixin
+
+from .locations import normalize_location
+
+class OpportunityCategory(UniqueSlugMixin, models.Model):
     """Catégories d'opportunités"""
+    slug_source_field = 'name'
+
     name = models.CharField(_('nom'), max_length=100)
     slug = models.SlugField(_('slug'), max_length=120, unique=True)
     description = models.TextField(_('description'), blank=True, null=True)
     icon = models.CharField(_('icône'), max_length=50, blank=True, null=True)
     is_active = models.BooleanField(_('est actif'), default=True)
+    # Le nom de la catégorie figure dans les réponses des opportunités (ETag)
+    updated_at = models.DateTimeField(_('date de mise à jour'), auto_now=True)
     
     class Meta:
         verbose_name = _('catégorie d\'opportunité')
@@ -20,13 +27,29 @@ class OpportunityCategory(models.Model):
     
     def __str__(self):
         return self.name
+
+class OpportunityQuerySet(models.QuerySet):
+    """Requêtes courantes sur les opportunités"""
     
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+    def with_list_relations(self, user=None):
+        """
+        Charger en une fois ce qu'affiche OpportunityListSerializer : catégorie, créateur
+        et relations de l'utilisateur courant (dans ``current_user_relations``)
+        """
+        queryset = self.select_related('category', 'creator')
+        if user is not None and user.is_authenticated:
+            queryset = queryset.prefetch_related(
+                models.Prefetch(
+                    'user_relations',
+                    queryset=UserOpportunity.objects.filter(user=user).only(
+                        'id', 'opportunity', 'relation_type', 'created_at'
+                    ),
+                    to_attr='current_user_relations'
+                )
+            )
+        return queryset
 
-class Opportunity(models.Model):
+class Opportunity(UniqueSlugMixin, models.Model):
     """Modèle principal pour les opportunités"""
     # Types d'opportunités
     TYPE_CHOICES = (
@@ -42,6 +65,7 @@ class Opportunity(models.Model):
     # Statuts d'opportunité
     STATUS_CHOICES = (
         ('draft', _('Brouillon')),
+        ('scheduled', _('Programmée')),
         ('published', _('Publiée')),
         ('closed', _('Clôturée')),
         ('expired', _('Expirée')),
@@ -66,6 +90,9 @@ class Opportunity(models.Model):
     
     # Détails
     location = models.CharField(_('lieu'), max_length=255, blank=True, null=True)
+    # Code de ville normalisé à partir de ``location`` (voir opportunities/locations.py)
+    location_code = models.CharField(_('code de ville'), max_length=20, blank=True, null=True,
+                                     db_index=True, editable=False)
     is_remote = models.BooleanField(_('à distance'), default=False)
     organization = models.CharField(_('organisme/entreprise'), max_length=255)
     website = models.URLField(_('site web'), blank=True, null=True)
@@ -89,31 +116,37 @@ class Opportunity(models.Model):
     creator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, 
                               related_name='created_opportunities')
     
+    # Doublon confirmé par le staff (masqué des listes avec ``collapse_duplicates``)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='duplicates', verbose_name=_('doublon de'))
+    
     # Pour le suivi des statistiques
     view_count = models.PositiveIntegerField(_('nombre de vues'), default=0)
     application_count = models.PositiveIntegerField(_('nombre de candidatures'), default=0)
+    # Tendance (log du score décroissant, voir trending.py) : tri ``?ordering=-trending``
+    trending_score = models.FloatField(_('score de tendance'), default=0, db_index=True, editable=False)
+    
+    objects = OpportunityQuerySet.as_manager()
     
     class Meta:
         verbose_name = _('opportunité')
         verbose_name_plural = _('opportunités')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'deadline']),  # Expiration et listes actives
+            models.Index(fields=['created_at', 'id']),  # Pagination par curseur (fil par date)
+            models.Index(fields=['deadline', 'id']),  # Pagination par curseur (fil par date limite)
+        ]
     
     def __str__(self):
         return self.title
     
     def save(self, *args, **kwargs):
-        """Générer un slug unique lors de la sauvegarde"""
-        if not self.slug:
-            base_slug = slugify(self.title)
-            unique_slug = base_slug
-            counter = 1
-            
-            while Opportunity.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-                
-            self.slug = unique_slug
-            
+        """Normaliser le lieu en code de ville à chaque écriture"""
+        self.location_code = normalize_location(self.location)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'location_code'}
         super().save(*args, **kwargs)
     
     @property
@@ -130,6 +163,21 @@ class Opportunity(models.Model):
             self.status = 'expired'
             self.save(update_fields=['status'])
 
+class UserOpportunityQuerySet(models.QuerySet):
+    """Requêtes courantes sur les relations utilisateur-opportunité"""
+    
+    def with_opportunity_details(self, user):
+        """Précharger l'opportunité liée telle qu'affichée par OpportunityListSerializer"""
+        return self.select_related('opportunity__category', 'opportunity__creator').prefetch_related(
+            models.Prefetch(
+                'opportunity__user_relations',
+                queryset=UserOpportunity.objects.filter(user=user).only(
+                    'id', 'opportunity', 'relation_type', 'created_at'
+                ),
+                to_attr='current_user_relations'
+            )
+        )
+
 class UserOpportunity(models.Model):
     """Relation entre utilisateurs et opportunités"""
     # Types de relations
@@ -150,11 +198,195 @@ class UserOpportunity(models.Model):
     notes = models.TextField(_('notes'), blank=True, null=True)
     status = models.CharField(_('statut'), max_length=50, blank=True, null=True)
     
+    objects = UserOpportunityQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('opportunité utilisateur')
         verbose_name_plural = _('opportunités utilisateur')
         unique_together = ('user', 'opportunity', 'relation_type')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),  # Événements récents (trending.py)
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.opportunity.title} ({self.get_relation_type_display()})"
+
+class Tag(models.Model):
+    """Tag normalisé, partagé entre les opportunités"""
+    name = models.CharField(_('nom'), max_length=100)
+    slug = models.SlugField(_('slug'), max_length=120, unique=True)
+    opportunity_count = models.PositiveIntegerField(_('nombre d\'opportunités'), default=0)
+    opportunities = models.ManyToManyField(Opportunity, through='OpportunityTag',
+                                           related_name='tag_set', blank=True)
+    
+    class Meta:
+        verbose_name = _('tag')
+        verbose_name_plural = _('tags')
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+class OpportunityTag(models.Model):
+    """Index inversé tag -> opportunités"""
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='opportunity_links')
+    opportunity = models.ForeignKey(Opportunity, on_delete=models.CASCADE, related_name='tag_links')
+    
+    class Meta:
+        verbose_name = _('tag d\'opportunité')
+        verbose_name_plural = _('tags d\'opportunités')
+        # L'index unique (tag, opportunity) sert aussi de clé de recherche par tag
+        unique_together = ('tag', 'opportunity')
+    
+    def __str__(self):
+        return f"{self.tag.name} - {self.opportunity.title}"
+
+class OpportunityTaskRun(models.Model):
+    """Journal d'exécution des tâches périodiques sur les opportunités"""
+    task = models.CharField(_('tâche'), max_length=50, db_index=True)
+    started_at = models.DateTimeField(_('démarrée le'))
+    finished_at = models.DateTimeField(_('terminée le'), blank=True, null=True)
+    stats = models.JSONField(_('statistiques'), default=dict, blank=True)
+    
+    class Meta:
+        verbose_name = _('exécution de tâche')
+        verbose_name_plural = _('exécutions de tâches')
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.task} - {self.started_at:%Y-%m-%d %H:%M}"
+
+class OpportunitySnapshot(models.Model):
+    """Fichier d'instantané JSON du fil public, servi par l'API (voir snapshots.py)"""
+    name = models.CharField(_('nom du fichier'), max_length=255, unique=True)
+    content = models.BinaryField(_('contenu JSON'))
+    gzip_content = models.BinaryField(_('contenu gzip'))
+    brotli_content = models.BinaryField(_('contenu Brotli'), blank=True, null=True)
+    referenced_at = models.DateTimeField(_('dernière référence'))
+    
+    class Meta:
+        verbose_name = _('instantané du fil public')
+        verbose_name_plural = _('instantanés du fil public')
+    
+    def __str__(self):
+        return self.name
+
+class OpportunityFacetCount(models.Model):
+    """Nombre d'opportunités publiées par valeur de facette (table de cumul)"""
+    facet = models.CharField(_('facette'), max_length=30)
+    value = models.CharField(_('valeur'), max_length=255)
+    count = models.IntegerField(_('nombre'), default=0)
+    
+    class Meta:
+        verbose_name = _('compteur de facette')
+        verbose_name_plural = _('compteurs de facettes')
+        unique_together = ('facet', 'value')
+        ordering = ['facet', '-count']
+    
+    def __str__(self):
+        return f"{self.facet}={self.value} ({self.count})"
+
+class OpportunitySignature(models.Model):
+    """Signature MinHash d'une opportunité (titre, organisme, description)"""
+    opportunity = models.OneToOneField(Opportunity, on_delete=models.CASCADE, primary_key=True,
+                                       related_name='signature')
+    minhashes = models.JSONField(_('minhash'), default=list)
+    updated_at = models.DateTimeField(_('mise à jour le'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('signature d\'opportunité')
+        verbose_name_plural = _('signatures d\'opportunités')
+    
+    def __str__(self):
+        return str(self.opportunity_id)
+
+class OpportunitySignatureBucket(models.Model):
+    """Index LSH : une ligne par bande de la signature, clé de recherche des doublons"""
+    opportunity = models.ForeignKey(Opportunity, on_delete=models.CASCADE, related_name='signature_buckets')
+    bucket = models.BigIntegerField(_('seau'))
+    
+    class Meta:
+        verbose_name = _('seau LSH')
+        verbose_name_plural = _('seaux LSH')
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
+    
+    def __str__(self):
+        return f"{self.bucket} - {self.opportunity_id}"
+
+class DuplicateCandidate(models.Model):
+    """Paire d'opportunités quasi identiques, à examiner par le staff"""
+    STATUS_CHOICES = (
+        ('pending', _('À examiner')),
+        ('confirmed', _('Doublon confirmé')),
+        ('dismissed', _('Écarté')),
+    )
+    
+    # ``opportunity`` est la plus récente des deux, ``original`` la plus ancienne
+    opportunity = models.ForeignKey(Opportunity, on_delete=models.CASCADE, related_name='duplicate_candidates')
+    original = models.ForeignKey(Opportunity, on_delete=models.CASCADE, related_name='original_candidates')
+    similarity = models.FloatField(_('similarité estimée'))
+    status = models.CharField(_('statut'), max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(_('détecté le'), auto_now_add=True)
+    reviewed_at = models.DateTimeField(_('examiné le'), blank=True, null=True)
+    reviewed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='reviewed_duplicates')
+    
+    class Meta:
+        verbose_name = _('doublon potentiel')
+        verbose_name_plural = _('doublons potentiels')
+        unique_together = ('opportunity', 'original')
+        ordering = ['-similarity', '-created_at']
+        indexes = [
+            models.Index(fields=['status', '-similarity']),
+        ]
+    
+    def __str__(self):
+        return f"{self.opportunity.title} ~ {self.original.title} ({self.similarity:.2f})"
+
+class OpportunityVector(models.Model):
+    """Vecteur TF-IDF (normé) d'une opportunité publiée, base du calcul des voisins"""
+    opportunity = models.OneToOneField(Opportunity, on_delete=models.CASCADE, primary_key=True,
+                                       related_name='vector')
+    weights = models.JSONField(_('poids des termes'), default=dict)
+    indexed_at = models.DateTimeField(_('indexé le'))
+    
+    class Meta:
+        verbose_name = _('vecteur d\'opportunité')
+        verbose_name_plural = _('vecteurs d\'opportunités')
+    
+    def __str__(self):
+        return str(self.opportunity_id)
+
+class OpportunityTerm(models.Model):
+    """Entrée de l'index inversé des vecteurs : poids d'un terme dans une opportunité"""
+    vector = models.ForeignKey(OpportunityVector, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(_('terme'), max_length=64, db_index=True)
+    weight = models.FloatField(_('poids'))
+    
+    class Meta:
+        verbose_name = _('terme indexé')
+        verbose_name_plural = _('termes indexés')
+        unique_together = ('vector', 'term')
+    
+    def __str__(self):
+        return f"{self.term} ({self.vector_id})"
+
+class OpportunityNeighbor(models.Model):
+    """Opportunité similaire précalculée (bloc « Vous aimerez aussi » de la page détail)"""
+    opportunity = models.ForeignKey(Opportunity, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Opportunity, on_delete=models.CASCADE, related_name='neighbor_of')
+    score = models.FloatField(_('similarité cosinus'))
+    
+    class Meta:
+        verbose_name = _('opportunité similaire')
+        verbose_name_plural = _('opportunités similaires')
+        unique_together = ('opportunity', 'neighbor')
+        indexes = [
+            models.Index(fields=['opportunity', '-score']),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.opportunity.title} ({self.get_relation_type_display()})"
\ No newline at end of file
+        return f"{self.opportunity_id} ~ {self.neighbor_id} ({self.score:.2f})"
@@ -0,0 +1,175 @@
+# opportunities/pagination.py
+"""
+Pagination des fils d'opportunités.
+
+Le mode par défaut reste la pagination par numéro de page (``?page=N``).
+Les clients qui font du défilement infini peuvent demander ``?pagination=cursor`` :
+la page suivante est alors obtenue par une recherche par clé (keyset) sur
+``(created_at, id)`` ou ``(deadline, id)``, sans ``COUNT(*)`` ni ``OFFSET``.
+Le curseur reste stable même si de nouvelles opportunités sont publiées entre deux pages.
+Les autres tris (tendance, pertinence d'une recherche ``q``) n'existent qu'en mode page :
+les combiner avec le mode curseur renvoie une erreur 400.
+"""
+import base64
+import binascii
+import json
+import uuid
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+PAGINATION_QUERY_PARAM = 'pagination'
+CURSOR_MODE = 'cursor'
+
+# Tris acceptés en mode curseur : ordering demandé -> (champ, décroissant)
+KEYSET_ORDERINGS = {
+    '-created_at': ('created_at', True),
+    'created_at': ('created_at', False),
+    'deadline': ('deadline', False),
+    '-deadline': ('deadline', True),
+}
+DEFAULT_KEYSET_ORDERING = '-created_at'
+
+# Paramètres de recherche classée par pertinence, incompatibles avec le mode curseur
+RANKED_SEARCH_PARAMS = ('q', 'search')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par clé, vers l'avant uniquement
+
+    Le curseur encode l'ordre de tri et la dernière paire (valeur, id) servie.
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    invalid_cursor_message = "Curseur invalide."
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def get_ordering(self, request):
+        params = request.query_params
+        for name in RANKED_SEARCH_PARAMS:
+            if params.get(name, '').strip():
+                raise ValidationError({
+                    name: "La recherche est classée par pertinence : utilisez la pagination par page."
+                })
+        ordering = params.get(self.ordering_query_param, '').strip()
+        if not ordering:
+            return DEFAULT_KEYSET_ORDERING
+        if ordering not in KEYSET_ORDERINGS:
+            raise ValidationError({
+                self.ordering_query_param: (
+                    f"Tri non disponible en mode curseur. Valeurs acceptées : {', '.join(KEYSET_ORDERINGS)}."
+                )
+            })
+        return ordering
+
+    def encode_cursor(self, ordering, value, pk):
+        payload = json.dumps({'o': ordering, 'v': value.isoformat(), 'id': str(pk)})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            value = parse_datetime(payload['v'])
+            pk = uuid.UUID(payload['id'])
+        except (TypeError, ValueError, KeyError, AttributeError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        # Un curseur ne vaut que pour le tri qui l'a produit
+        if value is None or payload.get('o') != ordering:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def get_window(self, queryset, request):
+        """Requête de la page demandée (une ligne de plus pour savoir s'il existe une suite)"""
+        ordering = self.get_ordering(request)
+        field, descending = KEYSET_ORDERINGS[ordering]
+
+        # Les opportunités sans date limite n'ont pas de position dans ce fil
+        queryset = queryset.filter(**{f'{field}__isnull': False})
+        if descending:
+            queryset = queryset.order_by(f'-{field}', '-id')
+        else:
+            queryset = queryset.order_by(field, 'id')
+
+        cursor = self.decode_cursor(request, ordering)
+        if cursor is not None:
+            value, pk = cursor
+            direction = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{direction}': value}) | Q(**{field: value, f'id__{direction}': pk})
+            )
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(request)
+        field, _ = KEYSET_ORDERINGS[ordering]
+
+        rows = list(self.get_window(queryset, request))
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(ordering, getattr(last, field), last.pk)
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class OpportunityPagination(PageNumberPagination):
+    """Pagination par page par défaut, par curseur avec ``?pagination=cursor``"""
+
+    def is_cursor_mode(self, request):
+        return request.query_params.get(PAGINATION_QUERY_PARAM) == CURSOR_MODE
+
+    def get_conditional_queryset(self, queryset, request):
+        """Lignes couvertes par l'ETag : la fenêtre de la page en mode curseur (pas de COUNT)"""
+        if self.is_cursor_mode(request):
+            return KeysetPagination(self.get_page_size(request)).get_window(queryset, request)
+        return queryset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.is_cursor_mode(request):
+            self.keyset = KeysetPagination(self.get_page_size(request))
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,194 @@
+# opportunities/prerank.py
+"""
+Pré-classement BM25 des opportunités publiées pour un profil utilisateur.
+
+Sert à choisir localement, en quelques millisecondes, les ``TOP_K`` candidates envoyées
+au modèle de langage pour les recommandations IA (au lieu d'un sous-ensemble arbitraire
+du catalogue), et de classement de repli quand l'étape LLM est désactivée ou en échec.
+
+L'index (listes inversées terme -> [(document, fréquence)], longueurs des documents)
+est construit en mémoire à partir de tout le catalogue publié, au premier usage. Chaque
+modification d'une opportunité publiée incrémente une version partagée dans le cache ;
+un processus dont l'index est en retard le reconstruit, au plus une fois par
+``REFRESH_INTERVAL``.
+
+Le profil est transformé en requête pondérée : compétences, centres d'intérêt et
+objectifs (mots normalisés et racinisés comme pour les opportunités similaires), niveau
+d'études (comparé au niveau requis) et ville (comparée au code de ville de l'opportunité).
+"""
+import heapq
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .locations import OTHER_CITY, normalize_location
+from .models import Opportunity
+from .similar import terms
+
+VERSION_KEY = 'opportunities:prerank:version'
+
+# Champs du document (le titre compte double)
+TEXT_FIELDS = ('title', 'title', 'organization', 'tags', 'category__name', 'description')
+
+DEFAULT_CONFIG = {
+    'K1': 1.2,
+    'B': 0.75,
+    'REFRESH_INTERVAL': 60,  # secondes minimum entre deux reconstructions par processus
+    # Poids des éléments du profil dans la requête
+    'WEIGHTS': {
+        'skills': 1.0,
+        'interests': 0.8,
+        'career_goals': 0.5,
+        'education_level': 0.5,
+        'city': 0.5,
+    },
+}
+
+
+def get_config(name):
+    return getattr(settings, 'OPPORTUNITY_PRERANK_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def education_terms(text):
+    return [f'edu:{term}' for term in terms(text)]
+
+
+def city_term(code):
+    return f'city:{code}'
+
+
+class BM25Index:
+    """Listes inversées du catalogue publié et score BM25 d'une requête pondérée"""
+
+    def __init__(self, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ids = []
+        self.lengths = []
+        self.postings = defaultdict(list)
+
+    def add(self, pk, counts):
+        doc = len(self.ids)
+        self.ids.append(pk)
+        self.lengths.append(sum(counts.values()))
+        for term, count in counts.items():
+            self.postings[term].append((doc, count))
+
+    @property
+    def average_length(self):
+        return (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.ids) - df + 0.5) / (df + 0.5))
+
+    def top(self, query, k, exclude=()):
+        """
+        [(id, score)] des k meilleurs documents pour la requête {terme: poids}
+
+        Seules les listes des termes de la requête sont parcourues.
+        """
+        k1, b = get_config('K1'), get_config('B')
+        average = self.average_length or 1.0
+        scores = defaultdict(float)
+        for term, weight in query.items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term) * weight
+            for doc, count in postings:
+                norm = k1 * (1 - b + b * self.lengths[doc] / average)
+                scores[doc] += idf * count * (k1 + 1) / (count + norm)
+        excluded = {str(pk) for pk in exclude}
+        ranked = (
+            (self.ids[doc], score) for doc, score in scores.items()
+            if str(self.ids[doc]) not in excluded
+        )
+        return heapq.nlargest(k, ranked, key=lambda item: (item[1], str(item[0])))
+
+
+def build_index(version=None):
+    index = BM25Index(version=version)
+    fields = list(dict.fromkeys(TEXT_FIELDS))
+    rows = Opportunity.objects.filter(status='published').order_by().values_list(
+        'pk', 'education_level', 'location_code', *fields
+    )
+    for pk, education_level, location_code, *values in rows.iterator(chunk_size=1000):
+        values = dict(zip(fields, values))
+        counts = Counter(terms(' '.join(values[field] or '' for field in TEXT_FIELDS)))
+        counts.update(education_terms(education_level or ''))
+        if location_code and location_code != OTHER_CITY:
+            counts[city_term(location_code)] += 1
+        index.add(pk, counts)
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Index du processus, (re)construit s'il manque ou si le catalogue a changé"""
+    global _index
+    version = cache.get(VERSION_KEY)
+    with _index_lock:
+        stale = _index is not None and _index.version != version and (
+            time.monotonic() - _index.built_at >= get_config('REFRESH_INTERVAL')
+        )
+        if _index is None or stale:
+            _index = build_index(version=version)
+        return _index
+
+
+def invalidate():
+    """Le catalogue publié a changé : get_index() reconstruira, au plus une fois par REFRESH_INTERVAL"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 0, timeout=None)
+        cache.incr(VERSION_KEY)
+
+
+def profile_query(profile):
+    """
+    Requête pondérée {terme: poids} d'un profil
+
+    Args:
+        profile: dictionnaire avec skills et interests (listes), career_goals,
+            education_level et city (code de ville ou libellé)
+    """
+    weights = get_config('WEIGHTS')
+    query = defaultdict(float)
+    for key in ('skills', 'interests'):
+        for term in terms(' '.join(profile.get(key) or [])):
+            query[term] += weights[key]
+    for term in terms(profile.get('career_goals') or ''):
+        query[term] += weights['career_goals']
+    for term in education_terms(profile.get('education_level') or ''):
+        query[term] += weights['education_level']
+    city = normalize_location(profile.get('city') or '')
+    if city and city != OTHER_CITY:
+        query[city_term(city)] += weights['city']
+    return dict(query)
+
+
+def top_candidates(profile, k, exclude=()):
+    """
+    Identifiants des k opportunités publiées les plus pertinentes pour le profil
+
+    Returns:
+        [(id, score)] par score décroissant ; un profil vide ou sans correspondance
+        renvoie les opportunités en vogue (score 0)
+    """
+    ranked = get_index().top(profile_query(profile), k, exclude=exclude)
+    if len(ranked) < k:
+        seen = {str(pk) for pk, _ in ranked} | {str(pk) for pk in exclude}
+        filler = Opportunity.objects.filter(status='published').exclude(pk__in=list(seen)).order_by(
+            '-trending_score', '-created_at'
+        ).values_list('pk', flat=True)[:k - len(ranked)]
+        ranked.extend((pk, 0.0) for pk in filler)
+    return ranked
@@ -0,0 +1,101 @@
+# opportunities/relations.py
+"""
+Opérations groupées sur les relations utilisateur-opportunité (favoris, candidatures).
+
+Utilisées par les actions ``bulk_save``, ``bulk_unsave`` et ``bulk_apply`` de l'API,
+notamment pour la synchronisation hors ligne de l'application mobile : les identifiants
+sont résolus en une requête, les relations existantes lues en une requête, puis créées
+(``bulk_create``) ou supprimées en une seule transaction. Chaque identifiant reçoit un
+résultat individuel.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import counters
+from .models import Opportunity, UserOpportunity
+
+MAX_BULK_IDS = 100
+
+# Résultats par identifiant
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+EXPIRED = 'expired'
+
+
+def visible_opportunities(user, ids):
+    """{id: date limite} des opportunités demandées visibles par l'utilisateur, en une requête"""
+    return dict(
+        Opportunity.objects.filter(pk__in=ids).filter(
+            Q(status='published') | Q(status='expired') | Q(creator=user)
+        ).values_list('pk', 'deadline').order_by()
+    )
+
+
+def _unique(ids):
+    return list(dict.fromkeys(ids))
+
+
+def bulk_add(user, ids, relation_type, reject_expired=False, **fields):
+    """
+    Créer les relations manquantes
+
+    Args:
+        user: utilisateur propriétaire des relations
+        ids: identifiants d'opportunités (doublons ignorés)
+        relation_type: 'saved' ou 'applied'
+        reject_expired: refuser les opportunités dont la date limite est passée
+        fields: valeurs des autres champs des relations créées (ex. status)
+
+    Returns:
+        {id: CREATED | EXISTS | NOT_FOUND | EXPIRED}
+    """
+    ids = _unique(ids)
+    found = visible_opportunities(user, ids)
+    now = timezone.now()
+
+    results = {}
+    wanted = []
+    for pk in ids:
+        if pk not in found:
+            results[pk] = NOT_FOUND
+        elif reject_expired and found[pk] and found[pk] < now:
+            results[pk] = EXPIRED
+        else:
+            wanted.append(pk)
+
+    existing = set(UserOpportunity.objects.filter(
+        user=user, relation_type=relation_type, opportunity_id__in=wanted
+    ).values_list('opportunity_id', flat=True).order_by())
+    to_create = [pk for pk in wanted if pk not in existing]
+
+    with transaction.atomic():
+        # ignore_conflicts : une requête concurrente a pu créer la même relation entre-temps
+        UserOpportunity.objects.bulk_create([
+            UserOpportunity(user=user, opportunity_id=pk, relation_type=relation_type, **fields)
+            for pk in to_create
+        ], ignore_conflicts=True)
+        if relation_type == 'applied' and to_create:
+            # bulk_create n'émet pas post_save : recompter à partir des relations réellement présentes
+            counters.recount_applications(to_create)
+
+    results.update({pk: EXISTS for pk in existing})
+    results.update({pk: CREATED for pk in to_create})
+    return {pk: results[pk] for pk in ids}
+
+
+def bulk_remove(user, ids, relation_type):
+    """
+    Supprimer des relations en une requête
+
+    Returns:
+        {id: DELETED | NOT_FOUND}
+    """
+    ids = _unique(ids)
+    relations = UserOpportunity.objects.filter(user=user, relation_type=relation_type, opportunity_id__in=ids)
+    with transaction.atomic():
+        existing = set(relations.select_for_update().values_list('opportunity_id', flat=True))
+        relations.delete()
+    return {pk: DELETED if pk in existing else NOT_FOUND for pk in ids}
@@ -0,0 +1,250 @@
+# opportunities/search.py
+"""
+Index plein texte des opportunités.
+
+- PostgreSQL : colonne ``search_vector`` (tsvector) indexée en GIN, construite avec
+  la configuration ``french_unaccent`` (racinisation française + suppression des accents).
+- SQLite (dev/test) : table virtuelle FTS5 ``opportunities_opportunity_fts``
+  (tokenizer unicode61 sans diacritiques, requêtes par préfixe après une racinisation légère).
+
+Les fautes de frappe sont tolérées grâce aux trigrammes (voir trigram.py) : termes
+élargis à leurs corrections avec FTS5, similarité ``pg_trgm`` sur le titre et l'organisme
+avec PostgreSQL.
+
+L'index est maintenu à chaque ``Opportunity.save`` (voir signals.py) et peut être
+reconstruit avec ``python manage.py rebuild_search_index``.
+"""
+import re
+import unicodedata
+import uuid
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from . import trigram
+from .models import Opportunity
+
+TABLE = Opportunity._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+TS_CONFIG = 'french_unaccent'
+
+# Champs dont la modification nécessite une réindexation
+INDEXED_FIELDS = ('title', 'description', 'organization', 'tags')
+
+# Poids de la similarité trigramme face au rang plein texte (PostgreSQL)
+FUZZY_RANK_WEIGHT = 0.1
+
+# Taille des lots pour les requêtes IN (limite de variables SQLite)
+BATCH_SIZE = 500
+
+# Suffixes retirés avant la recherche par préfixe (racinisation légère du français)
+FRENCH_SUFFIXES = (
+    'issements', 'issement', 'ements', 'ement', 'ations', 'ation', 'euses', 'euse',
+    'eurs', 'eur', 'ives', 'ive', 'ifs', 'if', 'ites', 'ite', 'es', 's', 'x', 'e',
+)
+
+POSTGRES_VECTOR_SQL = (
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(organization, '') || ' ' || coalesce(tags, '')), 'B') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'C')"
+)
+
+
+def fold(text):
+    """Mettre en minuscules et supprimer les accents"""
+    normalized = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in normalized if not unicodedata.combining(c)).lower()
+
+
+def stem(word):
+    """Racinisation légère : retirer le suffixe le plus long en gardant au moins 4 lettres"""
+    for suffix in FRENCH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Découper un texte en mots normalisés"""
+    return re.findall(r'\w+', fold(text))
+
+
+def _no_results(queryset):
+    return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class PostgresSearchBackend:
+    """Recherche via tsvector + index GIN"""
+
+    def index(self, pks):
+        with connection.cursor() as cursor:
+            for chunk in _chunks(pks):
+                cursor.execute(
+                    f"UPDATE {TABLE} SET search_vector = {POSTGRES_VECTOR_SQL} WHERE id = ANY(%s)",
+                    [[uuid.UUID(str(pk)) for pk in chunk]]
+                )
+
+    def remove(self, pks):
+        # La colonne disparaît avec la ligne
+        pass
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {TABLE} SET search_vector = {POSTGRES_VECTOR_SQL}")
+
+    def search(self, queryset, query):
+        # Correspondance plein texte, ou titre / organisme proche par trigrammes (fautes de frappe)
+        tsquery = f"websearch_to_tsquery('{TS_CONFIG}', %s)"
+        fuzzy = query.lower()
+        return queryset.filter(
+            RawSQL(
+                f"({TABLE}.search_vector @@ {tsquery} OR %s <%% {TABLE}.title OR %s <%% {TABLE}.organization)",
+                [query, fuzzy, fuzzy], output_field=BooleanField()
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"GREATEST(ts_rank_cd({TABLE}.search_vector, {tsquery}), "
+                f"{FUZZY_RANK_WEIGHT} * word_similarity(%s, {TABLE}.title), "
+                f"{FUZZY_RANK_WEIGHT} * word_similarity(%s, {TABLE}.organization))",
+                [query, fuzzy, fuzzy], output_field=FloatField()
+            )
+        )
+
+
+class SQLiteSearchBackend:
+    """Recherche via une table virtuelle FTS5"""
+
+    def index(self, pks):
+        with connection.cursor() as cursor:
+            for chunk in _chunks(pks):
+                ids = [uuid.UUID(str(pk)).hex for pk in chunk]
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE opportunity_id IN ({placeholders})", ids
+                )
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (opportunity_id, title, organization, tags, description) "
+                    f"SELECT id, title, organization, COALESCE(tags, ''), description "
+                    f"FROM {TABLE} WHERE id IN ({placeholders})",
+                    ids
+                )
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            for chunk in _chunks(pks):
+                ids = [uuid.UUID(str(pk)).hex for pk in chunk]
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE opportunity_id IN ({placeholders})", ids
+                )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (opportunity_id, title, organization, tags, description) "
+                f"SELECT id, title, organization, COALESCE(tags, ''), description FROM {TABLE}"
+            )
+
+    def match_expression(self, query):
+        """
+        Construire une requête FTS5 : tous les termes, chacun par préfixe
+
+        Un terme inconnu du vocabulaire est élargi à ses corrections les plus proches
+        (« developeur » -> ``("developeur"* OR "developpeur"*)``).
+        """
+        groups = []
+        for term in tokenize(query):
+            alternatives = []
+            for word in [term, *trigram.corrections(term)]:
+                prefix = f'"{stem(word)}"*'
+                if prefix not in alternatives:
+                    alternatives.append(prefix)
+            groups.append(alternatives[0] if len(alternatives) == 1 else f"({' OR '.join(alternatives)})")
+        return ' '.join(groups)
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return _no_results(queryset)
+
+        # Sous-requêtes FTS5 évaluées dans la même requête que les filtres et la visibilité :
+        # aucun plafond sur les correspondances brutes (brouillons, expirées…)
+        matches = RawSQL(f"SELECT opportunity_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        # Pondération bm25 par colonne : id, titre, organisme, tags, description ; bm25 renvoie
+        # un score négatif (plus il est bas, plus le document est pertinent)
+        rank = RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}, 0.0, 10.0, 4.0, 4.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.opportunity_id = {TABLE}.id)",
+            [match], output_field=FloatField()
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+
+class FallbackSearchBackend:
+    """Recherche par sous-chaînes pour les bases sans index plein texte"""
+
+    def index(self, pks):
+        pass
+
+    def remove(self, pks):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, queryset, query):
+        q_objects = Q()
+        for term in query.split():
+            q_objects &= (
+                Q(title__icontains=term) | Q(description__icontains=term) |
+                Q(organization__icontains=term) | Q(tags__icontains=term)
+            )
+        return queryset.filter(q_objects).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend(),
+    'sqlite': SQLiteSearchBackend(),
+}
+
+
+def get_backend():
+    """Retourner le moteur de recherche adapté à la base de données courante"""
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend())
+
+
+def search_opportunities(queryset, query):
+    """Filtrer un queryset d'opportunités et l'annoter avec ``search_rank``"""
+    query = (query or '').strip()
+    if not query:
+        return queryset
+    return get_backend().search(queryset, query)
+
+
+def index_opportunities(pks):
+    """(Ré)indexer les opportunités données"""
+    pks = list(pks)
+    if pks:
+        get_backend().index(pks)
+
+
+def remove_opportunities(pks):
+    """Retirer des opportunités de l'index"""
+    pks = list(pks)
+    if pks:
+        get_backend().remove(pks)
+
+
+def rebuild_index():
+    """Reconstruire entièrement l'index"""
+    get_backend().rebuild()
@@ -1,9 +1,11 @@
 # opportunities/serializers.py
 from rest_framework import serializers
-from .models import Opportunity, OpportunityCategory, UserOpportunity
+from .models import DuplicateCandidate, Opportunity, OpportunityCategory, UserOpportunity, Tag
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+from .relations import MAX_BULK_IDS
+
 User = get_user_model()
 
 class OpportunityCategorySerializer(serializers.ModelSerializer):
@@ -11,6 +13,11 @@ class OpportunityCategorySerializer(serializers.ModelSerializer):
         model = OpportunityCategory
         fields = '__all__'
 
+class TagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tag
+        fields = ('name', 'slug', 'opportunity_count')
+
 class OpportunityListSerializer(serializers.ModelSerializer):
     category_name = serializers.ReadOnlyField(source='category.name')
     creator_name = serializers.ReadOnlyField(source='creator.get_full_name')
@@ -21,7 +28,7 @@ class OpportunityListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Opportunity
         fields = ('id', 'title', 'slug', 'category', 'category_name', 'opportunity_type',
-                 'deadline', 'location', 'is_remote', 'organization', 'featured',
+                 'deadline', 'location', 'location_code', 'is_remote', 'organization', 'featured',
                  'status', 'creator_name', 'is_expired', 'time_left', 'user_relation')
     
     def get_time_left(self, obj):
@@ -54,6 +61,10 @@ class OpportunityListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return None
+        
+        # Utiliser les relations préchargées si disponibles (voir with_list_relations)
+        if hasattr(obj, 'current_user_relations'):
+            return [relation.relation_type for relation in obj.current_user_relations] or None
             
         user_relations = UserOpportunity.objects.filter(
             user=request.user,
@@ -69,13 +80,22 @@ class OpportunityDetailSerializer(OpportunityListSerializer):
         model = Opportunity
         fields = '__all__'
         read_only_fields = ('id', 'slug', 'created_at', 'updated_at', 
-                          'view_count', 'application_count', 'creator')
+                          'view_count', 'application_count', 'trending_score', 'creator', 'duplicate_of')
 
 class OpportunityCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Opportunity
         exclude = ('id', 'slug', 'created_at', 'updated_at', 'creator', 
-                  'view_count', 'application_count')
+                  'view_count', 'application_count', 'trending_score', 'location_code', 'duplicate_of')
+    
+    def validate(self, attrs):
+        status = attrs.get('status', getattr(self.instance, 'status', None))
+        publication_date = attrs.get('publication_date', getattr(self.instance, 'publication_date', None))
+        if status == 'scheduled' and not publication_date:
+            raise serializers.ValidationError(
+                {'publication_date': "Une date de publication est requise pour programmer une opportunité."}
+            )
+        return attrs
     
     def create(self, validated_data):
         request = self.context.get('request')
@@ -87,6 +107,28 @@ class OpportunityCreateUpdateSerializer(serializers.ModelSerializer):
             
         return super().create(validated_data)
 
+class OpportunityImportSerializer(OpportunityCreateUpdateSerializer):
+    """Validation d'une ligne d'import (catégorie par slug ou nom, résolue en mémoire)"""
+    category = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    
+    class Meta(OpportunityCreateUpdateSerializer.Meta):
+        pass
+    
+    def validate_category(self, value):
+        if not value:
+            return None
+        categories = self.context['categories']
+        category_id = categories.get(value.strip().lower())
+        if category_id is None:
+            raise serializers.ValidationError(f"Catégorie inconnue : {value}")
+        return category_id
+
+class BulkRelationSerializer(serializers.Serializer):
+    """Identifiants d'opportunités d'une opération groupée"""
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=MAX_BULK_IDS
+    )
+
 class UserOpportunitySerializer(serializers.ModelSerializer):
     opportunity_details = OpportunityListSerializer(source='opportunity', read_only=True)
     
@@ -100,3 +142,19 @@ class UserOpportunitySerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         validated_data['user'] = request.user
         return super().create(validated_data)
+
+class DuplicateOpportunitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Opportunity
+        fields = ('id', 'title', 'slug', 'organization', 'status', 'creator', 'created_at', 'duplicate_of')
+
+class DuplicateCandidateSerializer(serializers.ModelSerializer):
+    opportunity = DuplicateOpportunitySerializer(read_only=True)
+    original = DuplicateOpportunitySerializer(read_only=True)
+    
+    class Meta:
+        model = DuplicateCandidate
+        fields = ('id', 'opportunity', 'original', 'similarity', 'status', 'created_at',
+                 'reviewed_at', 'reviewed_by')
+        read_only_fields = fields
+
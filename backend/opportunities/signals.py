@@ -1,16 +1,23 @@
 # opportunities/signals.py
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import Opportunity, UserOpportunity
+from .models import Opportunity, OpportunityCategory, UserOpportunity
+from . import counters, deadlines, dedup, facets, prerank, search, snapshots, tags, trigram
+from .importers import opportunities_imported
+from .lifecycle import opportunities_transitioned
 
 @receiver(pre_save, sender=Opportunity)
 def set_publication_date(sender, instance, **kwargs):
     """
     Définir la date de publication si l'opportunité passe en statut 'published'
     """
+    instance._deadline_state = None
     try:
         old_instance = Opportunity.objects.get(pk=instance.pk)
+        # Mémorisé pour invalider le calendrier des dates limites après sauvegarde
+        instance._deadline_state = (old_instance.status, old_instance.deadline)
         # Si l'opportunité passe de brouillon à publiée, définir la date de publication
         if old_instance.status != 'published' and instance.status == 'published':
             instance.publication_date = timezone.now()
@@ -27,6 +34,239 @@ def update_opportunity_status(sender, instance, **kwargs):
     if instance.is_expired and instance.status == 'published':
         # Éviter une boucle infinie de signaux en vérifiant si le statut a changé
         Opportunity.objects.filter(pk=instance.pk).update(status='expired')
+        instance.status = 'expired'
+
+@receiver(post_save, sender=Opportunity)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """
+    Réindexer l'opportunité pour la recherche plein texte si un champ indexé a pu changer
+    """
+    if update_fields and not set(update_fields) & set(search.INDEXED_FIELDS):
+        return
+    search.index_opportunities([instance.pk])
+
+@receiver(post_delete, sender=Opportunity)
+def remove_from_search_index(sender, instance, **kwargs):
+    """
+    Retirer l'opportunité supprimée de l'index plein texte
+    """
+    search.remove_opportunities([instance.pk])
+
+@receiver(post_save, sender=Opportunity)
+def update_tag_index(sender, instance, update_fields=None, **kwargs):
+    """
+    Synchroniser les tags normalisés avec le champ texte ``tags``
+    """
+    if update_fields and 'tags' not in update_fields:
+        return
+    tags.sync_tags([instance])
+
+@receiver(pre_delete, sender=Opportunity)
+def remember_opportunity_tags(sender, instance, **kwargs):
+    """
+    Mémoriser les tags liés avant la suppression en cascade des liens
+    """
+    instance._tag_ids = tags.linked_tag_ids(instance)
+
+@receiver(post_delete, sender=Opportunity)
+def recount_released_tags(sender, instance, **kwargs):
+    """
+    Recompter les tags de l'opportunité supprimée à partir de l'index
+    """
+    tags.recount(getattr(instance, '_tag_ids', ()))
+
+@receiver(pre_save, sender=Opportunity)
+def snapshot_facets(sender, instance, update_fields=None, **kwargs):
+    """
+    Mémoriser les valeurs de facettes enregistrées avant la sauvegarde
+    """
+    instance._facet_snapshot = None
+    if instance._state.adding:
+        return
+    if update_fields and not set(update_fields) & {'status', *facets.FACET_FIELDS.values()}:
+        instance._facet_snapshot = False  # Aucune facette modifiée
+        return
+    instance._facet_snapshot = facets.load_snapshot(instance.pk)
+
+@receiver(post_save, sender=Opportunity)
+def update_facet_counts(sender, instance, **kwargs):
+    """
+    Reporter dans la table de cumul les changements de facettes ou de statut
+    """
+    old = getattr(instance, '_facet_snapshot', None)
+    if old is False:
+        return
+    facets.update_facets(old, facets.snapshot(instance))
+
+@receiver(post_delete, sender=Opportunity)
+def remove_facet_counts(sender, instance, **kwargs):
+    """
+    Retirer l'opportunité supprimée des compteurs de facettes
+    """
+    facets.update_facets(facets.snapshot(instance), None)
+
+@receiver(opportunities_transitioned)
+def rebuild_facet_counts(sender, run, **kwargs):
+    """
+    Les transitions planifiées modifient les statuts en masse : reconstruire le cumul
+    """
+    facets.rebuild_facets()
+
+@receiver(opportunities_imported)
+def add_imported_facet_counts(sender, opportunities, **kwargs):
+    """
+    Compter les opportunités importées (bulk_create n'émet pas post_save)
+    """
+    facets.add_opportunities(opportunities)
+
+@receiver(post_save, sender=Opportunity)
+def update_trigram_index(sender, instance, update_fields=None, **kwargs):
+    """
+    Mettre à jour les suggestions après validation de la transaction
+    """
+    if update_fields and not set(update_fields) & {'status', 'title', 'organization', 'tags', 'location'}:
+        return
+    transaction.on_commit(lambda: trigram.update_opportunities([instance]))
+
+@receiver(post_delete, sender=Opportunity)
+def remove_from_trigram_index(sender, instance, **kwargs):
+    """
+    Retirer l'opportunité supprimée des suggestions
+    """
+    opportunity_id = instance.pk
+    transaction.on_commit(lambda: trigram.remove_opportunity(opportunity_id))
+
+@receiver(opportunities_transitioned)
+def invalidate_trigram_index(sender, run, **kwargs):
+    """
+    Statuts modifiés en masse : reconstruire les suggestions au prochain usage
+    """
+    transaction.on_commit(trigram.invalidate)
+
+@receiver(opportunities_imported)
+def add_imported_to_trigram_index(sender, opportunities, **kwargs):
+    """
+    Ajouter les opportunités importées aux suggestions
+    """
+    transaction.on_commit(lambda: trigram.update_opportunities(opportunities))
+
+@receiver(post_save, sender=Opportunity)
+def index_duplicate_signature(sender, instance, update_fields=None, **kwargs):
+    """
+    Recalculer la signature MinHash et rechercher les quasi-doublons
+    """
+    if update_fields and not set(update_fields) & set(dedup.SIGNED_FIELDS):
+        return
+    dedup.index_opportunities([instance])
+
+@receiver(opportunities_imported)
+def index_imported_duplicates(sender, opportunities, **kwargs):
+    """
+    Signatures et doublons potentiels des opportunités importées
+    """
+    dedup.index_opportunities(opportunities)
+
+@receiver(post_save, sender=Opportunity)
+def invalidate_deadline_calendar(sender, instance, created, **kwargs):
+    """
+    Invalider les jours du calendrier touchés par un changement de date limite ou de statut
+    """
+    old = getattr(instance, '_deadline_state', None)
+    if old == (instance.status, instance.deadline):
+        return
+    deadlines.invalidate_days(old[1] if old else None, instance.deadline)
+
+@receiver(post_delete, sender=Opportunity)
+def remove_from_deadline_calendar(sender, instance, **kwargs):
+    """
+    Retirer l'opportunité supprimée du calendrier
+    """
+    deadlines.invalidate_days(instance.deadline)
+
+@receiver(opportunities_transitioned)
+def reset_deadline_calendar(sender, run, **kwargs):
+    """
+    Statuts modifiés en masse : recalculer tout le calendrier
+    """
+    deadlines.invalidate_all()
+
+@receiver(opportunities_imported)
+def add_imported_deadlines(sender, opportunities, **kwargs):
+    """
+    Invalider les jours des dates limites importées
+    """
+    deadlines.invalidate_days(*(opportunity.deadline for opportunity in opportunities))
+
+@receiver(post_save, sender=Opportunity)
+def mark_snapshots_on_save(sender, instance, **kwargs):
+    """
+    Instantanés du fil public périmés si l'opportunité est ou était publiée
+    """
+    old = getattr(instance, '_deadline_state', None)
+    if instance.status == 'published' or (old and old[0] == 'published'):
+        transaction.on_commit(snapshots.mark_dirty)
+
+@receiver(post_delete, sender=Opportunity)
+def mark_snapshots_on_delete(sender, instance, **kwargs):
+    """
+    Retirer une opportunité publiée supprimée des instantanés
+    """
+    if instance.status == 'published':
+        transaction.on_commit(snapshots.mark_dirty)
+
+@receiver(post_save, sender=OpportunityCategory)
+@receiver(post_delete, sender=OpportunityCategory)
+def mark_snapshots_on_category_change(sender, **kwargs):
+    """
+    Nom ou liste des catégories modifiés : instantanés par catégorie à régénérer
+    """
+    transaction.on_commit(snapshots.mark_dirty)
+
+@receiver(opportunities_transitioned)
+def mark_snapshots_on_transition(sender, run, **kwargs):
+    """
+    Publications et expirations planifiées
+    """
+    snapshots.mark_dirty()
+
+@receiver(opportunities_imported)
+def mark_snapshots_on_import(sender, opportunities, **kwargs):
+    """
+    Opportunités importées publiées
+    """
+    if any(opportunity.status == 'published' for opportunity in opportunities):
+        transaction.on_commit(snapshots.mark_dirty)
+
+@receiver(post_save, sender=Opportunity)
+def invalidate_prerank_on_save(sender, instance, **kwargs):
+    """
+    Catalogue publié modifié : index BM25 des recommandations à reconstruire
+    """
+    old = getattr(instance, '_deadline_state', None)
+    if instance.status == 'published' or (old and old[0] == 'published'):
+        transaction.on_commit(prerank.invalidate)
+
+@receiver(post_delete, sender=Opportunity)
+def invalidate_prerank_on_delete(sender, instance, **kwargs):
+    """
+    Retirer une opportunité publiée supprimée de l'index BM25
+    """
+    if instance.status == 'published':
+        transaction.on_commit(prerank.invalidate)
+
+@receiver(opportunities_transitioned)
+def invalidate_prerank_on_transition(sender, run, **kwargs):
+    """
+    Publications et expirations planifiées
+    """
+    prerank.invalidate()
+
+@receiver(opportunities_imported)
+def invalidate_prerank_on_import(sender, opportunities, **kwargs):
+    """
+    Opportunités importées
+    """
+    transaction.on_commit(prerank.invalidate)
 
 @receiver(post_save, sender=UserOpportunity)
 def handle_user_opportunity_creation(sender, instance, created, **kwargs):
@@ -34,10 +274,16 @@ def handle_user_opportunity_creation(sender, instance, created, **kwargs):
     Actions à effectuer lors de la création d'une relation utilisateur-opportunité
     """
     if created and instance.relation_type == 'applied':
-        # Incrémenter le compteur de candidatures
-        opportunity = instance.opportunity
-        opportunity.application_count += 1
-        opportunity.save(update_fields=['application_count'])
+        # Incrémenter le compteur de candidatures en base (pas de mise à jour perdue)
+        counters.increment_applications(instance.opportunity_id)
+
+@receiver(post_delete, sender=UserOpportunity)
+def handle_user_opportunity_deletion(sender, instance, **kwargs):
+    """
+    Décrémenter le compteur de candidatures lors d'un retrait de candidature
+    """
+    if instance.relation_type == 'applied':
+        counters.decrement_applications(instance.opportunity_id)
 
 # Assurez-vous d'importer ces signaux dans votre fichier apps.py pour les activer
 # opportunities/apps.py
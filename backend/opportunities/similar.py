@@ -0,0 +1,286 @@
+# opportunities/similar.py
+"""
+Opportunités similaires précalculées (bloc « Vous aimerez aussi » de la page détail).
+
+Chaque opportunité publiée reçoit un vecteur TF-IDF creux et normé (titre, organisme,
+tags, catégorie, description ; mots normalisés et racinisés comme pour la recherche),
+stocké dans ``OpportunityVector`` et dans l'index inversé ``OpportunityTerm``
+(terme -> opportunités, poids). Les voisins sont obtenus par produit creux :
+un index inversé terme -> [(opportunité, poids)] permet d'accumuler les similarités
+cosinus d'une opportunité avec toutes les autres en ne parcourant que les listes de ses
+propres termes, puis les ``NEIGHBORS`` meilleures sont enregistrées dans
+``OpportunityNeighbor``. L'API lit ensuite les voisins en une requête.
+
+``refresh()`` ne revectorise que les opportunités nouvelles ou modifiées depuis leur
+dernière indexation (et retire celles qui ne sont plus publiées), puis recalcule les
+voisins des opportunités concernées : les modifiées, et celles dont la liste les
+contenait ou devrait maintenant les contenir. Seules les listes de l'index inversé des
+termes de ces opportunités sont lues (``StoredNeighborIndex``) : le coût suit le voisinage
+des modifications, pas la taille du catalogue. ``rebuild()`` recalcule tout (IDF compris).
+``python manage.py refresh_similar_opportunities [--full]`` (tâches cron Render
+``opportunici-similar`` toutes les 15 minutes, ``opportunici-similar-full`` le dimanche).
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Opportunity, OpportunityNeighbor, OpportunityTaskRun, OpportunityTerm, OpportunityVector
+from .search import stem, tokenize
+
+TASK_NAME = 'similar_opportunities'
+
+# Champs lus pour construire le texte d'une opportunité (le titre compte double)
+TEXT_FIELDS = ('title', 'title', 'organization', 'tags', 'category__name', 'description')
+
+# Longueur maximale d'un terme (OpportunityTerm.term)
+MAX_TERM_LENGTH = 64
+
+# Taille des listes d'identifiants passées aux requêtes ``__in``
+CHUNK_SIZE = 500
+
+DEFAULT_CONFIG = {
+    'NEIGHBORS': 10,  # voisins conservés par opportunité
+    'MAX_TERMS': 100,  # termes conservés par vecteur (les plus discriminants)
+    'MIN_SCORE': 0.05,  # similarité cosinus minimale d'un voisin
+    'MAX_DF_RATIO': 0.5,  # termes présents dans plus de la moitié des opportunités ignorés
+}
+
+
+def get_config(name):
+    return getattr(settings, 'OPPORTUNITY_SIMILAR_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def terms(text):
+    """Mots normalisés et racinisés d'un texte (au moins 3 lettres)"""
+    return [
+        stem(word) for word in tokenize(text)
+        if 3 <= len(word) <= MAX_TERM_LENGTH and not word.isdigit()
+    ]
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start:start + CHUNK_SIZE]
+
+
+def _texts(queryset):
+    """{id: Counter des termes} des opportunités du queryset"""
+    documents = defaultdict(Counter)
+    fields = list(dict.fromkeys(TEXT_FIELDS))
+    for row in queryset.order_by().values_list('pk', *fields).iterator(chunk_size=500):
+        pk, values = row[0], dict(zip(fields, row[1:]))
+        documents[pk].update(terms(' '.join(values[field] or '' for field in TEXT_FIELDS)))
+    return documents
+
+
+def vectorize(counts, document_frequency, documents):
+    """
+    Vecteur TF-IDF normé : tf sous-linéaire (1 + log tf), idf lissé, MAX_TERMS termes conservés
+    """
+    max_df = get_config('MAX_DF_RATIO') * documents
+    weights = {}
+    for term, count in counts.items():
+        df = document_frequency.get(term, 0)
+        if documents > 1 and df > max_df:
+            continue
+        weights[term] = (1 + math.log(count)) * (math.log((1 + documents) / (1 + df)) + 1)
+    if len(weights) > get_config('MAX_TERMS'):
+        weights = dict(heapq.nlargest(get_config('MAX_TERMS'), weights.items(), key=lambda item: item[1]))
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {term: round(weight / norm, 6) for term, weight in weights.items()} if norm else {}
+
+
+class NeighborIndex:
+    """Index inversé des vecteurs : similarités cosinus par produit creux"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.postings = defaultdict(list)
+        for pk, weights in vectors.items():
+            for term, weight in weights.items():
+                self.postings[term].append((pk, weight))
+
+    def scores(self, pk):
+        """{autre id: similarité cosinus} des opportunités partageant au moins un terme"""
+        scores = defaultdict(float)
+        for term, weight in self.vectors.get(pk, {}).items():
+            for other, other_weight in self.postings[term]:
+                scores[other] += weight * other_weight
+        scores.pop(pk, None)
+        return scores
+
+    def add(self, pk, weights):
+        self.vectors[pk] = weights
+        for term, weight in weights.items():
+            self.postings[term].append((pk, weight))
+
+    def nearest(self, pk):
+        """[(id, score)] des NEIGHBORS voisins les plus proches au-dessus de MIN_SCORE"""
+        minimum = get_config('MIN_SCORE')
+        return heapq.nlargest(
+            get_config('NEIGHBORS'),
+            ((other, score) for other, score in self.scores(pk).items() if score >= minimum),
+            key=lambda item: (item[1], str(item[0]))
+        )
+
+
+class StoredNeighborIndex(NeighborIndex):
+    """
+    Index inversé lu à la demande dans ``OpportunityTerm``
+
+    Seuls les vecteurs des opportunités dont on calcule les scores, et les listes de leurs
+    termes, sont chargés. Les opportunités de ``exclude`` (revectorisées ou retirées) sont
+    ignorées en base ; les nouveaux vecteurs sont ajoutés par ``add()``.
+    """
+
+    def __init__(self, exclude=()):
+        super().__init__({})
+        self.exclude = set(exclude)
+        self.loaded_terms = set()
+
+    def load(self, pks):
+        """Charger les vecteurs des opportunités données et les listes de leurs termes"""
+        missing = set(pks) - set(self.vectors) - self.exclude
+        for chunk in _chunks(missing):
+            for pk, term, weight in OpportunityTerm.objects.filter(
+                vector_id__in=chunk
+            ).values_list('vector_id', 'term', 'weight'):
+                self.vectors.setdefault(pk, {})[term] = weight
+
+        terms = {term for pk in pks for term in self.vectors.get(pk, {})} - self.loaded_terms
+        for chunk in _chunks(terms):
+            for pk, term, weight in OpportunityTerm.objects.filter(term__in=chunk).exclude(
+                vector_id__in=self.exclude
+            ).values_list('vector_id', 'term', 'weight'):
+                self.postings[term].append((pk, weight))
+        self.loaded_terms |= terms
+
+    def scores(self, pk):
+        self.load([pk])
+        return super().scores(pk)
+
+
+def _save_vectors(vectors, indexed_at):
+    OpportunityVector.objects.bulk_create([
+        OpportunityVector(opportunity_id=pk, weights=weights, indexed_at=indexed_at)
+        for pk, weights in vectors.items()
+    ], batch_size=500)
+    OpportunityTerm.objects.bulk_create([
+        OpportunityTerm(vector_id=pk, term=term, weight=weight)
+        for pk, weights in vectors.items() for term, weight in weights.items()
+    ], batch_size=1000)
+
+
+def _save_neighbors(index, pks):
+    """Remplacer les voisins enregistrés des opportunités données"""
+    rows = [
+        OpportunityNeighbor(opportunity_id=pk, neighbor_id=other, score=round(score, 6))
+        for pk in pks for other, score in index.nearest(pk)
+    ]
+    OpportunityNeighbor.objects.filter(opportunity_id__in=pks).delete()
+    OpportunityNeighbor.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _finish(run, stats):
+    run.finished_at = timezone.now()
+    run.stats = stats
+    run.save(update_fields=['finished_at', 'stats'])
+    return run
+
+
+def rebuild():
+    """Revectoriser toutes les opportunités publiées et recalculer tous les voisins"""
+    run = OpportunityTaskRun.objects.create(task=TASK_NAME, started_at=timezone.now())
+    documents = _texts(Opportunity.objects.filter(status='published'))
+    document_frequency = Counter(term for counts in documents.values() for term in counts)
+    vectors = {pk: vectorize(counts, document_frequency, len(documents)) for pk, counts in documents.items()}
+    index = NeighborIndex(vectors)
+
+    with transaction.atomic():
+        OpportunityVector.objects.all().delete()
+        _save_vectors(vectors, run.started_at)
+        OpportunityNeighbor.objects.all().delete()
+        neighbors = _save_neighbors(index, list(vectors))
+
+    return _finish(run, {'indexed': len(vectors), 'removed': 0, 'refreshed': len(vectors), 'neighbors': neighbors})
+
+
+def refresh():
+    """
+    Mettre à jour les vecteurs nouveaux, modifiés ou retirés et les voisins concernés
+
+    L'IDF des nouveaux vecteurs est estimé à partir des vecteurs déjà enregistrés ; une
+    reconstruction complète périodique (``--full``) le recalcule sur tout le corpus.
+    """
+    run = OpportunityTaskRun.objects.create(task=TASK_NAME, started_at=timezone.now())
+    stale = set(Opportunity.objects.filter(status='published').filter(
+        Q(vector__isnull=True) | Q(updated_at__gt=F('vector__indexed_at'))
+    ).values_list('pk', flat=True))
+    removed = set(OpportunityVector.objects.exclude(
+        opportunity__status='published'
+    ).values_list('opportunity_id', flat=True))
+    if not stale and not removed:
+        return _finish(run, {'indexed': 0, 'removed': 0, 'refreshed': 0, 'neighbors': 0})
+
+    # Fréquences des termes des opportunités revectorisées, lues dans l'index inversé
+    # (hors opportunités revectorisées ou retirées)
+    excluded = stale | removed
+    documents = _texts(Opportunity.objects.filter(pk__in=stale))
+    document_frequency = Counter()
+    for chunk in _chunks({term for counts in documents.values() for term in counts}):
+        document_frequency.update(dict(OpportunityTerm.objects.filter(term__in=chunk).exclude(
+            vector_id__in=excluded
+        ).order_by().values('term').annotate(count=Count('pk')).values_list('term', 'count')))
+    document_frequency.update(term for counts in documents.values() for term in counts)
+    total = OpportunityVector.objects.exclude(opportunity_id__in=excluded).count() + len(documents)
+    vectors = {pk: vectorize(counts, document_frequency, total) for pk, counts in documents.items()}
+
+    index = StoredNeighborIndex(exclude=excluded)
+    for pk, weights in vectors.items():
+        index.add(pk, weights)
+
+    # Opportunités dont la liste de voisins peut changer
+    affected = set(stale)
+    affected.update(OpportunityNeighbor.objects.filter(
+        neighbor_id__in=excluded
+    ).values_list('opportunity_id', flat=True))
+    minimum = get_config('MIN_SCORE')
+    candidates = defaultdict(float)
+    for pk in stale:
+        for other, score in index.scores(pk).items():
+            if other not in affected and score >= minimum:
+                candidates[other] = max(candidates[other], score)
+    thresholds = _entry_scores(candidates)
+    affected.update(other for other, score in candidates.items() if score > thresholds.get(other, 0))
+    affected -= removed
+
+    with transaction.atomic():
+        OpportunityVector.objects.filter(opportunity_id__in=excluded).delete()
+        _save_vectors(vectors, run.started_at)
+        OpportunityNeighbor.objects.filter(opportunity_id__in=removed).delete()
+        neighbors = _save_neighbors(index, list(affected))
+
+    return _finish(run, {'indexed': len(stale), 'removed': len(removed), 'refreshed': len(affected), 'neighbors': neighbors})
+
+
+def _entry_scores(pks):
+    """
+    {id: score du dernier voisin} des listes complètes des opportunités données : une
+    opportunité n'y entre que si elle fait mieux (les listes incomplètes acceptent tout
+    score >= MIN_SCORE)
+    """
+    thresholds = {}
+    for chunk in _chunks(pks):
+        thresholds.update(OpportunityNeighbor.objects.filter(opportunity_id__in=chunk).order_by().values(
+            'opportunity_id'
+        ).annotate(
+            size=Count('pk'), lowest=Min('score')
+        ).filter(size__gte=get_config('NEIGHBORS')).values_list('opportunity_id', 'lowest'))
+    return thresholds
@@ -0,0 +1,183 @@
+# opportunities/snapshots.py
+"""
+Instantanés JSON du fil public des opportunités (visiteurs anonymes).
+
+Les visiteurs non connectés voient tous la même liste : ses premières pages, les
+opportunités mises en avant et la première page de chaque catégorie sont rendues en
+JSON (mêmes données que l'API pour un anonyme), précompressées en gzip (et en Brotli si
+le module ``brotli`` est installé), et enregistrées dans ``OpportunitySnapshot`` : la
+base est partagée par le service web et la tâche qui les génère (le disque des
+instances Render est éphémère et propre à chacune).
+
+Le nom de chaque fichier contient l'empreinte de son contenu (``page-1.3f9a….json``) :
+``views.snapshot_file`` (``/api/opportunities/snapshots/<nom>``) le sert avec ``Cache-Control:
+public, max-age=31536000, immutable``. Seul ``manifest.json`` (nom logique -> fichier)
+est servi avec un cache court (``MANIFEST_MAX_AGE``) ; le frontend le lit pour les
+visiteurs anonymes. Les fichiers remplacés sont supprimés après ``GRACE_PERIOD``, le
+temps que les clients ayant l'ancien manifeste finissent de lire.
+
+Les publications, expirations et modifications d'opportunités publiées marquent les
+instantanés comme périmés (voir signals.py) ; ``python manage.py
+build_opportunity_snapshots --if-needed`` (tâche cron Render ``opportunici-snapshots``,
+chaque minute) les régénère, et au moins toutes les ``MAX_AGE`` secondes (le champ
+``time_left`` évolue avec le temps). L'API dynamique reste utilisée pour les requêtes
+filtrées et les pages suivantes.
+"""
+import gzip
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .models import Opportunity, OpportunityCategory, OpportunitySnapshot, OpportunityTaskRun
+from .serializers import OpportunityListSerializer
+
+try:
+    import brotli
+except ImportError:  # Compression Brotli facultative
+    brotli = None
+
+TASK_NAME = 'snapshots'
+DIRTY_KEY = 'opportunities:snapshots:dirty'
+MANIFEST = 'manifest.json'
+LIST_URL = '/api/opportunities/'
+
+# Durée de cache des fichiers versionnés (leur contenu ne change jamais)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+DEFAULT_CONFIG = {
+    'URL': '/api/opportunities/snapshots/',  # préfixe public (voir snapshot_file)
+    'PAGES': 5,  # pages du fil public rendues
+    'PAGE_SIZE': None,  # PAGE_SIZE de DRF par défaut
+    'INTERVAL': 30,  # secondes entre deux vérifications en mode worker
+    'MAX_AGE': 3600,  # secondes avant une régénération même sans modification
+    'MANIFEST_MAX_AGE': 60,  # secondes de cache du manifeste chez les clients
+    'GRACE_PERIOD': 3600,  # secondes de conservation des fichiers remplacés
+}
+
+
+def get_config(name):
+    return getattr(settings, 'OPPORTUNITY_SNAPSHOT_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def get_url():
+    return get_config('URL')
+
+
+def mark_dirty():
+    """Demander une régénération (appelé après publication, expiration, modification…)"""
+    cache.set(DIRTY_KEY, timezone.now().isoformat(), timeout=None)
+
+
+def is_dirty():
+    return cache.get(DIRTY_KEY) is not None
+
+
+def _compressed(content):
+    return {
+        'content': content,
+        'gzip_content': gzip.compress(content, mtime=0),
+        'brotli_content': brotli.compress(content) if brotli is not None else None,
+    }
+
+
+def _write(name, data, now):
+    """Enregistrer un fichier JSON (et ses versions compressées) nommé par son empreinte"""
+    content = JSONRenderer().render(data)
+    filename = f'{name}.{hashlib.sha256(content).hexdigest()[:16]}.json'
+    # Date de dernière référence : le délai de grâce court à partir du remplacement
+    if not OpportunitySnapshot.objects.filter(name=filename).update(referenced_at=now):
+        OpportunitySnapshot.objects.update_or_create(
+            name=filename, defaults={'referenced_at': now},
+            create_defaults={'referenced_at': now, **_compressed(content)},
+        )
+    return filename
+
+
+def _list_url(query, page):
+    """Lien de l'API dynamique vers une page (la première page n'a pas de paramètre)"""
+    params = query + ([f'page={page}'] if page > 1 else [])
+    return f"{LIST_URL}?{'&'.join(params)}" if params else LIST_URL
+
+
+def _page(opportunities, count, page, page_size, query=()):
+    """Page au format de la pagination de l'API ; les liens pointent vers l'API dynamique"""
+    pages = -(-count // page_size)
+    return {
+        'count': count,
+        'next': _list_url(list(query), page + 1) if page < pages else None,
+        'previous': _list_url(list(query), page - 1) if page > 1 else None,
+        'results': OpportunityListSerializer(opportunities, many=True, context={'request': None}).data,
+    }
+
+
+def _prune(keep, now):
+    """Supprimer les fichiers remplacés depuis plus de GRACE_PERIOD"""
+    deleted, _ = OpportunitySnapshot.objects.exclude(name__in=set(keep) | {MANIFEST}).filter(
+        referenced_at__lt=now - timedelta(seconds=get_config('GRACE_PERIOD'))
+    ).delete()
+    return deleted
+
+
+def build():
+    """
+    Régénérer tous les instantanés et le manifeste
+
+    Returns:
+        OpportunityTaskRun enregistré (fichiers référencés, fichiers supprimés)
+    """
+    cache.delete(DIRTY_KEY)  # Une modification pendant la génération la redemandera
+    run = OpportunityTaskRun.objects.create(task=TASK_NAME, started_at=timezone.now())
+    now = run.started_at
+    page_size = get_config('PAGE_SIZE') or api_settings.PAGE_SIZE
+    published = Opportunity.objects.filter(status='published').with_list_relations().order_by('-created_at')
+
+    with transaction.atomic():
+        files = {}
+        count = published.count()
+        rows = list(published[:get_config('PAGES') * page_size])
+        for index in range(max(1, -(-len(rows) // page_size))):
+            page_rows = rows[index * page_size:(index + 1) * page_size]
+            files[f'page-{index + 1}'] = _write(f'page-{index + 1}', _page(page_rows, count, index + 1, page_size), now)
+
+        files['featured'] = _write('featured', OpportunityListSerializer(
+            published.filter(featured=True), many=True, context={'request': None}
+        ).data, now)
+
+        for slug in OpportunityCategory.objects.filter(is_active=True).values_list('slug', flat=True):
+            category = published.filter(category__slug=slug)
+            files[f'category-{slug}'] = _write(f'category-{slug}', _page(
+                list(category[:page_size]), category.count(), 1, page_size, query=[f'category={slug}']
+            ), now)
+
+        manifest = {
+            'generated_at': now,
+            'url': get_url(),
+            'files': files,
+        }
+        OpportunitySnapshot.objects.update_or_create(name=MANIFEST, defaults={
+            'referenced_at': now, **_compressed(JSONRenderer().render(manifest)),
+        })
+        removed = _prune(files.values(), now)
+
+    run.finished_at = timezone.now()
+    run.stats = {'files': len(files), 'removed': removed}
+    run.save(update_fields=['finished_at', 'stats'])
+    return run
+
+
+def build_if_needed(now=None):
+    """Régénérer si des modifications sont en attente ou si le dernier rendu a plus de MAX_AGE"""
+    now = now or timezone.now()
+    last = OpportunityTaskRun.objects.filter(
+        task=TASK_NAME, finished_at__isnull=False
+    ).values_list('started_at', flat=True).first()
+    if is_dirty() or last is None or (now - last).total_seconds() >= get_config('MAX_AGE'):
+        return build()
+    return None
+
@@ -0,0 +1,138 @@
+# opportunities/tags.py
+"""
+Synchronisation du champ texte ``Opportunity.tags`` (séparé par des virgules) avec
+les tables normalisées ``Tag`` / ``OpportunityTag``.
+
+Le champ texte reste la source saisie par les créateurs ; l'index inversé est mis à
+jour de manière incrémentale à chaque sauvegarde, et les compteurs des seuls tags
+touchés sont recalculés à partir de l'index.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from .models import OpportunityTag, Tag
+
+TAG_NAME_MAX_LENGTH = Tag._meta.get_field('name').max_length
+TAG_SLUG_MAX_LENGTH = Tag._meta.get_field('slug').max_length
+
+
+def parse_tags(value):
+    """Transformer une chaîne 'python, Django' en dictionnaire {slug: nom}"""
+    tags = {}
+    for name in (value or '').split(','):
+        name = name.strip()[:TAG_NAME_MAX_LENGTH]
+        slug = slugify(name)[:TAG_SLUG_MAX_LENGTH]
+        if slug and slug not in tags:
+            tags[slug] = name
+    return tags
+
+
+def recount(tag_ids):
+    """
+    Recalculer en une requête les compteurs des tags touchés à partir de l'index
+
+    Plus sûr que des incréments : une synchronisation concurrente (liens ignorés par
+    ``ignore_conflicts`` ou déjà supprimés) ne peut pas fausser les compteurs.
+    """
+    if not tag_ids:
+        return
+    links = OpportunityTag.objects.filter(tag_id=OuterRef('pk')).order_by().values('tag_id').annotate(
+        total=Count('id')
+    ).values('total')
+    Tag.objects.filter(id__in=list(tag_ids)).update(
+        opportunity_count=Coalesce(Subquery(links), Value(0))
+    )
+
+
+def sync_tags(opportunities):
+    """
+    Mettre à jour l'index inversé pour un lot d'opportunités
+
+    Args:
+        opportunities: itérable d'opportunités déjà enregistrées
+    """
+    opportunities = list(opportunities)
+    if not opportunities:
+        return
+
+    wanted = {opp.pk: parse_tags(opp.tags) for opp in opportunities}
+    names = {}
+    for tags in wanted.values():
+        names.update(tags)
+
+    with transaction.atomic():
+        # Créer les tags manquants puis récupérer leurs identifiants en une requête
+        if names:
+            Tag.objects.bulk_create(
+                [Tag(slug=slug, name=name) for slug, name in names.items()],
+                ignore_conflicts=True
+            )
+        tag_ids = dict(Tag.objects.filter(slug__in=list(names)).values_list('slug', 'id'))
+
+        existing = defaultdict(set)
+        for opportunity_id, tag_id in OpportunityTag.objects.filter(
+            opportunity_id__in=list(wanted)
+        ).values_list('opportunity_id', 'tag_id'):
+            existing[opportunity_id].add(tag_id)
+
+        to_create = []
+        to_delete = {}
+        touched = set()
+        for opportunity_id, tags in wanted.items():
+            wanted_ids = {tag_ids[slug] for slug in tags}
+            current_ids = existing.get(opportunity_id, set())
+
+            for tag_id in wanted_ids - current_ids:
+                to_create.append(OpportunityTag(opportunity_id=opportunity_id, tag_id=tag_id))
+                touched.add(tag_id)
+            removed_ids = current_ids - wanted_ids
+            if removed_ids:
+                to_delete[opportunity_id] = removed_ids
+                touched.update(removed_ids)
+
+        if to_create:
+            OpportunityTag.objects.bulk_create(to_create, ignore_conflicts=True)
+        for opportunity_id, tag_ids_to_remove in to_delete.items():
+            OpportunityTag.objects.filter(
+                opportunity_id=opportunity_id, tag_id__in=tag_ids_to_remove
+            ).delete()
+
+        recount(touched)
+
+
+def linked_tag_ids(opportunity):
+    """
+    Tags d'une opportunité sur le point d'être supprimée
+
+    À recompter avec ``recount`` une fois les liens supprimés en cascade : une
+    suppression répétée ou en masse ne peut pas fausser les compteurs.
+    """
+    return set(OpportunityTag.objects.filter(opportunity=opportunity).values_list('tag_id', flat=True))
+
+
+def recount_tags():
+    """Recalculer tous les compteurs à partir de l'index (réparation)"""
+    counts = dict(
+        OpportunityTag.objects.values('tag_id').annotate(total=Count('id')).values_list('tag_id', 'total')
+    )
+    for tag in Tag.objects.only('id', 'opportunity_count'):
+        total = counts.get(tag.id, 0)
+        if tag.opportunity_count != total:
+            Tag.objects.filter(id=tag.id).update(opportunity_count=total)
+
+
+def opportunity_ids_with_any_tag(slugs):
+    """Sous-requête des opportunités portant au moins un des tags"""
+    return OpportunityTag.objects.filter(tag__slug__in=slugs).values('opportunity_id')
+
+
+def opportunity_ids_with_all_tags(slugs):
+    """Sous-requête des opportunités portant tous les tags"""
+    slugs = set(slugs)
+    return OpportunityTag.objects.filter(tag__slug__in=slugs).values('opportunity_id').annotate(
+        matched=Count('tag_id', distinct=True)
+    ).filter(matched=len(slugs)).values('opportunity_id')
@@ -1,3 +1,1548 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.slugs import _prefix_query, allocate_slugs
+from formations.models import Category as FormationCategory
+from notifications.services import notify_upcoming_deadlines
+
+from .counters import drifted_counters, reconcile_counters
+from .facets import grouped_counts, rollup_counts
+from .importers import import_opportunities
+from .lifecycle import run_lifecycle
+from .locations import CITIES, DISTANCES, normalize_location
+from .models import (
+    DuplicateCandidate, Opportunity, OpportunityCategory, OpportunityNeighbor, OpportunitySignatureBucket, OpportunityTag,
+    OpportunityTerm, OpportunityVector, Tag, UserOpportunity,
+)
+from .pagination import OpportunityPagination
+from .search import search_opportunities
+from .serializers import OpportunityListSerializer
+from .tracking import apply_view_events
+from .views import OpportunityViewSet
+from . import dedup, prerank, similar, snapshots, tags, tracking, trending, trigram
+
+User = get_user_model()
+
+
+class OpportunitySearchTests(APITestCase):
+    """Recherche plein texte indexée : pertinence, racinisation et filtres combinés"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='chercheur@example.ci', username='chercheur', password='motdepasse-123'
+        )
+        self.title_match = self.create("Développeur Python", "Poste en CDI", opportunity_type='job')
+        self.description_match = self.create("Stage informatique", "Scripts Python et tableaux de bord",
+                                             opportunity_type='internship')
+        self.create("Comptable", "Comptabilité générale", opportunity_type='job')
+
+    def create(self, title, description, **extra):
+        extra.setdefault('status', 'published')
+        return Opportunity.objects.create(
+            title=title, description=description, organization="Orange CI", creator=self.user, **extra
+        )
+
+    def titles(self, params):
+        response = self.client.get('/api/opportunities/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['results']]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.titles({'search': "python"}), ["Développeur Python", "Stage informatique"])
+        self.assertEqual(self.titles({'q': "python"}), self.titles({'search': "python"}))
+
+    def test_stemming_and_accent_folding(self):
+        self.assertEqual(self.titles({'search': "developpeurs"}), ["Développeur Python"])
+        self.assertEqual(self.titles({'search': "comptabilite"}), ["Comptable"])
+
+    def test_search_combines_with_filters_and_visibility(self):
+        self.create("Développeur Python senior", "Brouillon", opportunity_type='job', status='draft')
+
+        self.assertEqual(self.titles({'search': "python", 'type': 'internship'}), ["Stage informatique"])
+        self.assertEqual(self.titles({'search': "python", 'ordering': 'created_at'}),
+                         ["Développeur Python", "Stage informatique"])
+        self.assertEqual(self.titles({'search': "marketing"}), [])
+
+    def test_ranking_is_computed_in_the_filtered_query(self):
+        for index in range(5):
+            self.create(f"Python Python Python {index}", "Brouillon", status='draft')
+        ranked = search_opportunities(Opportunity.objects.filter(status='published'), "python")
+
+        with self.assertNumQueries(1):
+            results = list(ranked.order_by('-search_rank'))
+        self.assertEqual(results, [self.title_match, self.description_match])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+
+class OpportunityTagTests(APITestCase):
+    """Index inversé des tags et compteurs par tag"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='tags@example.ci', username='tags', password='motdepasse-123'
+        )
+
+    def create(self, tags):
+        return Opportunity.objects.create(
+            title="Stage", description="Stage", organization="Orange CI", opportunity_type='internship',
+            creator=self.user, status='published', tags=tags
+        )
+
+    def counts(self):
+        return dict(Tag.objects.values_list('slug', 'opportunity_count'))
+
+    def test_counts_follow_edits_and_deletes(self):
+        first = self.create("Python, Django")
+        second = self.create("python, API")
+        self.assertEqual(self.counts(), {'python': 2, 'django': 1, 'api': 1})
+
+        first.tags = "Django, React"
+        first.save()
+        self.assertEqual(self.counts(), {'python': 1, 'django': 1, 'api': 1, 'react': 1})
+
+        second.delete()
+        self.assertEqual(self.counts(), {'python': 0, 'django': 1, 'api': 0, 'react': 1})
+
+    def test_deletes_recount_from_the_index(self):
+        self.create("python, django")
+        self.create("python")
+        kept = self.create("python")
+        Tag.objects.filter(slug='python').update(opportunity_count=10)  # compteur faussé
+
+        Opportunity.objects.exclude(pk=kept.pk).delete()
+        self.assertEqual(self.counts(), {'python': 1, 'django': 0})
+
+        kept.delete()
+        self.assertEqual(self.counts(), {'python': 0, 'django': 0})
+
+    def test_tag_filters(self):
+        both = self.create("python, django")
+        self.create("python")
+
+        response = self.client.get('/api/opportunities/', {'tags': 'django,react'})
+        self.assertEqual([item['id'] for item in response.data['results']], [str(both.pk)])
+        response = self.client.get('/api/opportunities/', {'tags_all': 'python,django'})
+        self.assertEqual([item['id'] for item in response.data['results']], [str(both.pk)])
+
+    def test_concurrent_sync_does_not_double_count(self):
+        opportunity = self.create("")
+        opportunity.tags = "python"
+        bulk_create = OpportunityTag.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # Une autre synchronisation a inséré les mêmes liens (et compté) juste avant
+            bulk_create([OpportunityTag(opportunity_id=o.opportunity_id, tag_id=o.tag_id) for o in objs])
+            Tag.objects.filter(id__in=[o.tag_id for o in objs]).update(opportunity_count=F('opportunity_count') + 1)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(OpportunityTag.objects, 'bulk_create', side_effect=racing_bulk_create):
+            tags.sync_tags([opportunity])
+
+        self.assertEqual(self.counts(), {'python': 1})
+
+
+class OpportunityViewTrackingTests(APITestCase):
+    """Journal des consultations dans le cache et vidage par lots"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='lecteur@example.ci', username='lecteur', password='motdepasse-123'
+        )
+        self.opportunity = Opportunity.objects.create(
+            title="Stage", description="Stage", organization="Orange CI", opportunity_type='internship',
+            creator=self.user, status='published'
+        )
+
+    def view_count(self):
+        return Opportunity.objects.values_list('view_count', flat=True).get(pk=self.opportunity.pk)
+
+    def test_views_are_applied_in_batches(self):
+        tracking.record_view(self.opportunity, self.user)
+        tracking.record_view(self.opportunity, self.user)
+        tracking.record_view(self.opportunity, AnonymousUser())
+        self.assertEqual(self.view_count(), 0)
+
+        self.assertEqual(tracking.flush_views(batch_size=2), 3)
+
+        self.assertEqual(self.view_count(), 3)
+        self.assertTrue(UserOpportunity.objects.filter(
+            user=self.user, opportunity=self.opportunity, relation_type='viewed'
+        ).exists())
+        self.assertEqual(tracking.flush_views(), 0)
+        self.assertEqual(self.view_count(), 3)
+
+    def test_cursor_waits_for_reserved_but_unwritten_event(self):
+        tracking.record_view(self.opportunity)
+        late = tracking._next_sequence()  # incr fait, set pas encore
+        tracking.record_view(self.opportunity)
+
+        self.assertEqual(tracking.flush_views(), 1)
+        self.assertEqual(cache.get(tracking.CURSOR_KEY), late - 1)
+
+        cache.set(tracking._event_key(late), (str(self.opportunity.pk), None))
+        self.assertEqual(tracking.flush_views(), 2)
+        self.assertEqual(self.view_count(), 3)
+
+    def test_gap_is_skipped_after_grace_period(self):
+        tracking._next_sequence()  # événement jamais écrit
+        tracking.record_view(self.opportunity)
+
+        self.assertEqual(tracking.flush_views(), 0)
+        with override_settings(OPPORTUNITY_VIEWS_CONFIG={'GAP_GRACE_PERIOD': 0}):
+            self.assertEqual(tracking.flush_views(), 1)
+        self.assertEqual(self.view_count(), 1)
+        self.assertEqual(cache.get(tracking.GAPS_KEY), {})
+
+
+class OpportunityLifecycleTests(APITestCase):
+    """Transitions planifiées publish/expire et journal d'exécution"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='planif@example.ci', username='planif', password='motdepasse-123'
+        )
+        self.now = timezone.now()
+
+    def create(self, status, **extra):
+        opportunity = Opportunity.objects.create(
+            title=f"Opportunité {status}", description="Offre", organization="MESRS",
+            opportunity_type='job', creator=self.user, **extra
+        )
+        # État de départ forcé : save() corrige lui-même le statut des dates passées
+        Opportunity.objects.filter(pk=opportunity.pk).update(status=status)
+        return opportunity
+
+    def test_publishes_and_expires_due_opportunities(self):
+        overdue = self.create('published', deadline=self.now - timedelta(days=1))
+        current = self.create('published', deadline=self.now + timedelta(days=1))
+        due = self.create('scheduled', publication_date=self.now - timedelta(hours=1),
+                          deadline=self.now + timedelta(days=7))
+        due_and_past = self.create('scheduled', publication_date=self.now - timedelta(days=3),
+                                   deadline=self.now - timedelta(days=1))
+        later = self.create('scheduled', publication_date=self.now + timedelta(days=1))
+
+        run = run_lifecycle(now=self.now)
+
+        statuses = dict(Opportunity.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[overdue.pk], 'expired')
+        self.assertEqual(statuses[current.pk], 'published')
+        self.assertEqual(statuses[due.pk], 'published')
+        self.assertEqual(statuses[due_and_past.pk], 'expired')
+        self.assertEqual(statuses[later.pk], 'scheduled')
+        self.assertEqual(run.stats, {'expired': 2, 'published': 1, 'updated': 3})
+        self.assertIsNotNone(run.finished_at)
+
+    def test_second_run_changes_nothing(self):
+        self.create('published', deadline=self.now - timedelta(days=1))
+        run_lifecycle(now=self.now)
+
+        with mock.patch('opportunities.lifecycle.opportunities_transitioned.send') as send:
+            run = run_lifecycle(now=self.now)
+
+        self.assertEqual(run.stats, {'expired': 0, 'published': 0, 'updated': 0})
+        send.assert_not_called()
+
+
+class OpportunityListQueryCountTests(APITestCase):
+    """Le nombre de requêtes d'une page ne doit pas dépendre du nombre d'opportunités"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='etudiant@example.ci', username='etudiant', password='motdepasse-123'
+        )
+        self.category = OpportunityCategory.objects.create(name='Technologie')
+        self.client.force_authenticate(self.user)
+
+    def create_opportunities(self, count, **extra):
+        opportunities = []
+        for index in range(count):
+            opportunity = Opportunity.objects.create(
+                title=f"Stage développeur {index}",
+                description="Stage en développement web à Abidjan",
+                organization="Orange CI",
+                opportunity_type='internship',
+                status='published',
+                category=self.category,
+                creator=self.user,
+                **extra
+            )
+            UserOpportunity.objects.create(user=self.user, opportunity=opportunity, relation_type='saved')
+            opportunities.append(opportunity)
+        return opportunities
+
+    def test_list_page_uses_constant_number_of_queries(self):
+        self.create_opportunities(20)
+
+        # Agrégat de l'ETag, version des relations, COUNT de pagination,
+        # page d'opportunités (catégorie et créateur joints), relations préchargées
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/opportunities/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][0]['user_relation'], ['saved'])
+        self.assertEqual(response.data['results'][0]['category_name'], 'Technologie')
+
+    def test_featured_uses_constant_number_of_queries(self):
+        self.create_opportunities(10, featured=True)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/opportunities/featured/')
+
+        self.assertEqual(len(response.data), 10)
+
+    def test_my_opportunities_uses_constant_number_of_queries(self):
+        self.create_opportunities(10)
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/opportunities/my_opportunities/')
+
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_saved_relations_use_constant_number_of_queries(self):
+        self.create_opportunities(10)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/opportunities/user-relations/saved/')
+
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(response.data[0]['opportunity_details']['user_relation'], ['saved'])
+
+
+class OpportunityCursorPaginationTests(APITestCase):
+    """Pagination par curseur sur (created_at, id) et (deadline, id)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='lecteur@example.ci', username='lecteur', password='motdepasse-123'
+        )
+        now = timezone.now()
+        self.opportunities = []
+        for index in range(5):
+            opportunity = Opportunity.objects.create(
+                title=f"Bourse {index}",
+                description="Bourse d'études",
+                organization="Campus France",
+                opportunity_type='scholarship',
+                status='published',
+                deadline=now + timedelta(days=1 + index % 3),
+                creator=self.user,
+            )
+            self.opportunities.append(opportunity)
+        # Dates de création identiques pour vérifier le départage par id
+        Opportunity.objects.update(created_at=now)
+
+    def collect(self, url):
+        seen = []
+        while url:
+            # Agrégat de l'ETag sur la fenêtre de la page, puis la page : ni COUNT ni OFFSET
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    @mock.patch.object(OpportunityPagination, 'page_size', 2)
+    def test_created_at_cursor_walks_every_row_once(self):
+        seen = self.collect('/api/opportunities/?pagination=cursor')
+
+        expected = [str(pk) for pk in Opportunity.objects.order_by('-created_at', '-id').values_list('pk', flat=True)]
+        self.assertEqual(seen, expected)
+
+    @mock.patch.object(OpportunityPagination, 'page_size', 2)
+    def test_deadline_cursor_is_stable_across_inserts(self):
+        response = self.client.get('/api/opportunities/?pagination=cursor&ordering=deadline')
+        first_page = [item['id'] for item in response.data['results']]
+
+        # Une nouvelle opportunité arrivée en tête du fil ne décale pas les pages suivantes
+        Opportunity.objects.create(
+            title="Bourse urgente", description="Bourse", organization="AUF",
+            opportunity_type='scholarship', status='published',
+            deadline=timezone.now() - timedelta(days=1), creator=self.user,
+        )
+        rest = self.collect(response.data['next'])
+
+        expected = [
+            str(pk) for pk in Opportunity.objects.filter(pk__in=[o.pk for o in self.opportunities])
+            .order_by('deadline', 'id').values_list('pk', flat=True)
+        ]
+        self.assertEqual(first_page + rest, expected)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get('/api/opportunities/?pagination=cursor&cursor=pas-un-curseur')
+        self.assertEqual(response.status_code, 404)
+
+        payload = json.dumps({'o': '-created_at', 'v': timezone.now().isoformat(), 'id': 'nope'})
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        response = self.client.get('/api/opportunities/', {'pagination': 'cursor', 'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+    def test_unsupported_orderings_are_rejected(self):
+        for params in ({'ordering': '-trending'}, {'q': "bourse"}, {'search': "bourse"}):
+            response = self.client.get('/api/opportunities/', {'pagination': 'cursor', **params})
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_page_number_pagination_remains_default(self):
+        response = self.client.get('/api/opportunities/')
+
+        self.assertEqual(response.data['count'], 5)
+
+
+class OpportunitySlugTests(APITestCase):
+    """Attribution des slugs uniques (core.slugs)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='recruteur@example.ci', username='recruteur', password='motdepasse-123'
+        )
+
+    def create(self, title):
+        return Opportunity.objects.create(
+            title=title, description="Stage", organization="MTN CI",
+            opportunity_type='internship', creator=self.user,
+        )
+
+    def test_next_free_suffix_is_found_in_one_query(self):
+        for _ in range(3):
+            self.create("Stage développeur")
+
+        opportunity = Opportunity(
+            title="Stage développeur", description="Stage", organization="MTN CI",
+            opportunity_type='internship', creator=self.user,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            opportunity.save()
+
+        # Une seule lecture des slugs, quel que soit le nombre de doublons
+        slug_lookups = [query for query in queries if 'LIKE' in query['sql']]
+        self.assertEqual(len(slug_lookups), 1)
+        self.assertEqual(opportunity.slug, 'stage-developpeur-3')
+
+    def test_unrelated_numbered_slug_does_not_shift_suffixes(self):
+        self.create("Stage")
+        self.create("Stage 2024")
+
+        self.assertEqual(self.create("Stage").slug, 'stage-1')
+
+    def test_only_numbered_slugs_are_read(self):
+        self.create("Stage")
+        self.create("Stage")
+        self.create("Stage marketing Abidjan")
+        self.create("Stage 2")
+
+        matched = Opportunity.objects.filter(_prefix_query('slug', 'stage', 50)).values_list('slug', flat=True)
+        self.assertEqual(sorted(matched), ['stage', 'stage-1', 'stage-2'])
+
+    def test_bulk_allocation_is_unique_within_batch(self):
+        self.create("Bourse master")
+
+        slugs = allocate_slugs(Opportunity, ["Bourse master", "Bourse master", "Hackathon"])
+
+        self.assertEqual(slugs, ['bourse-master-1', 'bourse-master-2', 'hackathon'])
+
+    def test_collision_on_insert_is_retried(self):
+        self.create("Concours")
+        # Simuler une sauvegarde concurrente : l'allocateur propose un slug déjà pris au premier essai
+        with mock.patch('core.slugs.allocate_slug', side_effect=['concours', 'concours-1']):
+            opportunity = self.create("Concours")
+
+        self.assertEqual(opportunity.slug, 'concours-1')
+
+    def test_names_longer_than_the_field_get_shortened_suffixes(self):
+        # SlugField(max_length=50) : le suffixe remplace la fin de la base
+        name = "Formation professionnelle en développement web et mobile à Abidjan"
+        slugs = [FormationCategory.objects.create(name=name).slug for _ in range(4)]
+
+        self.assertEqual(len(set(slugs)), 4)
+        self.assertEqual(slugs[0], slugs[0][:50])
+        self.assertEqual(slugs[1], slugs[0][:48].rstrip('-') + '-1')
+        self.assertEqual(slugs[3], slugs[0][:48].rstrip('-') + '-3')
+        self.assertTrue(all(len(slug) <= 50 for slug in slugs))
+
+        self.assertEqual(allocate_slugs(FormationCategory, [name, name]), [
+            slugs[0][:48].rstrip('-') + '-4', slugs[0][:48].rstrip('-') + '-5',
+        ])
+
+
+class OpportunityImportTests(APITestCase):
+    """Import en masse CSV / JSONL"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            email='admin@example.ci', username='admin', password='motdepasse-123', is_staff=True
+        )
+        self.category = OpportunityCategory.objects.create(name='Bourses')
+
+    def test_csv_import_creates_rows_in_batches_and_reports_errors(self):
+        stream = io.StringIO(
+            "title,description,organization,opportunity_type,category,status,tags\n"
+            "Bourse master,Études en France,Campus France,scholarship,bourses,published,\"France, Master\"\n"
+            "Bourse master,Études au Canada,Université Laval,scholarship,Bourses,draft,\n"
+            "Sans type,Description,Orange CI,,,draft,\n"
+            "Stage data,Analyse,MTN CI,internship,inconnue,draft,\n"
+            "Stage web,Développement,Wave,internship,,published,Django\n"
+        )
+
+        report = import_opportunities(stream, 'csv', self.staff, batch_size=2)
+
+        self.assertEqual((report.rows, report.created, report.error_count), (5, 3, 2))
+        self.assertEqual([error['line'] for error in report.errors], [4, 5])
+        self.assertEqual(
+            sorted(Opportunity.objects.values_list('slug', flat=True)),
+            ['bourse-master', 'bourse-master-1', 'stage-web']
+        )
+        published = Opportunity.objects.get(slug='bourse-master')
+        self.assertEqual(published.category, self.category)
+        self.assertIsNotNone(published.publication_date)
+        self.assertEqual(Tag.objects.get(slug='france').opportunity_count, 1)
+
+    def test_jsonl_import_skips_invalid_lines(self):
+        stream = io.StringIO(
+            '{"title": "Hackathon", "description": "48h", "organization": "GIZ", "opportunity_type": "competition"}\n'
+            '\n'
+            'pas du json\n'
+        )
+
+        report = import_opportunities(stream, 'jsonl', self.staff)
+
+        self.assertEqual((report.created, report.error_count), (1, 1))
+        self.assertEqual(report.errors[0]['line'], 3)
+
+    def test_import_endpoint_is_reserved_to_staff(self):
+        student = User.objects.create_user(email='eleve@example.ci', username='eleve', password='motdepasse-123')
+        self.client.force_authenticate(student)
+        upload = SimpleUploadedFile('lot.jsonl', b'{}\n')
+
+        response = self.client.post('/api/opportunities/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_import_endpoint_returns_report(self):
+        self.client.force_authenticate(self.staff)
+        content = (
+            '{"title": "Concours", "description": "Prix", "organization": "AUF", "opportunity_type": "competition"}\n'
+        ).encode()
+        upload = SimpleUploadedFile('lot.jsonl', content)
+
+        response = self.client.post('/api/opportunities/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(Opportunity.objects.get().creator, self.staff)
+
+    def test_invalid_encoding_keeps_rows_already_imported(self):
+        self.client.force_authenticate(self.staff)
+        row = '{"title": "Concours %d", "description": "Prix", "organization": "AUF", "opportunity_type": "competition"}\n'
+        # Plus que le tampon de décodage : les premières lignes sont lues avant l'erreur
+        content = ''.join(row % index for index in range(300)).encode() + b'{"title": "\xff"}\n'
+        upload = SimpleUploadedFile('lot.jsonl', content)
+
+        response = self.client.post('/api/opportunities/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['aborted'])
+        self.assertEqual(response.data['error_count'], 1)
+        self.assertGreater(response.data['created'], 0)
+        self.assertEqual(Opportunity.objects.count(), response.data['created'])
+
+    def test_other_integrity_errors_are_reported_per_row(self):
+        bulk_create = Opportunity.objects.bulk_create
+
+        def failing_bulk_create(objs, *args, **kwargs):
+            if any(opportunity.title == "Invalide" for opportunity in objs):
+                raise IntegrityError("CHECK constraint failed")
+            return bulk_create(objs, *args, **kwargs)
+
+        stream = io.StringIO(
+            "title,description,organization,opportunity_type\n"
+            "Stage web,Développement,Wave,internship\n"
+            "Invalide,Description,Orange CI,internship\n"
+            "Stage data,Analyse,MTN CI,internship\n"
+        )
+        with mock.patch.object(Opportunity.objects, 'bulk_create', side_effect=failing_bulk_create) as patched:
+            report = import_opportunities(stream, 'csv', self.staff)
+
+        self.assertEqual((report.created, report.error_count), (2, 1))
+        self.assertEqual(report.errors[0]['line'], 3)
+        self.assertEqual(sorted(Opportunity.objects.values_list('title', flat=True)), ["Stage data", "Stage web"])
+        # Lot, puis une tentative par ligne : pas de nouvel essai pour une erreur hors slug
+        self.assertEqual(patched.call_count, 4)
+
+
+class OpportunityCounterTests(APITestCase):
+    """Compteurs de candidatures atomiques et réconciliation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='candidat@example.ci', username='candidat', password='motdepasse-123'
+        )
+        self.opportunity = Opportunity.objects.create(
+            title="Emploi comptable", description="CDI", organization="SIB",
+            opportunity_type='job', status='published', creator=self.user,
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_apply_and_withdraw_update_counter(self):
+        url = f'/api/opportunities/{self.opportunity.slug}/'
+
+        self.client.post(url + 'apply/')
+        self.client.post(url + 'apply/')  # nouvelle candidature identique : pas de double comptage
+        self.opportunity.refresh_from_db()
+        self.assertEqual(self.opportunity.application_count, 1)
+
+        response = self.client.post(url + 'withdraw/')
+        self.assertEqual(response.status_code, 200)
+        self.opportunity.refresh_from_db()
+        self.assertEqual(self.opportunity.application_count, 0)
+
+        response = self.client.post(url + 'withdraw/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_actions_require_authentication(self):
+        self.client.force_authenticate(None)
+        url = f'/api/opportunities/{self.opportunity.slug}/'
+
+        for action in ('apply/', 'withdraw/', 'save_opportunity/', 'unsave_opportunity/'):
+            self.assertIn(self.client.post(url + action).status_code, (401, 403), action)
+        self.assertIn(self.client.get('/api/opportunities/my_opportunities/').status_code, (401, 403))
+        self.assertFalse(UserOpportunity.objects.exists())
+
+    def test_stale_instance_does_not_overwrite_counter(self):
+        stale = Opportunity.objects.get(pk=self.opportunity.pk)
+        other = User.objects.create_user(email='autre@example.ci', username='autre', password='motdepasse-123')
+        UserOpportunity.objects.create(user=self.user, opportunity=stale, relation_type='applied')
+        UserOpportunity.objects.create(user=other, opportunity=stale, relation_type='applied')
+
+        self.opportunity.refresh_from_db()
+        self.assertEqual(self.opportunity.application_count, 2)
+
+    def test_reconcile_fixes_drift_in_one_pass(self):
+        other = User.objects.create_user(email='autre@example.ci', username='autre', password='motdepasse-123')
+        UserOpportunity.objects.create(user=self.user, opportunity=self.opportunity, relation_type='applied')
+        UserOpportunity.objects.create(user=self.user, opportunity=self.opportunity, relation_type='viewed')
+        UserOpportunity.objects.create(user=other, opportunity=self.opportunity, relation_type='viewed')
+        Opportunity.objects.filter(pk=self.opportunity.pk).update(application_count=7, view_count=1)
+        untouched = Opportunity.objects.create(
+            title="Stage RH", description="Stage", organization="SIB",
+            opportunity_type='internship', creator=self.user, view_count=40,
+        )
+
+        run = reconcile_counters()
+
+        self.assertEqual(run.stats, {'applications_fixed': 1, 'views_fixed': 1})
+        self.opportunity.refresh_from_db()
+        self.assertEqual((self.opportunity.application_count, self.opportunity.view_count), (1, 2))
+        untouched.refresh_from_db()
+        self.assertEqual(untouched.view_count, 40)  # vues anonymes conservées
+        self.assertEqual(list(drifted_counters()), [])
+
+
+class OpportunityConditionalGetTests(APITestCase):
+    """ETag / Last-Modified sur la liste et le détail"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='mobile@example.ci', username='mobile', password='motdepasse-123'
+        )
+        self.opportunity = Opportunity.objects.create(
+            title="Stage marketing", description="Stage", organization="Jumia",
+            opportunity_type='internship', status='published', creator=self.user,
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_list_answers_304_without_serializing(self):
+        response = self.client.get('/api/opportunities/')
+        etag = response['ETag']
+
+        with mock.patch.object(OpportunityListSerializer, 'to_representation') as to_representation:
+            response = self.client.get('/api/opportunities/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+    def test_list_etag_changes_with_data_and_user_relations(self):
+        etag = self.client.get('/api/opportunities/')['ETag']
+
+        UserOpportunity.objects.create(user=self.user, opportunity=self.opportunity, relation_type='saved')
+        response = self.client.get('/api/opportunities/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        Opportunity.objects.filter(pk=self.opportunity.pk).update(view_count=F('view_count') + 1)
+        response = self.client.get('/api/opportunities/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_supports_last_modified_and_still_records_view(self):
+        url = f'/api/opportunities/{self.opportunity.slug}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+
+        with mock.patch('opportunities.views.record_view') as record:
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
+        self.assertEqual(response.status_code, 304)
+        record.assert_called_once()
+
+    def test_etag_follows_related_names_and_the_clock(self):
+        category = OpportunityCategory.objects.create(name="Stages")
+        Opportunity.objects.filter(pk=self.opportunity.pk).update(category=category)
+        etag = self.client.get('/api/opportunities/')['ETag']
+
+        category.name = "Stages et alternances"
+        category.save()
+        response = self.client.get('/api/opportunities/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # « N jours restants » change avec l'heure, sans écriture en base
+        etag = response['ETag']
+        with mock.patch('core.conditional.time', mock.Mock(time=mock.Mock(return_value=time.time() + 3600))):
+            response = self.client.get('/api/opportunities/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_filters_the_queryset_once(self):
+        with mock.patch.object(OpportunityViewSet, 'filter_queryset', autospec=True,
+                               side_effect=lambda view, queryset: queryset) as filter_queryset:
+            self.client.get('/api/opportunities/')
+        filter_queryset.assert_called_once()
+
+
+class OpportunityFacetTests(APITestCase):
+    """Compteurs de facettes : table de cumul et requête groupée"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='partenaire@example.ci', username='partenaire', password='motdepasse-123'
+        )
+        self.category = OpportunityCategory.objects.create(name='Technologie')
+
+    def create(self, **extra):
+        values = {
+            'title': "Offre", 'description': "Offre", 'organization': "Orange CI",
+            'opportunity_type': 'job', 'status': 'published', 'creator': self.user,
+        }
+        values.update(extra)
+        return Opportunity.objects.create(**values)
+
+    def facet(self, data, name):
+        return {item['value']: item['count'] for item in data[name]}
+
+    def test_rollup_follows_saves_status_changes_and_deletes(self):
+        job = self.create(category=self.category, location='Abidjan', is_remote=True)
+        self.create(opportunity_type='internship', location='Bouaké')
+        self.create(status='draft', location='Abidjan')
+
+        with self.assertNumQueries(2):  # cumul + libellés des catégories
+            data = self.client.get('/api/opportunities/facets/').data
+        self.assertEqual(self.facet(data, 'type'), {'job': 1, 'internship': 1})
+        self.assertEqual(self.facet(data, 'location'), {'abidjan': 1, 'bouake': 1})
+        self.assertEqual(self.facet(data, 'category'), {'technologie': 1})
+        self.assertEqual(self.facet(data, 'is_remote'), {True: 1, False: 1})
+
+        job.location = 'Bouaké'
+        job.save()
+        data = self.client.get('/api/opportunities/facets/').data
+        self.assertEqual(self.facet(data, 'location'), {'bouake': 2})
+
+        job.status = 'closed'
+        job.save()
+        data = self.client.get('/api/opportunities/facets/').data
+        self.assertEqual(self.facet(data, 'type'), {'internship': 1})
+
+        job.delete()
+        self.assertEqual(rollup_counts(), grouped_counts(Opportunity.objects.filter(status='published')))
+
+    def test_filtered_counts_use_one_grouped_query(self):
+        self.create(location='Abidjan', is_remote=True)
+        self.create(location='Abidjan', opportunity_type='internship')
+        self.create(location='Yamoussoukro')
+
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/opportunities/facets/?location=abidjan').data
+
+        self.assertEqual(self.facet(data, 'type'), {'job': 1, 'internship': 1})
+        self.assertEqual(self.facet(data, 'is_remote'), {True: 1, False: 1})
+
+    def test_lifecycle_and_import_refresh_rollup(self):
+        opportunity = self.create(status='scheduled', publication_date=timezone.now() - timedelta(hours=1))
+        run_lifecycle()
+        self.assertEqual(rollup_counts()['type'], {'job': 1})
+
+        import_opportunities(io.StringIO(
+            '{"title": "Stage", "description": "Stage", "organization": "Wave", '
+            '"opportunity_type": "internship", "status": "published"}\n'
+        ), 'jsonl', self.user)
+        self.assertEqual(rollup_counts()['type'], {'job': 1, 'internship': 1})
+        opportunity.refresh_from_db()
+        self.assertEqual(opportunity.status, 'published')
+
+
+class OpportunityLocationTests(APITestCase):
+    """Codes de ville normalisés, filtre par ville et tri par proximité"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='daloa@example.ci', username='daloa', password='motdepasse-123', city='daloa'
+        )
+
+    def create(self, location, **extra):
+        return Opportunity.objects.create(
+            title=f"Offre {location}", description="Offre", organization="CIE",
+            opportunity_type='job', status='published', creator=self.user, location=location, **extra
+        )
+
+    def test_city_codes_match_user_choices(self):
+        user_codes = {code for code, _ in User.CITY_CHOICES}
+        self.assertLessEqual(set(CITIES), user_codes)
+        self.assertEqual(DISTANCES[('abidjan', 'abidjan')], 0)
+        self.assertEqual(DISTANCES[('abidjan', 'korhogo')], DISTANCES[('korhogo', 'abidjan')])
+
+    def test_free_text_is_normalized_at_write_time(self):
+        self.assertEqual(normalize_location("Cocody, Abidjan"), 'abidjan')
+        self.assertEqual(normalize_location("SAN PEDRO"), 'sanpedro')
+        self.assertEqual(normalize_location("Bouaké - Air France 3"), 'bouake')
+        self.assertEqual(normalize_location("Télétravail"), None)
+        self.assertEqual(normalize_location("Dakar"), 'other')
+
+        opportunity = self.create("Yakro")
+        self.assertEqual(opportunity.location_code, 'yamoussoukro')
+        opportunity.location = "Korhogo"
+        opportunity.save(update_fields=['location'])
+        opportunity.refresh_from_db()
+        self.assertEqual(opportunity.location_code, 'korhogo')
+
+    def test_location_filter_is_a_code_seek(self):
+        self.create("Plateau, Abidjan")
+        self.create("Bouaké")
+        self.create("Man")
+
+        response = self.client.get('/api/opportunities/?location=abidjan,bouake')
+
+        self.assertEqual(
+            sorted(item['location_code'] for item in response.data['results']), ['abidjan', 'bouake']
+        )
+
+    def test_distance_ordering_uses_user_city(self):
+        self.create("Man")
+        self.create("Daloa")
+        self.create("Abidjan")
+        self.create("Dakar")
+        self.create("", is_remote=True)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get('/api/opportunities/?ordering=distance')
+
+        codes = [item['location_code'] for item in response.data['results']]
+        self.assertEqual(codes, [None, 'daloa', 'man', 'abidjan', 'other'])
+
+        response = self.client.get('/api/opportunities/?ordering=distance&city=Abidjan')
+        self.assertEqual(response.data['results'][1]['location_code'], 'abidjan')
+
+
+class OpportunityTrigramTests(APITestCase):
+    """Autocomplétion et recherche tolérantes aux fautes de frappe"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='recruteur@example.ci', username='recruteur', password='motdepasse-123'
+        )
+        trigram.invalidate()
+
+    def create(self, title, organization, **extra):
+        extra.setdefault('status', 'published')
+        return Opportunity.objects.create(
+            title=title, description="Offre", organization=organization,
+            opportunity_type='job', creator=self.user, **extra
+        )
+
+    def test_autocomplete_handles_prefixes_and_misspellings(self):
+        self.create("Développeur Python", "Orange Côte d'Ivoire", location="Cocody", tags="django, api")
+        self.create("Développeur mobile", "MTN", location="Abidjan")
+        self.create("Comptable", "Orange Côte d'Ivoire", location="Bouaké")
+
+        def suggestions(query):
+            response = self.client.get('/api/opportunities/autocomplete/', {'q': query})
+            self.assertEqual(response.status_code, 200)
+            return [(item['kind'], item['text']) for item in response.data]
+
+        self.assertEqual(
+            set(suggestions("dévelo")[:2]), {('title', "Développeur mobile"), ('title', "Développeur Python")}
+        )
+        self.assertIn(('title', "Développeur Python"), suggestions("developeur"))
+        self.assertEqual(suggestions("abidjn")[0], ('location', "Abidjan"))
+        self.assertEqual(suggestions("orange ci")[0], ('organization', "Orange Côte d'Ivoire"))
+        self.assertEqual(self.client.get('/api/opportunities/autocomplete/', {'q': "orange"}).data[0]['count'], 2)
+        self.assertEqual(suggestions(""), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        opportunity = self.create("Stage marketing digital", "Jumia")
+        self.assertEqual(trigram.suggest("jumia")[0]['text'], "Jumia")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            opportunity.status = 'closed'
+            opportunity.save()
+        self.assertEqual(trigram.suggest("jumia"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create("Stage comptabilité", "Wave")
+        self.assertEqual(trigram.suggest("wav")[0]['text'], "Wave")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Opportunity.objects.get(organization="Wave").delete()
+        self.assertEqual(trigram.suggest("wav"), [])
+
+    def test_search_tolerates_typos(self):
+        self.create("Développeur Python", "Orange Côte d'Ivoire")
+        self.create("Comptable", "Société Générale")
+
+        response = self.client.get('/api/opportunities/', {'q': "developeur"})
+
+        self.assertEqual([item['title'] for item in response.data['results']], ["Développeur Python"])
+
+
+class OpportunityDuplicateTests(APITestCase):
+    """Détection des quasi-doublons par MinHash/LSH et examen par le staff"""
+
+    DESCRIPTION = (
+        "La Fondation Orange offre des bourses d'excellence aux étudiants ivoiriens admis en "
+        "master dans une université publique. La bourse couvre les frais de scolarité, le "
+        "logement et une allocation mensuelle pendant deux années universitaires."
+    )
+
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            email='moderation@example.ci', username='moderation', password='motdepasse-123', is_staff=True
+        )
+        self.user = User.objects.create_user(
+            email='publieur@example.ci', username='publieur', password='motdepasse-123'
+        )
+
+    def create(self, title, description=None, **extra):
+        return Opportunity.objects.create(
+            title=title, description=description or self.DESCRIPTION, organization="Fondation Orange",
+            opportunity_type='scholarship', status='published', creator=self.user, **extra
+        )
+
+    def test_near_duplicates_are_detected_at_save(self):
+        original = self.create("Bourse d'excellence Fondation Orange 2025")
+        duplicate = self.create(
+            "Bourse d'excellence Fondation Orange 2025 !",
+            self.DESCRIPTION.replace("deux années universitaires", "deux années universitaires.")
+        )
+        self.create("Stage développeur Python", "Stage de six mois au sein de l'équipe data à Abidjan.")
+
+        candidate = DuplicateCandidate.objects.get()
+        self.assertEqual((candidate.opportunity, candidate.original), (duplicate, original))
+        self.assertGreaterEqual(candidate.similarity, 0.8)
+        self.assertEqual(OpportunitySignatureBucket.objects.filter(opportunity=original).count(), dedup.BANDS)
+
+    def test_imported_batch_is_checked_against_itself(self):
+        lines = [
+            json.dumps({'title': "Bourse Fondation Orange", 'description': self.DESCRIPTION,
+                        'organization': "Fondation Orange", 'opportunity_type': 'scholarship'}),
+            json.dumps({'title': "Bourse Fondation Orange", 'description': self.DESCRIPTION + " Postulez vite.",
+                        'organization': "Fondation Orange", 'opportunity_type': 'scholarship'}),
+        ]
+        import_opportunities(io.StringIO('\n'.join(lines)), 'jsonl', self.user)
+
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+
+    def test_staff_review_and_collapsed_list(self):
+        original = self.create("Bourse Fondation Orange")
+        duplicate = self.create("Bourse Fondation Orange (rappel)")
+        candidate = DuplicateCandidate.objects.get()
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/opportunities/duplicates/').status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/opportunities/duplicates/')
+        self.assertEqual(response.data['results'][0]['opportunity']['id'], str(duplicate.pk))
+
+        response = self.client.post(f'/api/opportunities/duplicates/{candidate.pk}/confirm/')
+        self.assertEqual(response.data['status'], 'confirmed')
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.duplicate_of, original)
+
+        response = self.client.get('/api/opportunities/', {'collapse_duplicates': 'true'})
+        self.assertEqual([item['id'] for item in response.data['results']], [str(original.pk)])
+        self.assertEqual(len(self.client.get('/api/opportunities/').data['results']), 2)
+
+        # Une paire examinée n'est pas reproposée après modification
+        duplicate.title = "Bourse Fondation Orange (dernier rappel)"
+        duplicate.save()
+        self.assertFalse(DuplicateCandidate.objects.filter(status='pending').exists())
+
+
+class UserOpportunityBulkTests(APITestCase):
+    """Favoris et candidatures groupés : requêtes constantes, résultat par identifiant"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='mobile@example.ci', username='mobile', password='motdepasse-123'
+        )
+        self.creator = User.objects.create_user(
+            email='entreprise@example.ci', username='entreprise', password='motdepasse-123'
+        )
+        self.opportunities = [
+            Opportunity.objects.create(
+                title=f"Offre {index}", description="Offre", organization="CIE", opportunity_type='job',
+                status='published', creator=self.creator, deadline=timezone.now() + timedelta(days=5)
+            )
+            for index in range(5)
+        ]
+        self.client.force_authenticate(self.user)
+
+    def ids(self, opportunities):
+        return [str(opportunity.pk) for opportunity in opportunities]
+
+    def test_bulk_save_and_unsave(self):
+        UserOpportunity.objects.create(user=self.user, opportunity=self.opportunities[0], relation_type='saved')
+        draft = Opportunity.objects.create(
+            title="Brouillon", description="Offre", organization="CIE", opportunity_type='job', creator=self.creator
+        )
+        ids = self.ids(self.opportunities) + [str(draft.pk)]
+
+        # Résolution des ids, relations existantes, insertion groupée (et son point de sauvegarde)
+        with self.assertNumQueries(5):
+            response = self.client.post('/api/opportunities/user-relations/bulk_save/', {'ids': ids}, format='json')
+
+        results = {item['id']: item['result'] for item in response.data['results']}
+        self.assertEqual(results[ids[0]], 'exists')
+        self.assertEqual(results[ids[1]], 'created')
+        self.assertEqual(results[str(draft.pk)], 'not_found')
+        self.assertEqual(response.data['totals'], {'exists': 1, 'created': 4, 'not_found': 1})
+        self.assertEqual(UserOpportunity.objects.filter(user=self.user, relation_type='saved').count(), 5)
+
+        response = self.client.post(
+            '/api/opportunities/user-relations/bulk_unsave/', {'ids': ids[:2] + [str(draft.pk)]}, format='json'
+        )
+        self.assertEqual(response.data['totals'], {'deleted': 2, 'not_found': 1})
+        self.assertEqual(UserOpportunity.objects.filter(user=self.user, relation_type='saved').count(), 3)
+
+    def test_bulk_apply_updates_counters_and_rejects_expired(self):
+        expired = self.opportunities[4]
+        Opportunity.objects.filter(pk=expired.pk).update(deadline=timezone.now() - timedelta(days=1))
+
+        response = self.client.post(
+            '/api/opportunities/user-relations/bulk_apply/', {'ids': self.ids(self.opportunities)}, format='json'
+        )
+
+        self.assertEqual(response.data['totals'], {'created': 4, 'expired': 1})
+        self.assertEqual(
+            list(Opportunity.objects.order_by('title').values_list('application_count', flat=True)), [1, 1, 1, 1, 0]
+        )
+        self.assertFalse(drifted_counters().exists())
+
+    def test_bulk_apply_does_not_count_concurrent_applications_twice(self):
+        bulk_create = UserOpportunity.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # Une candidature concurrente (comptée par post_save) arrive juste avant l'insertion groupée
+            UserOpportunity.objects.create(user=self.user, opportunity=self.opportunities[0], relation_type='applied')
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(UserOpportunity.objects, 'bulk_create', side_effect=racing_bulk_create):
+            self.client.post(
+                '/api/opportunities/user-relations/bulk_apply/', {'ids': self.ids(self.opportunities[:2])},
+                format='json'
+            )
+
+        self.opportunities[0].refresh_from_db()
+        self.assertEqual(self.opportunities[0].application_count, 1)
+        self.assertFalse(drifted_counters().exists())
+
+    def test_bulk_payload_is_validated(self):
+        response = self.client.post(
+            '/api/opportunities/user-relations/bulk_save/', {'ids': ['pas-un-uuid']}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        too_many = [str(uuid.uuid4()) for _ in range(101)]
+        response = self.client.post('/api/opportunities/user-relations/bulk_save/', {'ids': too_many}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class OpportunityExportTests(APITestCase):
+    """Exports en flux : portée par utilisateur, filtres de la liste, formats NDJSON et CSV"""
+
+    def setUp(self):
+        self.creator = User.objects.create_user(
+            email='partenaire@example.ci', username='partenaire', password='motdepasse-123'
+        )
+        self.other = User.objects.create_user(
+            email='autre@example.ci', username='autre', password='motdepasse-123'
+        )
+        self.staff = User.objects.create_user(
+            email='analyste@example.ci', username='analyste', password='motdepasse-123', is_staff=True
+        )
+        for index, (creator, opportunity_type) in enumerate(
+            [(self.creator, 'job'), (self.creator, 'internship'), (self.other, 'job')]
+        ):
+            Opportunity.objects.create(
+                title=f"Offre {index}", description="Offre", organization="CIE", status='published',
+                opportunity_type=opportunity_type, creator=creator, location="Abidjan"
+            )
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export_is_scoped_and_filtered(self):
+        self.client.force_authenticate(self.creator)
+        response = self.client.get('/api/opportunities/export/')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(sorted(row['title'] for row in rows), ["Offre 0", "Offre 1"])
+        self.assertEqual(rows[0]['location_code'], 'abidjan')
+
+        response = self.client.get('/api/opportunities/export/', {'type': 'internship'})
+        self.assertEqual([json.loads(line)['title'] for line in self.read(response).splitlines()], ["Offre 1"])
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/opportunities/export/', {'type': 'job'})
+        self.assertEqual(len(self.read(response).splitlines()), 2)
+
+    def test_csv_export_and_anonymous_access(self):
+        self.assertIn(self.client.get('/api/opportunities/export/').status_code, (401, 403))
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/opportunities/export/', {'file_format': 'csv', 'ordering': 'created_at'})
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([row['title'] for row in rows], ["Offre 0", "Offre 1", "Offre 2"])
+        self.assertEqual(rows[0]['is_remote'], 'False')
+
+        response = self.client.get('/api/opportunities/export/', {'file_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_relation_export_is_self_scoped(self):
+        for opportunity in Opportunity.objects.all():
+            UserOpportunity.objects.create(user=self.other, opportunity=opportunity, relation_type='saved')
+        UserOpportunity.objects.create(
+            user=self.creator, opportunity=Opportunity.objects.get(title="Offre 2"), relation_type='applied'
+        )
+
+        self.client.force_authenticate(self.other)
+        response = self.client.get('/api/opportunities/user-relations/export/', {'type': 'internship'})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([(row['opportunity_title'], row['relation_type']) for row in rows], [("Offre 1", 'saved')])
+
+        response = self.client.get('/api/opportunities/user-relations/export/', {'relation_type': 'applied'})
+        self.assertEqual(self.read(response), '')
+
+
+class OpportunityDeadlineCalendarTests(APITestCase):
+    """Calendrier des dates limites : cache par jour, invalidation, flux iCalendar et rappels"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='agenda@example.ci', username='agenda', password='motdepasse-123'
+        )
+        self.today = timezone.localdate()
+        self.noon = timezone.make_aware(datetime.combine(self.today, datetime.min.time())) + timedelta(hours=12)
+
+    def create(self, title, days, **extra):
+        extra.setdefault('status', 'published')
+        extra.setdefault('opportunity_type', 'job')
+        return Opportunity.objects.create(
+            title=title, description="Offre", organization="CIE",
+            creator=self.user, deadline=self.noon + timedelta(days=days), **extra
+        )
+
+    def test_calendar_groups_by_day_and_week_from_cached_buckets(self):
+        self.create("Dans 1 jour", 1)
+        self.create("Dans 3 jours", 3)
+        self.create("Dans 3 jours (stage)", 3, opportunity_type='internship')
+        self.create("Brouillon", 2, status='draft')
+        self.create("Dans 20 jours", 20)
+
+        response = self.client.get('/api/opportunities/calendar/', {'start': self.today.isoformat(), 'days': 7})
+        counts = {period['start']: period['count'] for period in response.data}
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(counts[self.today + timedelta(days=1)], 1)
+        self.assertEqual(counts[self.today + timedelta(days=3)], 2)
+        self.assertEqual(sum(counts.values()), 3)
+
+        # Jours en cache : plus de requête de plage, seulement le chargement des opportunités
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/api/opportunities/calendar/', {'start': self.today.isoformat(), 'days': 7, 'type': 'internship'}
+            )
+        self.assertEqual(sum(period['count'] for period in response.data), 1)
+        self.assertFalse([query for query in queries if 'deadline" >=' in query['sql'] and 'IN (' not in query['sql']])
+
+        response = self.client.get('/api/opportunities/calendar/', {'days': 28, 'group': 'week'})
+        self.assertEqual(sum(period['count'] for period in response.data), 4)
+        self.assertTrue(all(period['start'].weekday() == 0 for period in response.data))
+
+        self.assertEqual(self.client.get('/api/opportunities/calendar/', {'days': 500}).status_code, 400)
+
+    def test_deadline_edit_invalidates_cached_days(self):
+        opportunity = self.create("Offre", 2)
+        self.assertEqual(len(self.client.get('/api/opportunities/closing_soon/').data), 1)
+
+        opportunity.deadline = self.noon + timedelta(days=30)
+        opportunity.save()
+        self.assertEqual(self.client.get('/api/opportunities/closing_soon/').data, [])
+        self.assertEqual(len(self.client.get('/api/opportunities/closing_soon/', {'days': 31}).data), 1)
+
+        opportunity.status = 'closed'
+        opportunity.save()
+        self.assertEqual(self.client.get('/api/opportunities/closing_soon/', {'days': 31}).data, [])
+
+    def test_ical_feed_and_deadline_reminders(self):
+        saved = self.create("Bourse, master; Europe", 3)
+        applied = self.create("Stage", 10)
+        UserOpportunity.objects.create(user=self.user, opportunity=saved, relation_type='saved')
+        UserOpportunity.objects.create(user=self.user, opportunity=saved, relation_type='applied')
+        UserOpportunity.objects.create(user=self.user, opportunity=applied, relation_type='applied')
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/opportunities/user-relations/ical/')
+        feed = response.content.decode()
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertEqual(feed.count('BEGIN:VEVENT'), 2)
+        self.assertIn('SUMMARY:Date limite : Bourse\\, master\; Europe', feed)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in feed.split('\r\n')))
+
+        notifications = notify_upcoming_deadlines(days_before=3, now=self.noon)
+        self.assertEqual([notification.object_id for notification in notifications], [saved.id])
+        self.assertEqual(notify_upcoming_deadlines(days_before=3, now=self.noon), [])
+
+
+class OpportunityTrendingTests(APITestCase):
+    """Score de tendance : décroissance exponentielle, mise à jour incrémentale et tri"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='tendance@example.ci', username='tendance', password='motdepasse-123'
+        )
+        self.others = [
+            User.objects.create_user(email=f'fan{i}@example.ci', username=f'fan{i}', password='motdepasse-123')
+            for i in range(4)
+        ]
+        self.old = self.create("Bourse d'hier")
+        self.fresh = self.create("Bourse du jour")
+        self.quiet = self.create("Bourse oubliée")
+
+    def create(self, title, **extra):
+        extra.setdefault('status', 'published')
+        return Opportunity.objects.create(
+            title=title, description="Bourse", organization="MESRS",
+            opportunity_type='scholarship', creator=self.user, **extra
+        )
+
+    def test_recent_activity_outranks_older_activity(self):
+        # Quatre candidatures il y a 6 jours (trois demi-vies), une seule aujourd'hui
+        for user in self.others:
+            UserOpportunity.objects.create(user=user, opportunity=self.old, relation_type='applied')
+        UserOpportunity.objects.create(user=self.others[0], opportunity=self.fresh, relation_type='applied')
+        now = timezone.now()
+        UserOpportunity.objects.filter(opportunity=self.old).update(created_at=now - timedelta(days=6))
+
+        run = trending.update_trending(now=now)
+
+        self.assertEqual((run.stats['events'], run.stats['opportunities']), (5, 2))
+        scores = dict(Opportunity.objects.values_list('pk', 'trending_score'))
+        self.assertGreater(scores[self.fresh.pk], scores[self.old.pk])
+        self.assertAlmostEqual(trending.current_score(scores[self.old.pk], now), 4 * 5.0 / 8, places=3)
+        self.assertEqual(scores[self.quiet.pk], 0)
+
+        response = self.client.get('/api/opportunities/', {'ordering': '-trending'})
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [str(self.fresh.pk), str(self.old.pk), str(self.quiet.pk)]
+        )
+
+    def test_update_only_reads_events_since_last_run(self):
+        UserOpportunity.objects.create(user=self.others[0], opportunity=self.old, relation_type='saved')
+        now = timezone.now()
+        trending.update_trending(now=now)
+        first = Opportunity.objects.get(pk=self.old.pk).trending_score
+
+        # Rien de nouveau : le score ne change pas
+        run = trending.update_trending(now=now + timedelta(minutes=5))
+        self.assertEqual(run.stats['events'], 0)
+        self.assertEqual(Opportunity.objects.get(pk=self.old.pk).trending_score, first)
+
+        later = now + timedelta(minutes=10)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            UserOpportunity.objects.create(user=self.others[1], opportunity=self.old, relation_type='saved')
+        run = trending.update_trending(now=later)
+        self.assertEqual(run.stats['events'], 1)
+        self.assertAlmostEqual(
+            trending.current_score(Opportunity.objects.get(pk=self.old.pk).trending_score, later),
+            3.0 * 0.5 ** (10 / (48 * 60)) + 3.0, places=6
+        )
+
+    def test_late_committed_relations_are_counted_once(self):
+        UserOpportunity.objects.create(user=self.others[0], opportunity=self.old, relation_type='saved')
+        now = timezone.now()
+        trending.update_trending(now=now)
+
+        # Validée après l'exécution, mais datée d'avant le point de reprise
+        late = UserOpportunity.objects.create(user=self.others[1], opportunity=self.old, relation_type='saved')
+        UserOpportunity.objects.filter(pk=late.pk).update(created_at=now - timedelta(minutes=1))
+
+        run = trending.update_trending(now=now + timedelta(minutes=5))
+        self.assertEqual(run.stats['events'], 1)
+        run = trending.update_trending(now=now + timedelta(minutes=6))
+        self.assertEqual(run.stats['events'], 0)
+        self.assertAlmostEqual(
+            trending.current_score(Opportunity.objects.get(pk=self.old.pk).trending_score, now), 6.0, places=2
+        )
+
+    def test_views_are_dated_when_they_happened(self):
+        cache.clear()
+        with mock.patch('opportunities.tracking.time', mock.Mock(time=mock.Mock(return_value=time.time() - 48 * 3600))):
+            tracking.record_view(self.quiet)
+        tracking.flush_views()
+
+        self.quiet.refresh_from_db()
+        self.assertAlmostEqual(trending.current_score(self.quiet.trending_score), 0.5, places=3)
+
+    def test_flushed_views_feed_trending_endpoint(self):
+        apply_view_events([(str(self.quiet.pk), None)] * 3 + [(str(self.old.pk), self.others[0].pk)])
+        self.create("Brouillon", status='draft', trending_score=1e6)
+
+        response = self.client.get('/api/opportunities/trending/', {'limit': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data], [str(self.quiet.pk), str(self.old.pk)])
+        self.quiet.refresh_from_db()
+        self.assertAlmostEqual(trending.current_score(self.quiet.trending_score), 3.0, places=3)
+
+
+class OpportunitySimilarTests(APITestCase):
+    """Voisins TF-IDF précalculés et mise à jour incrémentale"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='voisins@example.ci', username='voisins', password='motdepasse-123'
+        )
+        self.python = self.create("Stage développeur Python Django", "Développement d'API Python et Django")
+        self.django = self.create("Développeur Django junior", "Applications web Python, Django REST")
+        self.compta = self.create("Comptable senior", "Comptabilité générale et fiscalité, audit")
+        self.audit = self.create("Auditeur financier", "Audit, comptabilité et contrôle de gestion")
+
+    def create(self, title, description, **extra):
+        extra.setdefault('status', 'published')
+        return Opportunity.objects.create(
+            title=title, description=description, organization="Orange CI",
+            opportunity_type='job', creator=self.user, **extra
+        )
+
+    def neighbor_ids(self, opportunity):
+        return list(OpportunityNeighbor.objects.filter(
+            opportunity=opportunity
+        ).order_by('-score').values_list('neighbor_id', flat=True))
+
+    def test_rebuild_finds_nearest_neighbors(self):
+        run = similar.rebuild()
+
+        self.assertEqual(run.stats['indexed'], 4)
+        self.assertEqual(self.neighbor_ids(self.python)[0], self.django.pk)
+        self.assertEqual(self.neighbor_ids(self.compta)[0], self.audit.pk)
+        self.assertNotIn(self.compta.pk, self.neighbor_ids(self.python))
+
+        with self.assertNumQueries(2):  # opportunité, puis voisins en une jointure
+            response = self.client.get(f'/api/opportunities/{self.python.slug}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data], [str(self.django.pk)])
+
+    def test_refresh_only_touches_new_edited_and_withdrawn_opportunities(self):
+        similar.rebuild()
+
+        self.assertEqual(similar.refresh().stats['indexed'], 0)
+
+        newcomer = self.create("Stagiaire Python Django", "API Django et scripts Python")
+        self.django.status = 'draft'
+        self.django.save()
+        run = similar.refresh()
+
+        self.assertEqual((run.stats['indexed'], run.stats['removed']), (1, 1))
+        self.assertEqual(self.neighbor_ids(self.python), [newcomer.pk])
+        self.assertEqual(self.neighbor_ids(newcomer), [self.python.pk])
+        self.assertFalse(OpportunityNeighbor.objects.filter(opportunity=self.django).exists())
+        self.assertNotIn(newcomer.pk, self.neighbor_ids(self.compta))
+
+    def test_refresh_reads_only_the_postings_of_changed_terms(self):
+        similar.rebuild()
+        newcomer = self.create("Stagiaire Python Django", "API Django et scripts Python")
+
+        with mock.patch.object(similar, '_save_neighbors', wraps=similar._save_neighbors) as save:
+            similar.refresh()
+
+        index, refreshed = save.call_args[0]
+        # Seul « Python Django » partage un terme (« api ») avec la nouvelle opportunité
+        self.assertEqual(set(refreshed), {newcomer.pk, self.python.pk})
+        self.assertEqual(set(index.vectors), {newcomer.pk, self.python.pk})
+        self.assertEqual(
+            set(OpportunityTerm.objects.filter(vector_id=newcomer.pk).values_list('term', 'weight')),
+            set(OpportunityVector.objects.get(pk=newcomer.pk).weights.items())
+        )
+
+
+class OpportunitySnapshotTests(APITestCase):
+    """Instantanés du fil public : contenu identique à l'API, fichiers versionnés servis par l'API"""
+
+    def setUp(self):
+        cache.clear()
+        override = override_settings(OPPORTUNITY_SNAPSHOT_CONFIG={
+            'PAGES': 2, 'PAGE_SIZE': 2, 'GRACE_PERIOD': 0,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(
+            email='statique@example.ci', username='statique', password='motdepasse-123'
+        )
+        self.category = OpportunityCategory.objects.create(name="Bourses", slug='bourses')
+        for index in range(5):
+            Opportunity.objects.create(
+                title=f"Bourse {index}", description="Bourse", organization="MESRS",
+                opportunity_type='scholarship', status='published', creator=self.user,
+                category=self.category if index % 2 else None, featured=index == 0,
+            )
+        Opportunity.objects.create(
+            title="Brouillon", description="Brouillon", organization="MESRS",
+            opportunity_type='scholarship', status='draft', creator=self.user,
+        )
+
+    def manifest(self):
+        return json.loads(self.client.get('/api/opportunities/snapshots/manifest.json').content)
+
+    def read(self, name):
+        response = self.client.get(f"{self.manifest()['url']}{self.manifest()['files'][name]}")
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_snapshots_match_anonymous_api_responses(self):
+        snapshots.build()
+
+        api = self.client.get('/api/opportunities/').data
+        page = self.read('page-1')
+        self.assertEqual(page['count'], 5)
+        self.assertEqual(page['next'], '/api/opportunities/?page=2')
+        self.assertEqual(
+            [item['id'] for item in page['results'] + self.read('page-2')['results']],
+            [str(pk) for pk in Opportunity.objects.filter(status='published').values_list('pk', flat=True)[:4]]
+        )
+        self.assertEqual(page['results'][0]['title'], api['results'][0]['title'])
+        self.assertIsNone(page['results'][0]['user_relation'])
+        self.assertEqual([item['title'] for item in self.read('featured')], ["Bourse 0"])
+        self.assertEqual(
+            [item['title'] for item in self.read('category-bourses')['results']], ["Bourse 3", "Bourse 1"]
+        )
+
+    def test_publication_marks_dirty_and_rebuild_replaces_changed_files(self):
+        snapshots.build()
+        before = self.manifest()['files']
+        self.assertFalse(snapshots.is_dirty())
+        self.assertIsNone(snapshots.build_if_needed())
+
+        draft = Opportunity.objects.get(status='draft')
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.status = 'published'
+            draft.save()
+        self.assertTrue(snapshots.is_dirty())
+
+        run = snapshots.build_if_needed()
+
+        after = self.manifest()['files']
+        self.assertNotEqual(after['page-1'], before['page-1'])
+        self.assertEqual(after['featured'], before['featured'])  # contenu inchangé : même fichier
+        self.assertEqual(self.client.get(f"/api/opportunities/snapshots/{before['page-1']}").status_code, 404)
+        self.assertGreaterEqual(run.stats['removed'], 1)
+        self.assertEqual(self.read('page-1')['results'][0]['title'], "Brouillon")
+
+    def test_files_are_served_compressed_with_long_or_short_cache(self):
+        snapshots.build()
+        name = self.manifest()['files']['page-1']
+
+        response = self.client.get(f'/api/opportunities/snapshots/{name}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['count'], 5)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get('/api/opportunities/snapshots/manifest.json', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(self.client.get('/api/opportunities/snapshots/page-9.json').status_code, 404)
+
+
+class OpportunityPrerankTests(APITestCase):
+    """Pré-classement BM25 des candidates envoyées au modèle de langage"""
+
+    def setUp(self):
+        cache.clear()
+        prerank._index = None
+        self.user = User.objects.create_user(
+            email='candidat@example.ci', username='candidat', password='motdepasse-123'
+        )
+        self.python_abidjan = self.create("Développeur Python", "API Django et Python", location="Cocody")
+        self.python_bouake = self.create("Développeur Python", "API Django et Python", location="Bouaké")
+        self.compta = self.create("Comptable junior", "Comptabilité et fiscalité", location="Abidjan")
+
+    def create(self, title, description, **extra):
+        extra.setdefault('status', 'published')
+        return Opportunity.objects.create(
+            title=title, description=description, organization="Orange CI",
+            opportunity_type='job', creator=self.user, **extra
+        )
+
+    def test_ranks_by_skills_then_city(self):
+        ranked = prerank.top_candidates({'skills': ['Python', 'Django'], 'city': 'Abidjan'}, 2)
+
+        self.assertEqual([pk for pk, _ in ranked], [self.python_abidjan.pk, self.python_bouake.pk])
+        self.assertGreater(ranked[0][1], ranked[1][1])
+
+    def test_excludes_and_pads_with_trending(self):
+        Opportunity.objects.filter(pk=self.compta.pk).update(trending_score=5.0)
+        ranked = prerank.top_candidates({'skills': ['Python']}, 3, exclude=[self.python_abidjan.pk])
+
+        self.assertEqual(ranked, [(self.python_bouake.pk, ranked[0][1]), (self.compta.pk, 0.0)])
+
+    @override_settings(OPPORTUNITY_PRERANK_CONFIG={'REFRESH_INTERVAL': 0})
+    def test_index_follows_catalogue_changes(self):
+        self.assertEqual(prerank.top_candidates({'skills': ['marketing']}, 1)[0][1], 0.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            marketing = self.create("Chargé marketing digital", "Marketing et réseaux sociaux")
+
+        [(pk, score)] = prerank.top_candidates({'skills': ['marketing']}, 1)
+        self.assertEqual(pk, marketing.pk)
+        self.assertGreater(score, 0.0)
+
+    def test_index_rebuilds_at_most_once_per_refresh_interval(self):
+        index = prerank.get_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create("Chargé marketing digital", "Marketing et réseaux sociaux")
+
+        self.assertIs(prerank.get_index(), index)
+        with mock.patch('opportunities.prerank.time.monotonic', return_value=index.built_at + 60):
+            self.assertIsNot(prerank.get_index(), index)
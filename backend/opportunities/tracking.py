@@ -0,0 +1,190 @@
+# opportunities/tracking.py
+"""
+Comptage différé (write-behind) des consultations d'opportunités.
+
+La page détail n'écrit plus en base : chaque consultation est ajoutée à un journal
+dans le cache (une clé par événement, numérotée par un compteur atomique ``incr``).
+Le journal est vidé par lots par ``python manage.py flush_opportunity_views`` (tâche
+cron ``opportunici-flush-views`` de render.yaml, chaque minute) :
+le curseur s'arrête au premier numéro réservé dont l'événement n'est pas encore écrit
+(``incr`` puis ``set`` ne sont pas atomiques), sauf s'il manque depuis plus de
+``GAP_GRACE_PERIOD`` secondes (événement perdu ou expiré). Les compteurs ``view_count``
+sont incrémentés avec ``F()`` et les relations « viewed » créées avec
+``bulk_create(ignore_conflicts=True)``. Les consultations
+alimentent aussi le score de tendance (trending.py).
+"""
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from . import trending
+from .models import Opportunity, UserOpportunity
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'opportunities:views'
+SEQUENCE_KEY = f'{KEY_PREFIX}:seq'
+CURSOR_KEY = f'{KEY_PREFIX}:cursor'
+LOCK_KEY = f'{KEY_PREFIX}:lock'
+GAPS_KEY = f'{KEY_PREFIX}:gaps'
+
+DEFAULT_CONFIG = {
+    'EVENT_TTL': 7 * 24 * 3600,  # secondes avant qu'un événement non traité expire
+    'FLUSH_BATCH_SIZE': 1000,
+    'FLUSH_INTERVAL': 60,  # secondes entre deux vidages en mode worker
+    'LOCK_TIMEOUT': 300,
+    # Secondes pendant lesquelles un numéro réservé mais pas encore écrit bloque le curseur
+    'GAP_GRACE_PERIOD': 60,
+}
+
+
+def get_config(name):
+    return getattr(settings, 'OPPORTUNITY_VIEWS_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def _event_key(seq):
+    return f'{KEY_PREFIX}:event:{seq}'
+
+
+def _next_sequence():
+    try:
+        return cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # Première utilisation (ou clé évincée) : initialiser sans écraser une valeur concurrente
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        return cache.incr(SEQUENCE_KEY)
+
+
+def record_view(opportunity, user=None):
+    """
+    Journaliser une consultation (aucune écriture en base)
+
+    Args:
+        opportunity: opportunité consultée
+        user: utilisateur courant, éventuellement anonyme
+    """
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    try:
+        seq = _next_sequence()
+        cache.set(_event_key(seq), (str(opportunity.pk), user_id, time.time()), get_config('EVENT_TTL'))
+    except Exception as e:
+        # Une panne du cache ne doit jamais faire échouer la lecture
+        logger.warning(f"Impossible de journaliser la consultation de {opportunity.pk}: {e}")
+
+
+def apply_view_events(events):
+    """
+    Appliquer un lot d'événements (opportunity_id, user_id, horodatage) en base
+
+    Les événements journalisés avant l'ajout de l'horodatage (opportunity_id, user_id)
+    sont datés du vidage.
+
+    Returns:
+        Nombre d'événements appliqués
+    """
+    now = time.time()
+    events = [(event[0], event[1], event[2] if len(event) > 2 else now) for event in events]
+    if not events:
+        return 0
+
+    view_counts = Counter(opportunity_id for opportunity_id, _, _ in events)
+    existing_ids = set(
+        str(pk) for pk in Opportunity.objects.filter(pk__in=list(view_counts)).values_list('pk', flat=True)
+    )
+    viewers = {
+        (opportunity_id, user_id) for opportunity_id, user_id, _ in events
+        if user_id is not None and opportunity_id in existing_ids
+    }
+    existing_user_ids = set(
+        get_user_model().objects.filter(pk__in={user_id for _, user_id in viewers}).values_list('pk', flat=True)
+    )
+
+    # Regrouper les opportunités par incrément : une requête UPDATE par valeur distincte
+    ids_by_increment = defaultdict(list)
+    for opportunity_id, count in view_counts.items():
+        if opportunity_id in existing_ids:
+            ids_by_increment[count].append(opportunity_id)
+
+    with transaction.atomic():
+        for increment, opportunity_ids in ids_by_increment.items():
+            Opportunity.objects.filter(pk__in=opportunity_ids).update(
+                view_count=F('view_count') + increment
+            )
+
+        UserOpportunity.objects.bulk_create(
+            [
+                UserOpportunity(user_id=user_id, opportunity_id=opportunity_id, relation_type='viewed')
+                for opportunity_id, user_id in viewers if user_id in existing_user_ids
+            ],
+            ignore_conflicts=True,
+            batch_size=500
+        )
+
+        trending.add_views(
+            (pk, datetime.fromtimestamp(viewed_at, tz=dt_timezone.utc))
+            for pk, _, viewed_at in events if pk in existing_ids
+        )
+
+    return len(events)
+
+
+def _gap_expired(seq, gaps, now):
+    """Le numéro ``seq`` manque-t-il depuis plus de GAP_GRACE_PERIOD ? (première absence notée dans ``gaps``)"""
+    first_seen = gaps.setdefault(seq, now)
+    return now - first_seen >= get_config('GAP_GRACE_PERIOD')
+
+
+def flush_views(batch_size=None):
+    """
+    Vider le journal des consultations par lots
+
+    Returns:
+        Nombre d'événements appliqués, ou 0 si un autre vidage est en cours
+    """
+    batch_size = batch_size or get_config('FLUSH_BATCH_SIZE')
+    if not cache.add(LOCK_KEY, 1, get_config('LOCK_TIMEOUT')):
+        return 0
+
+    total = 0
+    try:
+        head = cache.get(SEQUENCE_KEY) or 0
+        cursor = cache.get(CURSOR_KEY) or 0
+        if cursor > head:
+            # Le compteur a été réinitialisé (cache vidé) : repartir du début
+            cursor = 0
+        gaps = cache.get(GAPS_KEY) or {}
+        now = time.time()
+
+        while cursor < head:
+            end = min(cursor + batch_size, head)
+            keys = [_event_key(seq) for seq in range(cursor + 1, end + 1)]
+            events = cache.get_many(keys)
+
+            # Avancer jusqu'au premier événement réservé mais pas encore écrit
+            ready = end
+            for seq, key in enumerate(keys, start=cursor + 1):
+                if key not in events and not _gap_expired(seq, gaps, now):
+                    ready = seq - 1
+                    break
+            keys = keys[:ready - cursor]
+
+            total += apply_view_events(events[key] for key in keys if key in events)
+            cache.delete_many(keys)
+            cursor = ready
+            cache.set(CURSOR_KEY, cursor, timeout=None)
+            if ready < end:
+                break
+
+        gaps = {seq: first_seen for seq, first_seen in gaps.items() if seq > cursor}
+        cache.set(GAPS_KEY, gaps, timeout=None)
+    finally:
+        cache.delete(LOCK_KEY)
+
+    return total
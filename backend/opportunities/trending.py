@@ -0,0 +1,163 @@
+# opportunities/trending.py
+"""
+Score de tendance des opportunités : consultations, favoris et candidatures récents,
+avec une décroissance exponentielle (demi-vie ``HALF_LIFE``).
+
+Le score décroissant d'une opportunité à l'instant t vaut Σ poids · exp(-(t - tᵢ)/τ).
+Le facteur exp(-t/τ) est commun à toutes les opportunités : on stocke donc
+``trending_score`` = ln Σ poids · exp((tᵢ - EPOCH)/τ) (« forward decay » en espace
+logarithmique), qui ne dépend pas de t. Le tri par ce champ indexé est le tri par score
+décroissant à tout instant, sans jamais recalculer les anciennes lignes : un événement
+s'ajoute par ``logaddexp`` et chaque exécution ne traite que les événements survenus
+depuis la précédente.
+
+- Consultations : ajoutées lors du vidage du journal write-behind (tracking.py), datées
+  du moment de la consultation (pas de celui du vidage).
+- Favoris et candidatures : lus depuis ``UserOpportunity.created_at`` à partir du point
+  de reprise de la dernière exécution (``python manage.py update_trending_scores``, tâche
+  cron ``opportunici-trending`` de render.yaml). Les ``OVERLAP`` secondes précédant le
+  point de reprise sont relues : une relation validée après l'exécution mais datée d'avant
+  est prise en compte, celles déjà comptées (``stats['recent']``) sont ignorées.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Opportunity, OpportunityTaskRun, UserOpportunity
+
+TASK_NAME = 'trending'
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+DEFAULT_CONFIG = {
+    'HALF_LIFE': 48 * 3600,  # secondes
+    'INTERVAL': 300,  # secondes, pour update_trending_scores --loop
+    'OVERLAP': 300,  # secondes relues avant le point de reprise (transactions validées en retard)
+    'WEIGHTS': {'viewed': 1.0, 'saved': 3.0, 'applied': 5.0},
+}
+
+# Au premier lancement, seuls les événements récents comptent (poids < 1 % au-delà)
+BOOTSTRAP_HALF_LIVES = 7
+UPDATE_BATCH_SIZE = 500
+
+
+def get_config(name):
+    return getattr(settings, 'OPPORTUNITY_TRENDING_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def log_weight(weight, when):
+    """ln(poids · exp((t - EPOCH)/τ)) d'un événement"""
+    tau = get_config('HALF_LIFE') / math.log(2)
+    return math.log(weight) + (when - EPOCH).total_seconds() / tau
+
+
+def logaddexp(a, b):
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def current_score(stored, now=None):
+    """Score décroissant à l'instant ``now`` (pour l'affichage ; le tri utilise le champ stocké)"""
+    if not stored:
+        return 0.0
+    now = now or timezone.now()
+    return math.exp(stored - log_weight(1.0, now))
+
+
+def apply_terms(terms):
+    """
+    Ajouter des contributions {opportunity_id: ln(Σ poids·exp(...))} aux scores stockés
+
+    Une requête UPDATE par lot : ``logaddexp(trending_score, terme)`` en SQL, sans lire les
+    scores actuels (pas de mise à jour perdue en cas d'écritures concurrentes).
+    """
+    items = list(terms.items())
+    for start in range(0, len(items), UPDATE_BATCH_SIZE):
+        chunk = items[start:start + UPDATE_BATCH_SIZE]
+        term = Case(
+            *[When(pk=pk, then=Value(value)) for pk, value in chunk],
+            output_field=FloatField()
+        )
+        Opportunity.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+            trending_score=Greatest(F('trending_score'), term) + Ln(
+                Value(1.0) + Exp(-Abs(F('trending_score') - term))
+            )
+        )
+
+
+def add_events(events):
+    """
+    Ajouter des événements au score
+
+    Args:
+        events: itérable de (opportunity_id, relation_type, date, nombre)
+    """
+    weights = get_config('WEIGHTS')
+    terms = {}
+    for opportunity_id, relation_type, when, count in events:
+        value = log_weight(weights[relation_type] * count, when)
+        terms[opportunity_id] = logaddexp(terms[opportunity_id], value) if opportunity_id in terms else value
+    if terms:
+        apply_terms(terms)
+    return len(terms)
+
+
+def add_views(views):
+    """Consultations vidées du journal write-behind : itérable de (opportunity_id, date de consultation)"""
+    return add_events((pk, 'viewed', when, 1) for pk, when in views)
+
+
+def last_run_stats():
+    """Statistiques de la dernière exécution terminée (point de reprise, relations récentes déjà comptées)"""
+    stats = OpportunityTaskRun.objects.filter(
+        task=TASK_NAME, finished_at__isnull=False
+    ).order_by('-started_at').values_list('stats', flat=True).first()
+    return stats or {}
+
+
+def update_trending(now=None):
+    """
+    Ajouter les favoris et candidatures créés depuis la dernière exécution
+
+    Returns:
+        OpportunityTaskRun enregistré, dont ``stats['checkpoint']`` est le point de reprise
+    """
+    now = now or timezone.now()
+    previous = last_run_stats()
+    checkpoint = parse_datetime(previous['checkpoint']) if previous.get('checkpoint') else None
+    checkpoint = checkpoint or now - timedelta(seconds=BOOTSTRAP_HALF_LIVES * get_config('HALF_LIFE'))
+    overlap = timedelta(seconds=get_config('OVERLAP'))
+    counted = previous.get('recent', {})
+    run = OpportunityTaskRun.objects.create(task=TASK_NAME, started_at=now)
+
+    # Index (created_at) : seuls les événements de la fenêtre (et du chevauchement) sont lus
+    rows = UserOpportunity.objects.filter(
+        created_at__gt=checkpoint - overlap, created_at__lte=now, relation_type__in=['saved', 'applied']
+    ).order_by().values_list('pk', 'opportunity_id', 'relation_type', 'created_at')
+
+    events = defaultdict(int)
+    # Relations comptées dont la date est encore dans le chevauchement de la prochaine exécution
+    recent = {pk: created_at for pk, created_at in counted.items() if parse_datetime(created_at) > now - overlap}
+    for pk, opportunity_id, relation_type, created_at in rows.iterator(chunk_size=2000):
+        if str(pk) in counted:
+            continue
+        events[(opportunity_id, relation_type, created_at)] += 1
+        if created_at > now - overlap:
+            recent[str(pk)] = created_at.isoformat()
+
+    with transaction.atomic():
+        updated = add_events((pk, relation_type, when, count) for (pk, relation_type, when), count in events.items())
+
+    run.finished_at = timezone.now()
+    run.stats = {
+        'checkpoint': now.isoformat(), 'events': sum(events.values()), 'opportunities': updated, 'recent': recent,
+    }
+    run.save(update_fields=['finished_at', 'stats'])
+    return run
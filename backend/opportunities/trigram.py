@@ -0,0 +1,352 @@
+# opportunities/trigram.py
+"""
+Recherche tolérante aux fautes par trigrammes : suggestions d'autocomplétion (titres,
+organismes, tags, villes) et correction des termes de la recherche plein texte.
+
+- PostgreSQL : extension ``pg_trgm`` (index GIN ``gin_trgm_ops`` sur le titre, l'organisme
+  et le nom des tags, voir la migration 0008), opérateur ``<%`` et ``word_similarity``.
+- Autres bases : index de trigrammes en mémoire, construit au premier usage à partir des
+  opportunités publiées puis tenu à jour par les signaux après chaque commit. Chaque
+  modification incrémente une version partagée dans le cache ; un processus dont l'index
+  est en retard sur cette version le reconstruit (au plus une fois par ``REFRESH_INTERVAL``).
+
+Les trigrammes suivent la convention de pg_trgm : chaque mot est précédé de deux espaces
+et suivi d'une espace (« dev » -> « ··d », « ·de », « dev », « ev· »).
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BooleanField, Count, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+
+from .locations import CITIES, city_label
+from .models import Opportunity, Tag
+from .tags import parse_tags
+
+VERSION_KEY = 'opportunities:trigram:version'
+
+DEFAULT_CONFIG = {
+    'MIN_SIMILARITY': 0.3,  # score minimal d'une suggestion
+    'MIN_TERM_SIMILARITY': 0.45,  # similarité minimale d'une correction de terme
+    'REFRESH_INTERVAL': 60,  # secondes minimum entre deux reconstructions par processus
+}
+
+# Bonus des textes dont un mot commence par la saisie (autocomplétion de préfixe)
+PREFIX_BONUS = 0.5
+MAX_SUGGESTIONS = 20
+MAX_CORRECTIONS = 2
+
+
+def get_config(name):
+    return getattr(settings, 'OPPORTUNITY_TRIGRAM_CONFIG', {}).get(name, DEFAULT_CONFIG[name])
+
+
+def fold(text):
+    """Minuscules sans accents, mots séparés par une espace"""
+    normalized = unicodedata.normalize('NFKD', text or '')
+    normalized = ''.join(c for c in normalized if not unicodedata.combining(c)).lower()
+    return ' '.join(re.findall(r'\w+', normalized))
+
+
+def trigrams(folded):
+    """Ensemble des trigrammes d'un texte déjà plié"""
+    grams = set()
+    for word in folded.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity_score(query, query_size, text, text_size, common):
+    """
+    Score d'un texte plié pour une saisie pliée
+
+    Maximum de la similarité de pg_trgm (trigrammes communs / trigrammes distincts) et
+    de la similarité de mot (part des trigrammes de la saisie présents dans le texte),
+    plus un bonus si un mot du texte commence par la saisie.
+    """
+    score = max(common / (query_size + text_size - common), 0.9 * common / query_size)
+    if text.startswith(query) or f' {query}' in text:
+        score += PREFIX_BONUS
+    return score
+
+
+def suggestion_texts(title, organization, tags, location, location_code):
+    """Textes proposés en suggestion pour une opportunité : [(type, texte)]"""
+    texts = [('title', title), ('organization', organization)]
+    texts.extend(('tag', name) for name in parse_tags(tags).values())
+    texts.append(('location', city_label(location_code) if location_code in CITIES else location))
+    return [(kind, text.strip()) for kind, text in texts if text and text.strip()]
+
+
+def _ranked(results, limit):
+    """Trier des (score, nombre, type, texte) et les mettre en forme pour l'API"""
+    results.sort(key=lambda item: (-item[0], -item[1], item[3]))
+    return [
+        {'text': text, 'kind': kind, 'count': count, 'score': round(score, 3)}
+        for score, count, kind, text in results[:limit]
+    ]
+
+
+class TrigramIndex:
+    """
+    Index inversé trigramme -> textes, et vocabulaire des mots pour la correction
+
+    Chaque texte est pondéré par le nombre d'opportunités publiées qui le portent ;
+    les contributions de chaque opportunité sont conservées pour les retraits incrémentaux.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.lock = threading.RLock()
+        self.entries = {}  # (type, texte plié) -> [texte, poids, trigrammes]
+        self.postings = defaultdict(set)  # trigramme -> {(type, texte plié)}
+        self.words = Counter()  # mot plié -> nombre d'opportunités
+        self.word_postings = defaultdict(set)  # trigramme -> {mot}
+        self.contributions = {}  # id d'opportunité -> (clés, mots)
+
+    def add(self, opportunity_id, texts):
+        with self.lock:
+            self.remove(opportunity_id)
+            keys = []
+            words = set()
+            for kind, text in texts:
+                folded = fold(text)
+                if not folded:
+                    continue
+                key = (kind, folded)
+                entry = self.entries.get(key)
+                if entry is None:
+                    entry = self.entries[key] = [text, 0, trigrams(folded)]
+                    for gram in entry[2]:
+                        self.postings[gram].add(key)
+                entry[1] += 1
+                keys.append(key)
+                words.update(folded.split())
+
+            for word in words:
+                if not self.words[word]:
+                    for gram in trigrams(word):
+                        self.word_postings[gram].add(word)
+                self.words[word] += 1
+            self.contributions[opportunity_id] = (keys, words)
+
+    def remove(self, opportunity_id):
+        with self.lock:
+            keys, words = self.contributions.pop(opportunity_id, ((), ()))
+            for key in keys:
+                entry = self.entries[key]
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    for gram in entry[2]:
+                        self.postings[gram].discard(key)
+                    del self.entries[key]
+            for word in words:
+                self.words[word] -= 1
+                if self.words[word] <= 0:
+                    for gram in trigrams(word):
+                        self.word_postings[gram].discard(word)
+                    del self.words[word]
+
+    def suggest(self, query, limit=10):
+        """Textes les plus proches de la saisie (seuls ceux partageant un trigramme sont examinés)"""
+        folded = fold(query)
+        query_grams = trigrams(folded)
+        if not query_grams:
+            return []
+
+        min_similarity = get_config('MIN_SIMILARITY')
+        with self.lock:
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self.postings.get(gram, ()))
+
+            results = []
+            for key, common in shared.items():
+                text, weight, grams = self.entries[key]
+                score = similarity_score(folded, len(query_grams), key[1], len(grams), common)
+                if score >= min_similarity:
+                    results.append((score, weight, key[0], text))
+
+        return _ranked(results, limit)
+
+    def correct(self, word, limit=MAX_CORRECTIONS):
+        """Mots connus les plus proches d'un terme absent du vocabulaire"""
+        word = fold(word)
+        with self.lock:
+            if not word or word in self.words:
+                return []
+            word_grams = trigrams(word)
+            shared = Counter()
+            for gram in word_grams:
+                shared.update(self.word_postings.get(gram, ()))
+
+            min_similarity = get_config('MIN_TERM_SIMILARITY')
+            scored = []
+            for candidate, common in shared.items():
+                similarity = common / (len(word_grams) + len(trigrams(candidate)) - common)
+                if similarity >= min_similarity:
+                    scored.append((similarity, self.words[candidate], candidate))
+        scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+        return [candidate for _, _, candidate in scored[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_index(version=None):
+    """Construire l'index à partir des opportunités publiées (une requête, lue en flux)"""
+    index = TrigramIndex(version=version)
+    rows = Opportunity.objects.filter(status='published').values_list(
+        'pk', 'title', 'organization', 'tags', 'location', 'location_code'
+    ).order_by()
+    for pk, *fields in rows.iterator(chunk_size=2000):
+        index.add(pk, suggestion_texts(*fields))
+    return index
+
+
+def get_index():
+    """Index du processus, (re)construit s'il manque ou si un autre processus l'a modifié"""
+    global _index
+    version = cache.get(VERSION_KEY)
+    with _index_lock:
+        stale = _index is not None and _index.version != version and (
+            time.monotonic() - _index.built_at >= get_config('REFRESH_INTERVAL')
+        )
+        if _index is None or stale:
+            _index = build_index(version=version)
+        return _index
+
+
+def _bump_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 0, timeout=None)
+        return cache.incr(VERSION_KEY)
+
+
+def _apply(update):
+    """Appliquer une mise à jour à l'index du processus et publier la nouvelle version"""
+    version = _bump_version()
+    with _index_lock:
+        if _index is None:
+            return  # Sera construit au premier usage
+        update(_index)
+        # Une version intermédiaire vient d'un autre processus : garder l'index périmé
+        if _index.version is None or _index.version == version - 1:
+            _index.version = version
+
+
+def uses_memory_index():
+    return connection.vendor != 'postgresql'
+
+
+def update_opportunities(opportunities):
+    """Ajouter, mettre à jour ou retirer des opportunités selon leur statut"""
+    if not uses_memory_index():
+        return  # Index pg_trgm maintenu par la base
+
+    def update(index):
+        for opportunity in opportunities:
+            if opportunity.status == 'published':
+                index.add(opportunity.pk, suggestion_texts(
+                    opportunity.title, opportunity.organization, opportunity.tags,
+                    opportunity.location, opportunity.location_code
+                ))
+            else:
+                index.remove(opportunity.pk)
+    _apply(update)
+
+
+def remove_opportunity(opportunity_id):
+    """Retirer une opportunité supprimée"""
+    if uses_memory_index():
+        _apply(lambda index: index.remove(opportunity_id))
+
+
+def invalidate():
+    """Faire reconstruire les index en mémoire (changements de statut en masse)"""
+    global _index
+    if not uses_memory_index():
+        return
+    _bump_version()
+    with _index_lock:
+        _index = None
+
+
+class WordSimilarity(Func):
+    """``word_similarity(saisie, champ)`` de pg_trgm"""
+    function = 'word_similarity'
+    output_field = FloatField()
+
+
+def trigram_match(table, column, query):
+    """``saisie <% champ`` : similarité de mot au-dessus du seuil, servie par l'index GIN"""
+    return RawSQL(f'%s <%% {table}.{column}', [query], output_field=BooleanField())
+
+
+def _postgres_suggest(query, limit):
+    query = query.strip().lower()
+    folded = fold(query)
+    table = Opportunity._meta.db_table
+    published = Opportunity.objects.filter(status='published').order_by()
+
+    rows = []
+    for kind in ('title', 'organization'):
+        matches = published.filter(trigram_match(table, kind, query)).values(kind).annotate(
+            count=Count('pk'), score=WordSimilarity(Value(query), kind)
+        ).order_by('-score')[:limit]
+        rows.extend((row['score'], row['count'], kind, row[kind]) for row in matches)
+
+    tags = Tag.objects.filter(opportunity_count__gt=0).filter(
+        trigram_match(Tag._meta.db_table, 'name', query)
+    ).annotate(score=WordSimilarity(Value(query), 'name')).order_by('-score')[:limit]
+    rows.extend((tag.score, tag.opportunity_count, 'tag', tag.name) for tag in tags)
+
+    min_similarity = get_config('MIN_SIMILARITY')
+    suggestions = []
+    for score, count, kind, text in rows:
+        text = text.strip()
+        text_folded = fold(text)
+        if text_folded.startswith(folded) or f' {folded}' in text_folded:
+            score += PREFIX_BONUS
+        if score >= min_similarity:
+            suggestions.append((score, count, kind, text))
+
+    # Quelques villes seulement : notées en mémoire comme sans pg_trgm
+    query_grams = trigrams(folded)
+    cities = published.filter(location_code__in=list(CITIES)).values('location_code').annotate(count=Count('pk'))
+    for row in cities:
+        label = city_label(row['location_code'])
+        grams = trigrams(fold(label))
+        common = len(query_grams & grams)
+        if common:
+            score = similarity_score(folded, len(query_grams), fold(label), len(grams), common)
+            if score >= min_similarity:
+                suggestions.append((score, row['count'], 'location', label))
+
+    return _ranked(suggestions, limit)
+
+
+def suggest(query, limit=10):
+    """Suggestions d'autocomplétion classées pour un préfixe ou une saisie mal orthographiée"""
+    if not fold(query):
+        return []
+    limit = max(1, min(limit, MAX_SUGGESTIONS))
+    if not uses_memory_index():
+        return _postgres_suggest(query, limit)
+    return get_index().suggest(query, limit)
+
+
+def corrections(term):
+    """Corrections orthographiques d'un terme de recherche (index en mémoire)"""
+    return get_index().correct(term)
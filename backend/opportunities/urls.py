@@ -1,13 +1,21 @@
 # opportunities/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OpportunityViewSet, OpportunityCategoryViewSet, UserOpportunityViewSet
+from .views import (
+    OpportunityViewSet, OpportunityCategoryViewSet, UserOpportunityViewSet, TagViewSet, DuplicateCandidateViewSet,
+    snapshot_file
+)
 
 router = DefaultRouter()
 router.register(r'categories', OpportunityCategoryViewSet)
-router.register(r'', OpportunityViewSet)
+router.register(r'tags', TagViewSet)
 router.register(r'user-relations', UserOpportunityViewSet, basename='user-opportunity')
+router.register(r'duplicates', DuplicateCandidateViewSet, basename='duplicate-candidate')
+# En dernier : la route détail '<slug>/' masquerait les préfixes déclarés après elle
+router.register(r'', OpportunityViewSet)
 
 urlpatterns = [
+    # Instantanés du fil public (voir snapshots.py)
+    path('snapshots/<str:name>', snapshot_file, name='opportunity-snapshot'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,19 +1,35 @@
 # opportunities/views.py
+import io
+import re
+from datetime import date, timedelta
+
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Count, Max, Q, Sum
+
+from core.conditional import ConditionalGetMixin
 
-from .models import Opportunity, OpportunityCategory, UserOpportunity
+from .models import (
+    DuplicateCandidate, Opportunity, OpportunityCategory, OpportunitySnapshot, UserOpportunity, Tag
+)
 from .serializers import (
     OpportunityListSerializer, OpportunityDetailSerializer, 
     OpportunityCreateUpdateSerializer, OpportunityCategorySerializer,
-    UserOpportunitySerializer
+    UserOpportunitySerializer, TagSerializer, DuplicateCandidateSerializer,
+    BulkRelationSerializer
 )
 from .permissions import IsOwnerOrReadOnly
-from .filters import OpportunityFilter
+from .facets import grouped_counts, rollup_counts, serialize_counts
+from .filters import OpportunityFilter, OpportunityOrderingFilter
+from .pagination import OpportunityPagination
+from .tracking import record_view
+from . import deadlines, dedup, exports, importers, relations, snapshots, trigram
 
 class OpportunityCategoryViewSet(viewsets.ModelViewSet):
     queryset = OpportunityCategory.objects.filter(is_active=True)
@@ -21,18 +37,39 @@ class OpportunityCategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
 
-class OpportunityViewSet(viewsets.ModelViewSet):
+class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    """Tags normalisés avec leur nombre d'opportunités"""
+    queryset = Tag.objects.filter(opportunity_count__gt=0)
+    serializer_class = TagSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['name']
+    ordering_fields = ['name', 'opportunity_count']
+    ordering = ['-opportunity_count', 'name']
+    lookup_field = 'slug'
+
+class OpportunityViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Opportunity.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # ?q= et ?search= passent par l'index plein texte (voir OpportunityFilter)
+    filter_backends = [DjangoFilterBackend, OpportunityOrderingFilter]
     filterset_class = OpportunityFilter
-    search_fields = ['title', 'description', 'organization', 'tags']
-    ordering_fields = ['created_at', 'deadline', 'publication_date', 'view_count']
+    ordering_fields = ['created_at', 'deadline', 'publication_date', 'view_count', 'distance', 'trending']
     ordering = ['-created_at']
+    pagination_class = OpportunityPagination
     lookup_field = 'slug'
+    # Compteurs mis à jour par F() sans toucher updated_at, noms de la catégorie et du créateur
+    conditional_aggregates = {
+        'views': Sum('view_count'),
+        'applications': Sum('application_count'),
+        'category_modified': Max('category__updated_at'),
+        'creator_modified': Max('creator__updated_at'),
+    }
+    # time_left et is_expired dépendent de l'heure courante
+    conditional_time_granularity = 3600
     
     def get_queryset(self):
         """Filtrer les opportunités selon le statut de l'utilisateur"""
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().with_list_relations(self.request.user)
         
         # Si l'utilisateur est non authentifié, montrer uniquement les opportunités publiées
         if not self.request.user.is_authenticated:
@@ -57,31 +94,34 @@ class OpportunityViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
             return [permissions.IsAuthenticated(), IsCreatorOrReadOnly()]
-        elif self.action == 'create':
+        elif self.action in ['create', 'export', 'apply', 'withdraw', 'save_opportunity', 'unsave_opportunity',
+                             'my_opportunities']:
+            # Actions liées à l'utilisateur courant
             return [permissions.IsAuthenticated()]
+        elif self.action == 'import_opportunities':
+            return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
     
-    def retrieve(self, request, *args, **kwargs):
-        """Incrémenter le compteur de vues lors de la consultation"""
-        instance = self.get_object()
-        
-        # Incrémenter le compteur de vues
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
-        
-        # Enregistrer la consultation si l'utilisateur est authentifié
-        if request.user.is_authenticated:
-            UserOpportunity.objects.get_or_create(
-                user=request.user,
-                opportunity=instance,
-                relation_type='viewed'
-            )
-        
-        # Mettre à jour le statut si nécessaire
-        instance.update_status()
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+    def get_user_version(self):
+        """Les relations de l'utilisateur (favoris, candidatures) font partie de la réponse"""
+        if not self.request.user.is_authenticated:
+            return None
+        return UserOpportunity.objects.filter(user=self.request.user).aggregate(
+            last_modified=Max('updated_at'), count=Count('pk')
+        )
+    
+    def perform_retrieve(self, instance):
+        """Journaliser la consultation : compteur et relation 'viewed' sont écrits par lots"""
+        record_view(instance, self.request.user)
+    
+    @action(detail=True, methods=['get'])
+    def similar(self, request, slug=None):
+        """Opportunités publiées similaires, précalculées par refresh_similar_opportunities"""
+        opportunity = self.get_object()
+        queryset = Opportunity.objects.filter(
+            neighbor_of__opportunity=opportunity, status='published'
+        ).with_list_relations(request.user).order_by('-neighbor_of__score', 'pk')
+        return Response(OpportunityListSerializer(queryset, many=True, context={'request': request}).data)
     
     @action(detail=True, methods=['post'])
     def apply(self, request, slug=None):
@@ -94,7 +134,7 @@ class OpportunityViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Créer ou mettre à jour la relation
+        # Créer ou mettre à jour la relation (le compteur est incrémenté par le signal post_save)
         user_opp, created = UserOpportunity.objects.update_or_create(
             user=request.user,
             opportunity=opportunity,
@@ -102,16 +142,29 @@ class OpportunityViewSet(viewsets.ModelViewSet):
             defaults={'status': 'pending'}
         )
         
-        # Incrémenter le compteur si c'est une nouvelle candidature
-        if created:
-            opportunity.application_count += 1
-            opportunity.save(update_fields=['application_count'])
-        
         return Response(
             {"detail": "Votre candidature a été enregistrée avec succès."},
             status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
         )
     
+    @action(detail=True, methods=['post'])
+    def withdraw(self, request, slug=None):
+        """Retirer sa candidature (le compteur est décrémenté par le signal post_delete)"""
+        opportunity = self.get_object()
+        
+        deleted, _ = UserOpportunity.objects.filter(
+            user=request.user,
+            opportunity=opportunity,
+            relation_type='applied'
+        ).delete()
+        
+        if deleted:
+            return Response({"detail": "Votre candidature a été retirée."})
+        return Response(
+            {"detail": "Vous n'avez pas postulé à cette opportunité."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
     @action(detail=True, methods=['post'])
     def save_opportunity(self, request, slug=None):
         """Sauvegarder une opportunité"""
@@ -155,10 +208,103 @@ class OpportunityViewSet(viewsets.ModelViewSet):
         )
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Nombre d'opportunités publiées par facette pour les filtres courants"""
+        filter_params = set(self.filterset_class.base_filters)
+        if filter_params & set(request.query_params):
+            # Une requête groupée sur les combinaisons de facettes du jeu filtré
+            queryset = self.filter_queryset(self.get_queryset()).filter(status='published')
+            counts = grouped_counts(queryset)
+        else:
+            counts = rollup_counts()
+        return Response(serialize_counts(counts))
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Suggestions (titres, organismes, tags, villes) pour une saisie partielle ou mal orthographiée"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        return Response(trigram.suggest(request.query_params.get('q', ''), limit))
+    
+    def get_window_opportunities(self, ids):
+        """Opportunités d'une fenêtre du calendrier, filtres de la liste appliqués, par identifiant"""
+        queryset = self.filter_queryset(
+            Opportunity.objects.filter(pk__in=ids).with_list_relations(self.request.user)
+        )
+        return {str(opportunity.pk): opportunity for opportunity in queryset}
+    
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Opportunités publiées regroupées par jour ou semaine de date limite
+        
+        Paramètres : start (AAAA-MM-JJ, aujourd'hui par défaut), days (7 par défaut),
+        group ('day' ou 'week'), plus les filtres de la liste.
+        """
+        try:
+            start = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params \
+                else timezone.localdate()
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response(
+                {"detail": "Paramètres invalides : start au format AAAA-MM-JJ, days entier."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        group = request.query_params.get('group', 'day')
+        if group not in ('day', 'week') or not 1 <= days <= deadlines.get_config('MAX_DAYS'):
+            return Response(
+                {"detail": f"group doit valoir 'day' ou 'week' et days être entre 1 et {deadlines.get_config('MAX_DAYS')}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        buckets = deadlines.day_buckets(start, days)
+        opportunities = self.get_window_opportunities([pk for ids in buckets.values() for pk in ids])
+        periods = []
+        for period_start, ids in deadlines.group_by(buckets, group):
+            items = [opportunities[pk] for pk in ids if pk in opportunities]
+            periods.append({
+                'start': period_start,
+                'count': len(items),
+                'opportunities': OpportunityListSerializer(items, many=True, context={'request': request}).data,
+            })
+        return Response(periods)
+    
+    @action(detail=False, methods=['get'])
+    def closing_soon(self, request):
+        """Opportunités publiées dont la date limite tombe dans les prochains jours (days, 7 par défaut)"""
+        try:
+            days = min(max(int(request.query_params.get('days', 7)), 1), deadlines.get_config('MAX_DAYS'))
+        except ValueError:
+            days = 7
+        now = timezone.now()
+        ids = deadlines.closing_ids(timezone.localdate(), days + 1)
+        opportunities = self.get_window_opportunities(ids)
+        limit = now + timedelta(days=days)
+        items = [
+            opportunities[pk] for pk in ids
+            if pk in opportunities and now <= opportunities[pk].deadline < limit
+        ]
+        return Response(OpportunityListSerializer(items, many=True, context={'request': request}).data)
+    
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Opportunités publiées les plus consultées, sauvegardées et postulées récemment (limit, 20 par défaut)"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        except ValueError:
+            limit = 20
+        queryset = self.filter_queryset(
+            Opportunity.objects.filter(status='published').with_list_relations(request.user)
+        ).order_by('-trending_score', '-created_at')[:limit]
+        return Response(OpportunityListSerializer(queryset, many=True, context={'request': request}).data)
+    
     @action(detail=False, methods=['get'])
     def my_opportunities(self, request):
         """Récupérer les opportunités créées par l'utilisateur"""
-        queryset = Opportunity.objects.filter(creator=request.user)
+        queryset = Opportunity.objects.filter(creator=request.user).with_list_relations(request.user)
         page = self.paginate_queryset(queryset)
         
         if page is not None:
@@ -171,13 +317,79 @@ class OpportunityViewSet(viewsets.ModelViewSet):
             queryset, many=True, context={'request': request}
         )
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exporter en flux (NDJSON ou CSV) les opportunités du staff ou du créateur, filtres de la liste acceptés"""
+        file_format = request.query_params.get('file_format', exports.DEFAULT_FORMAT)
+        if file_format not in exports.FORMATS:
+            return Response(
+                {"detail": f"Format non pris en charge ({', '.join(exports.FORMATS)})."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = Opportunity.objects.all()
+        if not request.user.is_staff:
+            queryset = queryset.filter(creator=request.user)
+        queryset = self.filter_queryset(queryset)
+        return exports.export_response(queryset, exports.OPPORTUNITY_FIELDS, file_format, 'opportunites')
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_opportunities(self, request):
+        """Importer un fichier CSV ou JSONL d'opportunités (réservé au staff)"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {"detail": "Le fichier est requis (champ 'file')."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        file_format = request.query_params.get('file_format') or importers.guess_format(upload.name)
+        if file_format not in importers.FORMATS:
+            return Response(
+                {"detail": f"Format non pris en charge, préciser file_format ({', '.join(importers.FORMATS)})."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Un encodage invalide interrompt l'import : le bilan indique les lignes déjà créées
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = importers.import_opportunities(stream, file_format, request.user)
+        
+        return Response(
+            report.to_dict(),
+            status=status.HTTP_201_CREATED if report.created else status.HTTP_400_BAD_REQUEST
+        )
+
+class DuplicateCandidateViewSet(viewsets.ReadOnlyModelViewSet):
+    """Doublons potentiels détectés à l'enregistrement, à examiner par le staff"""
+    serializer_class = DuplicateCandidateSerializer
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get_queryset(self):
+        queryset = DuplicateCandidate.objects.select_related('opportunity', 'original')
+        status_filter = self.request.query_params.get('status', 'pending')
+        if status_filter != 'all':
+            queryset = queryset.filter(status=status_filter)
+        return queryset
+    
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        """Confirmer le doublon : il est rattaché à l'original et masquable des listes"""
+        candidate = dedup.review(self.get_object(), request.user, confirmed=True)
+        return Response(self.get_serializer(candidate).data)
+    
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        """Écarter la paire : elle ne sera plus proposée"""
+        candidate = dedup.review(self.get_object(), request.user, confirmed=False)
+        return Response(self.get_serializer(candidate).data)
 
 class UserOpportunityViewSet(viewsets.ModelViewSet):
     serializer_class = UserOpportunitySerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
     
     def get_queryset(self):
-        return UserOpportunity.objects.filter(user=self.request.user)
+        return UserOpportunity.objects.filter(user=self.request.user).with_opportunity_details(self.request.user)
     
     @action(detail=False, methods=['get'])
     def saved(self, request):
@@ -207,6 +419,73 @@ class UserOpportunityViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset().filter(relation_type=relation_type)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exporter en flux ses relations (NDJSON ou CSV), filtrables par relation_type et par les filtres d'opportunités"""
+        file_format = request.query_params.get('file_format', exports.DEFAULT_FORMAT)
+        if file_format not in exports.FORMATS:
+            return Response(
+                {"detail": f"Format non pris en charge ({', '.join(exports.FORMATS)})."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = UserOpportunity.objects.filter(user=request.user)
+        relation_type = request.query_params.get('relation_type')
+        if relation_type:
+            queryset = queryset.filter(relation_type=relation_type)
+        
+        # Mêmes filtres que la liste des opportunités, appliqués en sous-requête
+        filterset = OpportunityFilter(request.query_params, queryset=Opportunity.objects.all(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        if set(filterset.base_filters) & set(request.query_params):
+            queryset = queryset.filter(opportunity__in=filterset.qs.values('pk'))
+        
+        return exports.export_response(queryset, exports.RELATION_FIELDS, file_format, 'mes-opportunites')
+    
+    @action(detail=False, methods=['get'])
+    def ical(self, request):
+        """Flux iCalendar des dates limites des opportunités sauvegardées ou postulées"""
+        feed = deadlines.ical_feed(deadlines.user_deadline_rows(request.user))
+        response = HttpResponse(feed, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="opportuci-dates-limites.ics"'
+        return response
+    
+    def bulk_response(self, results):
+        """Résultat par identifiant, plus le total par résultat"""
+        totals = {}
+        for result in results.values():
+            totals[result] = totals.get(result, 0) + 1
+        return Response({
+            'results': [{'id': str(pk), 'result': result} for pk, result in results.items()],
+            'totals': totals,
+        })
+    
+    def get_bulk_ids(self, request):
+        serializer = BulkRelationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['ids']
+    
+    @action(detail=False, methods=['post'])
+    def bulk_save(self, request):
+        """Sauvegarder plusieurs opportunités ({"ids": [...]})"""
+        results = relations.bulk_add(request.user, self.get_bulk_ids(request), 'saved')
+        return self.bulk_response(results)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_unsave(self, request):
+        """Retirer plusieurs opportunités des favoris ({"ids": [...]})"""
+        results = relations.bulk_remove(request.user, self.get_bulk_ids(request), 'saved')
+        return self.bulk_response(results)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_apply(self, request):
+        """Postuler à plusieurs opportunités ({"ids": [...]}), les opportunités expirées sont refusées"""
+        results = relations.bulk_add(
+            request.user, self.get_bulk_ids(request), 'applied', reject_expired=True, status='pending'
+        )
+        return self.bulk_response(results)
 
 # opportunities/permissions.py
 from rest_framework import permissions
@@ -232,3 +511,36 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
         
         return obj.user == request.user
+
+def _accepted_encodings(request):
+    return {
+        token.split(';')[0].strip() for token in request.headers.get('Accept-Encoding', '').split(',')
+        if not re.search(r';\s*q=0(\.0*)?\s*$', token)
+    }
+
+def snapshot_file(request, name):
+    """
+    Servir un fichier d'instantané (version compressée selon ``Accept-Encoding``)
+
+    Le manifeste est servi avec un cache court, les fichiers versionnés avec un cache
+    long et immuable.
+    """
+    snapshot = OpportunitySnapshot.objects.filter(name=name).first()
+    if snapshot is None:
+        raise Http404(name)
+
+    encodings = _accepted_encodings(request)
+    if 'br' in encodings and snapshot.brotli_content is not None:
+        response = HttpResponse(bytes(snapshot.brotli_content), content_type='application/json')
+        response['Content-Encoding'] = 'br'
+    elif 'gzip' in encodings:
+        response = HttpResponse(bytes(snapshot.gzip_content), content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(bytes(snapshot.content), content_type='application/json')
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if name == snapshots.MANIFEST:
+        patch_cache_control(response, public=True, max_age=snapshots.get_config('MANIFEST_MAX_AGE'))
+    else:
+        patch_cache_control(response, public=True, max_age=snapshots.IMMUTABLE_MAX_AGE, immutable=True)
+    return response
@@ -152,6 +152,70 @@ CACHES = {
     }
 }
 
+# Comptage différé des consultations d'opportunités (voir opportunities/tracking.py)
+OPPORTUNITY_VIEWS_CONFIG = {
+    'EVENT_TTL': 7 * 24 * 3600,  # secondes
+    'FLUSH_BATCH_SIZE': 1000,
+    'FLUSH_INTERVAL': 60,  # secondes, pour flush_opportunity_views --loop
+}
+
+# Transitions publish/expire planifiées (voir opportunities/lifecycle.py)
+OPPORTUNITY_LIFECYCLE_CONFIG = {
+    'INTERVAL': 300,  # secondes, pour run_opportunity_lifecycle --loop
+}
+
+# Réconciliation des compteurs dénormalisés (voir opportunities/counters.py)
+OPPORTUNITY_COUNTERS_CONFIG = {
+    'INTERVAL': 3600,  # secondes, pour reconcile_opportunity_counters --loop
+}
+
+# Autocomplétion et recherche tolérante aux fautes (voir opportunities/trigram.py)
+OPPORTUNITY_TRIGRAM_CONFIG = {
+    'MIN_SIMILARITY': 0.3,
+    'MIN_TERM_SIMILARITY': 0.45,
+    'REFRESH_INTERVAL': 60,  # secondes entre deux reconstructions de l'index en mémoire
+}
+
+# Détection des quasi-doublons (voir opportunities/dedup.py)
+OPPORTUNITY_DEDUP_CONFIG = {
+    'THRESHOLD': 0.8,  # similarité estimée minimale d'un doublon potentiel
+    'BATCH_SIZE': 500,  # pour index_opportunity_duplicates
+}
+
+# Calendrier des dates limites (voir opportunities/deadlines.py)
+OPPORTUNITY_DEADLINES_CONFIG = {
+    'CACHE_TIMEOUT': 3600,  # secondes, table jour -> opportunités
+    'MAX_DAYS': 92,  # largeur maximale d'une fenêtre du calendrier
+}
+
+# Opportunités en vogue (voir opportunities/trending.py)
+OPPORTUNITY_TRENDING_CONFIG = {
+    'HALF_LIFE': 48 * 3600,  # secondes : un événement pèse moitié moins après 48 h
+    'INTERVAL': 300,  # secondes entre deux mises à jour en mode worker
+    'OVERLAP': 300,  # secondes relues avant le point de reprise (lignes validées en retard)
+    'WEIGHTS': {'viewed': 1.0, 'saved': 3.0, 'applied': 5.0},
+}
+
+# Opportunités similaires précalculées (voir opportunities/similar.py)
+OPPORTUNITY_SIMILAR_CONFIG = {
+    'NEIGHBORS': 10,  # voisins conservés par opportunité
+    'MAX_TERMS': 100,  # termes conservés par vecteur TF-IDF
+    'MIN_SCORE': 0.05,  # similarité cosinus minimale d'un voisin
+    'MAX_DF_RATIO': 0.5,  # termes trop fréquents ignorés
+}
+
+# Instantanés JSON du fil public (voir opportunities/snapshots.py), enregistrés en base et
+# servis sous URL : manifest.json avec un cache court, les autres fichiers avec
+# « Cache-Control: public, max-age=31536000, immutable » (versions .gz/.br précompressées).
+OPPORTUNITY_SNAPSHOT_CONFIG = {
+    'URL': '/api/opportunities/snapshots/',
+    'PAGES': 5,  # pages du fil public rendues
+    'INTERVAL': 30,  # secondes entre deux vérifications de build_opportunity_snapshots --loop
+    'MAX_AGE': 3600,  # secondes avant une régénération même sans modification
+    'MANIFEST_MAX_AGE': 60,  # secondes de cache du manifeste chez les clients
+    'GRACE_PERIOD': 3600,  # secondes de conservation des fichiers remplacés
+}
+
 # ===========================
 # VALIDATION DES MOTS DE PASSE
 # ===========================
@@ -393,6 +457,7 @@ GEMINI_CONFIG = {
     'TOP_K': 40,
     'REQUEST_TIMEOUT': 30,  # secondes
     'MAX_RETRIES': 3,
+    'MODEL_REFRESH_INTERVAL': 6 * 3600,  # secondes entre deux sélections automatiques du modèle
 }
 
 # Configuration pour les recommandations IA
@@ -400,6 +465,60 @@ AI_RECOMMENDATIONS_CONFIG = {
     'MAX_RECOMMENDATIONS': 10,
     'REFRESH_INTERVAL_HOURS': 6,
     'MIN_USER_ACTIONS_FOR_PERSONALIZATION': 3,
+    'CANDIDATES': 15,  # opportunités pré-classées localement (BM25) envoyées au LLM
+    'LLM_RERANK': True,  # False : servir directement le pré-classement (sans appel Gemini)
+}
+
+# Pré-classement BM25 du catalogue pour les recommandations (voir opportunities/prerank.py)
+OPPORTUNITY_PRERANK_CONFIG = {
+    'REFRESH_INTERVAL': 60,  # secondes minimum entre deux reconstructions de l'index par processus
+}
+
+# Cache des réponses Gemini (voir ai_services/cache.py)
+AI_CACHE_CONFIG = {
+    'ENABLED': True,
+    'LOCAL_MAX_ENTRIES': 256,  # entrées du cache LRU en mémoire de chaque processus
+    'TTLS': {  # secondes, par méthode
+        'recommendations': 3600,
+        'career_advice': 24 * 3600,
+        'skill_gaps': 7 * 24 * 3600,
+        'interview_prep': 24 * 3600,
+    },
+    'DEFAULT_TTL': 3600,
+}
+
+# File des appels IA exécutés par `python manage.py run_ai_jobs` (voir ai_services/jobs.py)
+AI_JOBS_CONFIG = {
+    'SERVICE': 'ai_services.gemini_service.GeminiAIService',  # 'ai_services.stub_service.StubAIService' sans réseau
+    'WORKERS': 2,  # threads du worker
+    # Sans worker run_ai_jobs : exécuter chaque job dans un thread du processus web
+    'INLINE': os.environ.get('AI_JOBS_INLINE', 'False').lower() == 'true',
+    'POLL_INTERVAL': 1.0,  # secondes d'attente quand la file est vide
+    'LEASE': 300,  # secondes avant de remettre en attente un job abandonné
+    'MAX_ATTEMPTS': 2,
+    'RETENTION': 7 * 24 * 3600,  # secondes de conservation des jobs terminés
+    'RETRY_AFTER': 2,  # secondes suggérées au client entre deux interrogations
+}
+
+# Disjoncteur, concurrence et nouvelles tentatives des appels Gemini (voir ai_services/resilience.py)
+AI_RESILIENCE_CONFIG = {
+    'MAX_CONCURRENCY': 4,  # appels Gemini simultanés par processus
+    'ACQUIRE_TIMEOUT': 2.0,  # secondes d'attente maximale d'une place libre
+    'TIMEOUTS': {  # secondes, par méthode
+        'chat': 30,
+        'recommendations': 20,
+        'career_advice': 30,
+        'skill_gaps': 30,
+        'interview_prep': 30,
+    },
+    'DEFAULT_TIMEOUT': 20,
+    'MAX_RETRIES': 2,  # nouvelles tentatives après une erreur transitoire (429, 5xx, délai)
+    'BACKOFF_BASE': 0.5,  # secondes, doublées à chaque tentative (gigue aléatoire)
+    'BACKOFF_MAX': 8.0,
+    'WINDOW': 60,  # secondes d'historique du disjoncteur
+    'MIN_CALLS': 5,  # appels minimum dans la fenêtre avant ouverture
+    'ERROR_RATE': 0.5,  # taux d'échec qui ouvre le disjoncteur
+    'OPEN_SECONDS': 30,  # durée d'ouverture avant un appel d'essai
 }
 
 # ===========================
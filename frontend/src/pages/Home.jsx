@@ -142,8 +142,14 @@ const Home = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await api.GenericAPI.get('/opportunities/featured/');
-        setFeaturedOpportunities(response?.data || []);
+        // Visiteurs anonymes : opportunités mises en avant servies par l'instantané du fil public
+        const snapshot = api.isAuthenticated() ? null : await api.SnapshotAPI.get('featured');
+        if (snapshot) {
+          setFeaturedOpportunities(snapshot);
+        } else {
+          const response = await api.GenericAPI.get('/opportunities/featured/');
+          setFeaturedOpportunities(response?.data || []);
+        }
       } catch (err) {
         console.error("Erreur de chargement:", err);
         setError("Une erreur est survenue. Veuillez réessayer.");
@@ -8,6 +8,7 @@ import SearchFilter from "../components/SearchFilter";
 import LoadingSkeleton from "../components/LoadingSkeleton";
 import EmptyState from "../components/EmptyState";
 import ErrorDisplay from "../components/ErrorDisplay";
+import { SnapshotAPI } from "../services/api";
 
 const API_URL = import.meta.env.VITE_API_URL;
 
@@ -59,11 +60,16 @@ const Opportunities = () => {
   const fetchOpportunities = async () => {
     try {
       setLoading(true);
-      const response = await axios.get("http://127.0.0.1:8000/api/opportunities/", {
-        params: { page: currentPage },
-      });
-      setOpportunities(response.data.results);
-      setTotalPages(Math.ceil(response.data.count / 10));
+      // Visiteurs anonymes : premières pages servies par les instantanés du fil public
+      let data = isAuthenticated ? null : await SnapshotAPI.get(`page-${currentPage}`);
+      if (!data) {
+        const response = await axios.get("http://127.0.0.1:8000/api/opportunities/", {
+          params: { page: currentPage },
+        });
+        data = response.data;
+      }
+      setOpportunities(data.results);
+      setTotalPages(Math.ceil(data.count / 10));
       setError(null);
     } catch (err) {
       console.error("Erreur lors du chargement des opportunités :", err);
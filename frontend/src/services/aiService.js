@@ -8,6 +8,29 @@ class AIService {
     });
   }
 
+  // Les appels IA sont mis en file d'attente (202) : interroger le job jusqu'au résultat
+  async waitForJob(accepted, timeout = 120000) {
+    const started = Date.now();
+    let job = accepted;
+    while (job.status === 'pending' || job.status === 'running') {
+      if (Date.now() - started > timeout) {
+        throw new Error("Délai dépassé pour la réponse de l'IA");
+      }
+      await new Promise(resolve => setTimeout(resolve, 2000));
+      const response = await fetch(`${this.baseURL}/jobs/${accepted.job_id}/`, {
+        headers: this.getAuthHeaders(),
+      });
+      if (!response.ok) {
+        throw new Error('Erreur lors du suivi de la requête IA');
+      }
+      job = await response.json();
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Erreur du service IA');
+    }
+    return job.result;
+  }
+
   async getRecommendations() {
     try {
       const response = await fetch(`${this.baseURL}/recommendations/`, {
@@ -18,7 +41,7 @@ class AIService {
         throw new Error('Erreur lors du chargement des recommandations');
       }
       
-      return await response.json();
+      return await this.waitForJob(await response.json());
     } catch (error) {
       console.error('Erreur getRecommendations:', error);
       throw error;
@@ -37,7 +60,7 @@ class AIService {
         throw new Error('Erreur lors de la génération des conseils');
       }
       
-      return await response.json();
+      return await this.waitForJob(await response.json());
     } catch (error) {
       console.error('Erreur getCareerAdvice:', error);
       throw error;
@@ -56,7 +79,7 @@ class AIService {
         throw new Error('Erreur lors de la préparation d\'entretien');
       }
       
-      return await response.json();
+      return await this.waitForJob(await response.json());
     } catch (error) {
       console.error('Erreur getInterviewPrep:', error);
       throw error;
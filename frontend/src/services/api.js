@@ -346,11 +346,29 @@ export const ChatAPI = {
 
 // ---------------------- AI SERVICES ----------------------
 
+// Les appels IA sont mis en file d'attente (202) : interroger le job jusqu'au résultat
+const waitForAIJob = async (accepted, timeout = 120000) => {
+  const started = Date.now();
+  let job = accepted;
+  while (job.status === 'pending' || job.status === 'running') {
+    if (Date.now() - started > timeout) {
+      throw new Error("Délai dépassé pour la réponse de l'IA");
+    }
+    await new Promise(resolve => setTimeout(resolve, 2000));
+    const response = await API.get(`/ai/jobs/${accepted.job_id}/`);
+    job = response.data;
+  }
+  if (job.status === 'failed') {
+    throw new Error(job.error || 'Erreur du service IA');
+  }
+  return job.result;
+};
+
 export const AIAPI = {
   getRecommendations: async () => {
     try {
       const response = await API.get('/ai/recommendations/');
-      return response.data;
+      return await waitForAIJob(response.data);
     } catch (error) {
       console.error('AI recommendations error:', error.response?.data || error.message);
       throw error;
@@ -360,7 +378,7 @@ export const AIAPI = {
   getCareerAdvice: async (careerGoals) => {
     try {
       const response = await API.post('/ai/career-advice/', { career_goals: careerGoals });
-      return response.data;
+      return await waitForAIJob(response.data);
     } catch (error) {
       console.error('AI career advice error:', error.response?.data || error.message);
       throw error;
@@ -370,7 +388,7 @@ export const AIAPI = {
   getInterviewPrep: async (opportunityId) => {
     try {
       const response = await API.post('/ai/interview-prep/', { opportunity_id: opportunityId });
-      return response.data;
+      return await waitForAIJob(response.data);
     } catch (error) {
       console.error('AI interview prep error:', error.response?.data || error.message);
       throw error;
@@ -378,6 +396,29 @@ export const AIAPI = {
   }
 };
 
+// ---------------------- INSTANTANÉS DU FIL PUBLIC ----------------------
+
+// Fil public pré-rendu pour les visiteurs anonymes : le manifeste (cache court) donne le
+// nom versionné de chaque fichier (cache long). null si le fichier n'existe pas ou si
+// l'instantané est indisponible : l'appelant utilise alors l'API dynamique.
+export const SnapshotAPI = {
+  get: async (name) => {
+    try {
+      const snapshotsUrl = `${API_BASE_URL}/opportunities/snapshots/`;
+      const { data: manifest } = await axios.get(`${snapshotsUrl}manifest.json`);
+      const filename = manifest.files?.[name];
+      if (!filename) {
+        return null;
+      }
+      const { data } = await axios.get(new URL(manifest.url + filename, snapshotsUrl).href);
+      return data;
+    } catch (error) {
+      console.warn('Instantané indisponible:', error.message);
+      return null;
+    }
+  },
+};
+
 // ---------------------- API GÉNÉRIQUE ----------------------
 
 export const GenericAPI = {
@@ -550,6 +591,7 @@ export default {
   ChatAPI,        // NOUVEAU
   AIAPI,          // NOUVEAU
   GenericAPI,
+  SnapshotAPI,
   login: AuthAPI.login,
   refreshToken: (refresh) => AuthAPI.refreshToken(refresh),
   getCurrentUser,